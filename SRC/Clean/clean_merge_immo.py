@@ -1,7 +1,17 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import glob
+import hashlib
+import json
 import os
 import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # =====================================================
 # CONFIG : CHEMINS (adapte si besoin)
@@ -13,6 +23,106 @@ BASE_DIR = Path(__file__).parent.parent.parent
 NOTAIRES_FILE = BASE_DIR / "DATA" / "Notaires" / "notaires_france.csv"
 SELOGER_FOLDER = BASE_DIR / "DATA" / "Seloger"
 OUTPUT_DIR = BASE_DIR / "DATA" / "Fusion_notaires_seloger"
+# Base fusionnée : dataset Parquet partitionné par source et département, et le même contenu
+# dans un seul CSV (format de l'ancienne base_fusionnee.csv)
+OUTPUT_DATASET = OUTPUT_DIR / "base_fusionnee"
+OUTPUT_CSV = OUTPUT_DIR / "base_fusionnee.csv"
+# Manifeste des fichiers sources et partitions nettoyées (fusion incrémentale)
+MANIFEST_FILE = OUTPUT_DIR / "manifest.json"
+PARTITIONS_DIR = OUTPUT_DIR / "partitions"
+# Version du nettoyage : à incrémenter quand clean_seloger ou clean_notaires changent,
+# tous les fichiers sont alors renettoyés à la fusion suivante
+# (2 : schéma compact de la base, toutes les partitions de la base sont réécrites)
+CLEAN_VERSION = 2
+
+# =====================================================
+# CONFIG : LECTURE DES CSV
+# =====================================================
+# Les CSV sont lus par le lecteur natif de pyarrow (multithreadé, guillemets gérés)
+# avec des types de colonnes explicites : pas de déduction des types, codes postaux gardés en texte.
+# Les colonnes absentes d'un fichier sont ignorées, le type des colonnes non listées est déduit par pyarrow.
+
+# Nombre de processus de nettoyage des fichiers sources : un par cœur disponible
+NB_PROCESSUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+SELOGER_TYPES = {
+    "id": pa.string(),
+    "creationDate": pa.string(),
+    "city": pa.string(),
+    "district": pa.string(),
+    "zipCode": pa.string(),
+    "postalCode": pa.string(),
+    "distributionType": pa.string(),
+    "propertyType": pa.string(),
+    "price": pa.float64(),
+    "surface": pa.float64(),
+    "livingArea": pa.float64(),
+    "nbroom": pa.float64(),
+    "rooms": pa.float64(),
+    "nbbedroom": pa.float64(),
+    "bedrooms": pa.float64(),
+    "description": pa.string(),
+    "permalink": pa.string(),
+    "latitude": pa.float64(),
+    "longitude": pa.float64(),
+}
+
+NOTAIRES_COLUMNS = [
+    "departement","id","prix","surface","prix_m2","nb_pieces","nb_chambres",
+    "type_bien","cp","ville","localite","statut","date_maj","url","photo"
+]
+NOTAIRES_TYPES = {
+    **{col: pa.string() for col in NOTAIRES_COLUMNS},
+    "prix": pa.float64(),
+    "surface": pa.float64(),
+    "prix_m2": pa.float64(),
+    "nb_pieces": pa.float64(),
+    "nb_chambres": pa.float64(),
+}
+
+# =====================================================
+# CONFIG : BASE FUSIONNÉE
+# =====================================================
+
+# Schéma compact de la base :
+# - colonnes à peu de valeurs distinctes en dictionnaire (catégories en pandas),
+# - entiers en int32 (prix jusqu'à 2,1 milliards), réels en float32 (7 chiffres significatifs),
+# - texte libre (id, description, url) en chaînes Arrow.
+# source et departement sont les colonnes de partition : texte dans les noms des dossiers,
+# converties en catégories à la lecture (voir to_compact_pandas).
+DICT = pa.dictionary(pa.int32(), pa.string())
+BASE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("prix", pa.int32()),
+    ("surface", pa.float32()),
+    ("prix_m2", pa.float32()),
+    ("nb_pieces", pa.int32()),
+    ("nb_chambres", pa.int32()),
+    ("type_bien", DICT),
+    ("ville", DICT),
+    ("cp", DICT),
+    ("departement", pa.string()),
+    ("latitude", pa.float32()),
+    ("longitude", pa.float32()),
+    ("description", pa.string()),
+    ("url", pa.string()),
+    ("source", pa.string()),
+])
+BASE_COLUMNS = BASE_SCHEMA.names
+CATEGORY_COLUMNS = ["type_bien", "ville", "cp", "departement", "source"]
+
+# Types pandas des colonnes Arrow : entiers nullables 32 bits et chaînes Arrow au lieu d'objets Python
+COMPACT_PANDAS_TYPES = {
+    pa.int32(): pd.Int32Dtype(),
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+}
+
+# Valeurs de partition lues en texte : sinon "01" serait relu comme l'entier 1
+PARTITIONING = ds.partitioning(pa.schema([("source", pa.string()), ("departement", pa.string())]), flavor="hive")
+PARQUET_OPTIONS = ds.ParquetFileFormat().make_write_options(
+    compression="zstd", use_dictionary=True, write_statistics=True
+)
 
 # =====================================================
 # OUTILS
@@ -26,6 +136,47 @@ def detect_separator(filepath):
             return ";" if first.count(";") > first.count(",") else ","
         return ";" if ";" in first else ","
 
+def read_csv_arrow(filepath, column_types, column_names=None, newlines_in_values=False):
+    """Lecture d'un CSV avec pyarrow.csv, convertie en DataFrame.
+
+    column_names : noms des colonnes d'un fichier sans en-tête (None : lus sur la première ligne).
+    Les lignes au mauvais nombre de champs sont ignorées et comptées.
+    Si une valeur ne respecte pas le type d'une colonne, le fichier est relu en texte
+    (la conversion tolérante est faite par le nettoyage, voir to_int).
+    """
+    sep = detect_separator(filepath)
+    skip_header = column_names is not None and _has_header(filepath, sep, column_names)
+    invalid_rows = []
+
+    def skip_row(row):
+        invalid_rows.append(row.number)
+        return "skip"
+
+    def read(types):
+        return pa_csv.read_csv(
+            filepath,
+            read_options=pa_csv.ReadOptions(column_names=column_names, skip_rows=1 if skip_header else 0,
+                                            use_threads=True),
+            parse_options=pa_csv.ParseOptions(delimiter=sep, newlines_in_values=newlines_in_values,
+                                              invalid_row_handler=skip_row),
+            convert_options=pa_csv.ConvertOptions(column_types=types, strings_can_be_null=True),
+        )
+
+    try:
+        table = read(column_types)
+    except pa.ArrowInvalid:
+        invalid_rows.clear()
+        table = read({col: pa.string() for col in column_types})
+    if invalid_rows:
+        print(f"⚠ {os.path.basename(filepath)} : {len(invalid_rows)} lignes mal formées ignorées")
+    return table.to_pandas()
+
+def _has_header(filepath, sep, column_names):
+    """Vrai si la première ligne du fichier est l'en-tête column_names."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        first = f.readline().strip().split(sep)
+    return first[0].strip('"') == column_names[0]
+
 def to_int(series):
     """Conversion sûre en Int64."""
     return pd.to_numeric(series, errors="coerce").round().astype("Int64")
@@ -97,16 +248,7 @@ def clean_seloger(df, dept_from_file):
 # =====================================================
 
 def clean_notaires(df):
-    if df.shape[1] == 1:
-        df = df[df.columns[0]].str.split(",", expand=True)
-
-    df.columns = [
-        "departement","id","prix","surface","prix_m2","nb_pieces","nb_chambres",
-        "type_bien","cp","ville","localite","statut","date_maj","url","photo"
-    ]
-
-    # Suppression éventuelle de la ligne d’en-tête
-    df = df[df["departement"] != "departement"]
+    df.columns = NOTAIRES_COLUMNS
 
     df["prix"] = to_int(df["prix"])
     df["surface"] = pd.to_numeric(df["surface"], errors="coerce")
@@ -127,63 +269,318 @@ def clean_notaires(df):
 
 
 # =====================================================
-# CHARGEMENT DES FICHIERS SELOGER
+# CHARGEMENT NOTAIRES
 # =====================================================
 
-def load_seloger_folder(folder):
-    files = glob.glob(os.path.join(folder, "seloger_dep_*.csv"))
-    all_dfs = []
+def load_notaires(filepath):
+    print(f"\n=== Chargement Notaires ===")
+    df = read_csv_arrow(filepath, NOTAIRES_TYPES, column_names=NOTAIRES_COLUMNS)
+    return clean_notaires(df)
 
-    print(f"\n=== Chargement SeLoger : {len(files)} fichiers trouvés ===")
 
-    for f in files:
-        dept = extract_departement_from_filename(f)
-        print(f"➡️ {os.path.basename(f)}  (département = {dept})")
+# =====================================================
+# MANIFESTE DES FICHIERS SOURCES
+# =====================================================
+# Chaque fichier source (CSV Notaires, CSV SeLoger d'un département) est nettoyé dans sa propre
+# partition Parquet (PARTITIONS_DIR/<source>/<nom du fichier>.parquet). Le manifeste garde pour chaque fichier sa taille, sa date
+# de modification, son empreinte sha256 et la partition produite : une fusion ne renettoie que
+# les fichiers nouveaux ou modifiés, les partitions des fichiers supprimés sont retirées.
+
+def list_inputs():
+    """Fichiers sources à fusionner : liste de (source, chemin)."""
+    inputs = [("notaires", str(NOTAIRES_FILE))] if os.path.exists(NOTAIRES_FILE) else []
+    files = sorted(glob.glob(os.path.join(SELOGER_FOLDER, "seloger_dep_*.csv")))
+    return inputs + [("seloger", f) for f in files]
+
+def input_key(filepath):
+    """Clé d'un fichier source dans le manifeste (chemin relatif au dépôt si possible)."""
+    try:
+        return Path(filepath).resolve().relative_to(BASE_DIR.resolve()).as_posix()
+    except ValueError:
+        return str(Path(filepath).resolve())
+
+def file_hash(filepath):
+    """Empreinte sha256 du contenu d'un fichier."""
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def load_manifest():
+    """Manifeste de la dernière fusion (vide si absent ou si le nettoyage a changé depuis)."""
+    empty = {"version": CLEAN_VERSION, "files": {}, "pending": []}
+    if not os.path.exists(MANIFEST_FILE):
+        return empty
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != CLEAN_VERSION:
+        # Nettoyage modifié : toutes les partitions sont à refaire, les anciennes seront remplacées
+        files = {key: dict(entry, sha256=None) for key, entry in manifest["files"].items()}
+        return dict(empty, files=files, pending=manifest.get("pending", []))
+    return manifest
+
+def save_manifest(manifest):
+    """Écriture atomique du manifeste (fichier temporaire renommé)."""
+    os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+    tmp = f"{MANIFEST_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+def input_changed(entry, filepath):
+    """Vrai si le fichier doit être renettoyé.
+
+    Taille et date de modification inchangées : fichier inchangé sans le relire.
+    Sinon l'empreinte du contenu tranche (un fichier réécrit à l'identique n'est pas renettoyé).
+    """
+    if entry is None or not os.path.exists(PARTITIONS_DIR / entry["partition"]):
+        return True
+    stat = os.stat(filepath)
+    if entry["sha256"] is not None and (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+        return False
+    if entry["sha256"] is not None and file_hash(filepath) == entry["sha256"]:
+        entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        return False
+    return True
 
-        try:
-            sep = detect_separator(f)
-            df = pd.read_csv(f, sep=sep, engine="python")
-            df_clean = clean_seloger(df, dept)
-            all_dfs.append(df_clean)
-        except Exception as e:
-            print(f"❌ ERREUR fichier {f} : {e}")
 
-    if not all_dfs:
-        print("⚠ Aucun fichier SeLoger chargé.")
-        return pd.DataFrame()
+# =====================================================
+# NETTOYAGE DES FICHIERS MODIFIÉS
+# =====================================================
 
-    return pd.concat(all_dfs, ignore_index=True)
+def clean_file(source, filepath, partition_path):
+    """Lecture et nettoyage d'un fichier source, exécuté dans un processus du pool.
+
+    Le résultat est écrit dans sa partition Parquet (fichier temporaire renommé) plutôt que renvoyé :
+    pas de DataFrame picklé entre les processus.
+    Les descriptions SeLoger peuvent contenir des retours à la ligne entre guillemets.
+    Retourne (nombre de lignes, départements présents, None) ou (None, None, message d'erreur).
+    """
+    try:
+        if source == "notaires":
+            df_clean = load_notaires(filepath)
+        else:
+            df = read_csv_arrow(filepath, SELOGER_TYPES, newlines_in_values=True)
+            df_clean = clean_seloger(df, extract_departement_from_filename(filepath))
+        os.makedirs(os.path.dirname(partition_path), exist_ok=True)
+        tmp = f"{partition_path}.tmp"
+        pq.write_table(pa.Table.from_pandas(df_clean, preserve_index=False), tmp)
+        os.replace(tmp, partition_path)
+        departements = sorted(df_clean["departement"].dropna().astype(str).unique())
+        if df_clean["departement"].isna().any():
+            departements.append(None)
+        return len(df_clean), departements, None
+    except Exception as e:
+        return None, None, str(e)
+
+def update_partitions(manifest):
+    """Renettoie les fichiers nouveaux ou modifiés et retire les partitions des fichiers supprimés.
+
+    Les fichiers sont répartis sur NB_PROCESSUS processus. Un fichier en erreur garde sa partition
+    précédente. Retourne les clés (source, département) de la base fusionnée à réécrire :
+    départements des fichiers modifiés ou supprimés, avant et après nettoyage.
+    """
+    inputs = list_inputs()
+    keys = {input_key(f) for _, f in inputs}
+    touched = set()
+
+    for key in [key for key in manifest["files"] if key not in keys]:
+        print(f"🗑️ {key} supprimé : partition retirée")
+        entry = manifest["files"].pop(key)
+        (PARTITIONS_DIR / entry["partition"]).unlink(missing_ok=True)
+        touched.update((entry["source"], d) for d in entry.get("departements", []))
+
+    todo = [(source, f) for source, f in inputs if input_changed(manifest["files"].get(input_key(f)), f)]
+    print(f"\n=== {len(todo)} fichiers à nettoyer sur {len(inputs)} ===")
+    if not todo:
+        return touched
+
+    partitions = [Path(source) / f"{Path(f).stem}.parquet" for source, f in todo]
+    # Empreinte calculée avant le nettoyage : un fichier modifié pendant la fusion sera renettoyé la fois suivante
+    fingerprints = [(os.stat(f), file_hash(f)) for _, f in todo]
+    with ProcessPoolExecutor(max_workers=min(NB_PROCESSUS, len(todo))) as executor:
+        results = executor.map(clean_file, [source for source, _ in todo], [f for _, f in todo],
+                               [str(PARTITIONS_DIR / partition) for partition in partitions])
+        for (source, f), partition, (stat, sha), (rows, departements, error) in zip(todo, partitions, fingerprints, results):
+            if error is not None:
+                print(f"❌ ERREUR fichier {f} : {error}")
+                continue
+            print(f"➡️ {os.path.basename(f)}  ({source}, {rows} annonces)")
+            previous = manifest["files"].get(input_key(f))
+            if previous is not None:
+                touched.update((previous["source"], d) for d in previous.get("departements", []))
+            touched.update((source, d) for d in departements)
+            manifest["files"][input_key(f)] = {
+                "source": source, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha,
+                "partition": partition.as_posix(), "rows": rows, "departements": departements,
+            }
+    return touched
 
 
 # =====================================================
-# CHARGEMENT NOTAIRES
+# BASE FUSIONNÉE : DATASET PARQUET PARTITIONNÉ
 # =====================================================
-
-def load_notaires(filepath):
-    print(f"\n=== Chargement Notaires ===")
-    sep = detect_separator(filepath)
-    df = pd.read_csv(filepath, sep=sep, engine="python", header=None)
-    return clean_notaires(df)
+# La base fusionnée est un dataset Parquet partitionné à la Hive :
+#   base_fusionnee/source=seloger/departement=75/part-0.parquet
+# Un lecteur ne charge que les partitions et les colonnes dont il a besoin (voir load_base
+# et l'application Streamlit). Seules les partitions des départements touchés par des fichiers
+# modifiés sont réécrites. Compression zstd, encodage dictionnaire et statistiques par groupe de lignes.
+
+def partition_dir(source, departement):
+    """Dossier d'une partition de la base fusionnée (département inconnu : partition par défaut de Hive)."""
+    return OUTPUT_DATASET / f"source={source}" / f"departement={departement or '__HIVE_DEFAULT_PARTITION__'}"
+
+def read_rows(manifest, source, departements):
+    """Lignes nettoyées d'une source pour un ensemble de départements, au schéma de la base."""
+    mask_values = pa.array([d for d in departements if d is not None], pa.string())
+    tables = []
+    for entry in manifest["files"].values():
+        if entry["source"] != source or not set(entry.get("departements", [])) & departements:
+            continue
+        table = pq.read_table(PARTITIONS_DIR / entry["partition"])
+        column = table.column("departement").cast(pa.string())
+        mask = pc.is_in(column, value_set=mask_values)
+        if None in departements:
+            mask = pc.or_kleene(mask, pc.is_null(column))
+        tables.append(table.filter(mask))
+    if not tables:
+        return BASE_SCHEMA.empty_table()
+    # Colonnes absentes de certaines partitions complétées par des valeurs nulles
+    full = pa.concat_tables(tables, promote_options="permissive")
+    return fit_schema(full.select(BASE_COLUMNS))
+
+def fit_schema(table):
+    """Conversion au schéma compact de la base : les entiers hors de l'intervalle int32 deviennent nuls (comptés et signalés)."""
+    columns = []
+    for field in BASE_SCHEMA:
+        column = table.column(field.name)
+        if field.type == pa.int32() and column.type != pa.null():
+            column = column.cast(pa.float64())
+            in_range = pc.and_kleene(pc.greater_equal(column, -2**31), pc.less(column, 2**31))
+            nb_out = pc.sum(pc.invert(in_range)).as_py() or 0
+            if nb_out:
+                print(f"⚠ {field.name} : {nb_out} valeurs hors de l'intervalle int32 remplacées par des valeurs nulles")
+            column = pc.if_else(in_range, column, pa.scalar(None, pa.float64()))
+        columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=BASE_SCHEMA)
+
+def write_base(manifest, keys):
+    """Réécrit les partitions (source, département) de la base fusionnée."""
+    by_source = {}
+    for source, departement in keys:
+        by_source.setdefault(source, set()).add(departement)
+    for source, departements in by_source.items():
+        table = read_rows(manifest, source, departements)
+        # existing_data_behavior="delete_matching" : seules les partitions écrites sont remplacées
+        ds.write_dataset(table, OUTPUT_DATASET, format="parquet", partitioning=PARTITIONING,
+                         file_options=PARQUET_OPTIONS, basename_template="part-{i}.parquet",
+                         existing_data_behavior="delete_matching")
+        # Départements qui n'ont plus aucune ligne
+        present = set(pc.unique(table.column("departement")).to_pylist())
+        for departement in departements - present:
+            shutil.rmtree(partition_dir(source, departement), ignore_errors=True)
+
+def to_compact_pandas(table):
+    """DataFrame compact : catégories, Int32/float32 et chaînes Arrow (voir BASE_SCHEMA)."""
+    for name in CATEGORY_COLUMNS:
+        if name in table.column_names and not pa.types.is_dictionary(table.schema.field(name).type):
+            table = table.set_column(table.column_names.index(name), name, pc.dictionary_encode(table.column(name)))
+    return table.to_pandas(types_mapper=COMPACT_PANDAS_TYPES.get)
+
+def load_base(columns=None, filter=None):
+    """Charge la base fusionnée (colonnes et filtre pyarrow.compute poussés jusqu'aux fichiers Parquet)."""
+    dataset = ds.dataset(OUTPUT_DATASET, format="parquet", partitioning=PARTITIONING)
+    return to_compact_pandas(dataset.to_table(columns=columns or BASE_COLUMNS, filter=filter))
+
+def memory_report():
+    """Compare la mémoire de la base chargée en pandas avant et après le schéma compact.
+
+    Avant : base_fusionnee.csv relu par pd.read_csv, comme le faisait l'application avant le dataset Parquet.
+    Sans ce fichier (--sans-csv), la mesure « avant » est une estimation : la base compacte convertie
+    en objets Python, Int64 et float64.
+    """
+    dataset = ds.dataset(OUTPUT_DATASET, format="parquet", partitioning=PARTITIONING)
+    table = dataset.to_table(columns=BASE_COLUMNS)
+    after = to_compact_pandas(table)
+
+    if OUTPUT_CSV.exists():
+        before = pd.read_csv(OUTPUT_CSV, low_memory=False)
+        label = "avant (pd.read_csv)"
+    else:
+        wide = pa.schema([
+            (f.name, pa.string() if pa.types.is_dictionary(f.type) or pa.types.is_string(f.type)
+             else pa.int64() if pa.types.is_integer(f.type) else pa.float64())
+            for f in table.schema
+        ])
+        before = table.cast(wide).to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+        for f in wide:
+            if f.type == pa.string():
+                before[f.name] = before[f.name].astype(object)
+        label = "avant (estimation)"
+
+    size_before = before.memory_usage(deep=True, index=False)
+    size_after = after.memory_usage(deep=True, index=False)
+    mo = 2 ** 20
+    print(f"\n📊 Mémoire de la base chargée en pandas ({len(after):,} lignes) :")
+    print(f"{'colonne':<13} {label:>25} {'Mo':>8}   {'après':>16} {'Mo':>8}")
+    for name in BASE_COLUMNS:
+        print(f"{name:<13} {str(before[name].dtype):>25} {size_before[name] / mo:>8.1f}   "
+              f"{str(after[name].dtype):>16} {size_after[name] / mo:>8.1f}")
+    total_before, total_after = size_before.sum(), size_after.sum()
+    print(f"{'total':<13} {'':>25} {total_before / mo:>8.1f}   {'':>16} {total_after / mo:>8.1f}"
+          f"   (÷{total_before / max(total_after, 1):.1f})")
+    print(f"octets par ligne : {total_before / max(len(after), 1):.0f} → {total_after / max(len(after), 1):.0f}"
+          f" (fichiers Parquet : {sum(f.stat().st_size for f in OUTPUT_DATASET.rglob('*.parquet')) / max(len(after), 1):.0f})")
+
+def export_csv(output_csv):
+    """Exporte la base fusionnée dans base_fusionnee.csv, au format de l'ancienne fusion (pandas to_csv), lot par lot.
+
+    Le fichier est écrit à côté puis renommé : un export interrompu ne laisse pas de CSV tronqué.
+    """
+    dataset = ds.dataset(OUTPUT_DATASET, format="parquet", partitioning=PARTITIONING)
+    tmp_csv = output_csv.with_name(output_csv.name + ".tmp")
+    header = True
+    with open(tmp_csv, "w", newline="", encoding="utf-8") as f:
+        for batch in dataset.to_batches(columns=BASE_COLUMNS):
+            to_compact_pandas(pa.Table.from_batches([batch])).to_csv(f, index=False, header=header)
+            header = False
+        if header:
+            pd.DataFrame(columns=BASE_COLUMNS).to_csv(f, index=False)
+    os.replace(tmp_csv, output_csv)
 
 
 # =====================================================
 # FUSION GÉNÉRALE
 # =====================================================
 
-def merge_all():
-    df_notaires = load_notaires(NOTAIRES_FILE)
-    df_seloger = load_seloger_folder(SELOGER_FOLDER)
-
-    full = pd.concat([df_notaires, df_seloger], ignore_index=True)
-
-    # Format final
-    ordered = [
-        "id","prix","surface","prix_m2","nb_pieces","nb_chambres",
-        "type_bien","ville","cp","departement","latitude","longitude",
-        "description","url","source"
-    ]
-
-    return full[ordered]
+def merge_all(force=False):
+    """Met à jour les partitions des fichiers modifiés et réécrit les départements concernés de la base.
+
+    force : réécrit toute la base. Retourne le nombre de partitions (source, département) réécrites.
+    """
+    manifest = load_manifest()
+    touched = update_partitions(manifest)
+
+    full = force or not OUTPUT_DATASET.exists()
+    if full:
+        keys = {(entry["source"], d) for entry in manifest["files"].values() for d in entry.get("departements", [])}
+    else:
+        # Départements d'une fusion précédente interrompue avant l'écriture de la base
+        keys = touched | {tuple(key) for key in manifest.get("pending", [])}
+    # Les départements à réécrire sont gardés dans le manifeste jusqu'à la fin de l'écriture
+    manifest["pending"] = sorted(keys, key=lambda key: (key[0], key[1] or ""))
+    save_manifest(manifest)
+
+    if not keys:
+        print("\n✅ Aucun fichier source modifié depuis la dernière fusion")
+        return 0
+    if full:
+        shutil.rmtree(OUTPUT_DATASET, ignore_errors=True)
+    write_base(manifest, keys)
+    manifest["pending"] = []
+    save_manifest(manifest)
+    return len(keys)
 
 
 # =====================================================
@@ -191,18 +588,19 @@ def merge_all():
 # =====================================================
 
 if __name__ == "__main__":
-    df = merge_all()
-
-    # Créer le dossier de sortie s'il n'existe pas
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    
-    output_csv = OUTPUT_DIR / "base_fusionnee.csv"
-    output_parquet = OUTPUT_DIR / "base_fusionnee.parquet"
-    
-    df.to_csv(output_csv, index=False)
-    df.to_parquet(output_parquet, index=False)
+    # --force : réécrit toute la base ; --sans-csv : n'écrit pas base_fusionnee.csv
+    # --memoire : rapport mémoire même si la base n'a pas changé
+    nb_partitions = merge_all(force="--force" in sys.argv[1:])
+    write_csv = "--sans-csv" not in sys.argv[1:]
+    # Le CSV n'est réécrit que si la base a changé (ou s'il n'existe pas encore)
+    if write_csv and (nb_partitions or not OUTPUT_CSV.exists()):
+        export_csv(OUTPUT_CSV)
+    if nb_partitions or "--memoire" in sys.argv[1:]:
+        memory_report()
 
     print("\n🎉 Fusion terminée !")
-    print(f"📁 Fichiers générés :")
-    print(f"   - {output_csv}")
-    print(f"   - {output_parquet}\n")
+    print(f"📁 {nb_partitions} partitions (source, département) réécrites dans :")
+    print(f"   - {OUTPUT_DATASET}")
+    if write_csv:
+        print(f"   - {OUTPUT_CSV}")
+    print()
@@ -1,89 +1,20 @@
-import requests
-import pandas as pd
-from tqdm import tqdm
-
-BASE_URL = "https://www.immobilier.notaires.fr/pub-services/inotr-www-annonces/v1/annonces"
-
-HEADERS = {
-    "User-Agent": "Mozilla/5.0",
-    "Accept": "application/json"
-}
-
-def get_page(page=1, par_page=50):
-    params = {
-        "offset": 0,
-        "page": page,
-        "parPage": par_page,
-        "perimetre": 0,
-        "departements": 75,
-        "typeTransaction": "VENTE,VNI,VAE"
-    }
-
-    r = requests.get(BASE_URL, params=params, headers=HEADERS)
-
-    # si l'API renvoie 400 → on s'arrête
-    if r.status_code == 400:
-        print(f"Page {page} → 400 Bad Request (probablement plus de pages).")
-        return None
-
-    r.raise_for_status()
-    return r.json()
+import sys
+from pathlib import Path
 
+# Accès aux briques communes des scrapers (dossier scrapper/commun)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from commun.ordonnanceur import executer_sources
+from source_notaires import SourceNotaires, charger_export, JOURNAL_FILE, INDEX_FILE
 
+# Mêmes colonnes que l'ancien export de Paris (sans colonne departement)
+# return: DataFrame des annonces exportées dans notaires_paris_api.csv, None si la récupération est à reprendre
 def scrape_paris(max_pages=200, par_page=50):
-    all_rows = []
-
-    for page in tqdm(range(1, max_pages+1), desc="Scraping Paris"):
-        data = get_page(page, par_page)
-
-        if data is None:
-            print(f"Arrêt du scraping à la page {page}.")
-            break
-
-        annonces = data.get("annonceResumeDto", [])
-
-        if not annonces:
-            print(f"Aucune annonce renvoyée à la page {page}. Fin du scraping.")
-            break
-
-        print(f"Page {page} → {len(annonces)} annonces.")
-
-        for a in annonces:
-            prix = a.get("prixAffiche")
-            surface = a.get("surface")
-            prix_m2 = None
-
-            if prix and surface:
-                try:
-                    prix_m2 = round(prix / surface, 2)
-                except:
-                    prix_m2 = None
-
-            row = {
-                "id": a.get("id"),
-                "prix": prix,
-                "surface_m2": surface,
-                "prix_m2": prix_m2,
-                "nb_pieces": a.get("nbPieces"),
-                "nb_chambres": a.get("nbChambres"),
-                "type_bien": a.get("typeBien"),
-                "cp": a.get("codePostal"),
-                "commune": a.get("communeNom"),
-                "localite": a.get("localiteNom"),
-                "statut": a.get("statut"),
-                "date_maj": a.get("dateMaj"),
-                "url": a.get("urlDetailAnnonceFr"),
-                "photo": a.get("urlPhotoPrincipale"),
-            }
-
-            all_rows.append(row)
-
-    df = pd.DataFrame(all_rows)
-    df.to_csv("notaires_paris_api.csv", index=False)
-    print(f"Export → notaires_paris_api.csv ({len(df)} lignes)")
-    return df
+    source = SourceNotaires([75], nom="notaires_75", fichier_csv="notaires_paris_api.csv",
+                            par_page=par_page, max_pages=max_pages, colonne_departement=False)
+    return charger_export(source, executer_sources([source], JOURNAL_FILE, INDEX_FILE)[source.nom])
 
 
 if __name__ == "__main__":
     df = scrape_paris()
-    print(df.head())
+    if df is not None:
+        print(df.head())
@@ -0,0 +1,235 @@
+# Ce fichier contient la source Notaires (API de immobilier.notaires.fr) pour l'ordonnanceur commun
+# (scrapper/commun/ordonnanceur.py): une unité par département.
+# La recherche renvoie déjà toutes les informations des annonces, il n'y a pas de requête de détail.
+# Les scripts scraper_notaires_75.py, scraper_notaires_top10.py et scraper_notaires_france.py
+# ne diffèrent que par la liste des départements et le fichier CSV produit.
+import sys
+import threading
+from pathlib import Path
+import pandas as pd
+
+# Accès aux briques communes des scrapers (dossier scrapper/commun)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from commun import transport
+from commun.source import Source
+from commun.schema import Schema, champ
+from commun.reprises import PageEchouee
+from commun.affichage import afficher
+
+BASE_URL = "https://www.immobilier.notaires.fr/pub-services/inotr-www-annonces/v1/annonces"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json"
+}
+
+# Session HTTP partagée (keep-alive) pour l'hôte de l'API, les entêtes y sont appliqués une fois
+NOTAIRES_HOST = "www.immobilier.notaires.fr"
+transport.configurer_hote(NOTAIRES_HOST, headers=HEADERS)
+# Débit adaptatif (requêtes/seconde) selon les réponses de l'API
+transport.limiteur.configurer_hote(NOTAIRES_HOST, debit_initial=2.0, debit_max=10.0)
+
+# Fichiers produits (CSV, fichiers des départements en cours, journal et index) rangés à côté des scripts,
+# quel que soit le dossier d'où ils sont lancés (comme seloger/config.py)
+NOTAIRES_DIR = Path(__file__).resolve().parent
+# Journal de reprise et index des annonces vues (empreinte, dates de première et dernière apparition)
+JOURNAL_FILE = NOTAIRES_DIR / "journal_notaires_france.sqlite"
+INDEX_FILE = NOTAIRES_DIR / "index_annonces_notaires.sqlite"
+
+# Nombre total d'annonces du département annoncé par l'API dans la première page
+# Plusieurs noms de champ sont essayés, None si aucun n'est présent.
+# Aucun de ces noms n'est encore confirmé par une vraie réponse de l'API (le serveur simulé du benchmark
+# envoie nbTotalAnnonces, il ne le confirme donc pas): tant que ce n'est pas fait, les pages peuvent être
+# parcourues l'une après l'autre, comme avant la planification d'après le total.
+# Pour vérifier: python source_notaires.py 75 reponse_notaires.json (première page enregistrée telle quelle)
+CHAMPS_TOTAL = ("nbTotalAnnonces", "nombreTotalAnnonces", "totalElements", "nbResultats", "total")
+
+# Champs gardés de chaque élément de annonceResumeDto
+SCHEMA_ANNONCE = Schema('AnnonceNotaires', {
+    "id": champ("id"),
+    "prix": champ("prixAffiche"),
+    "surface_m2": champ("surface"),
+    "nb_pieces": champ("nbPieces"),
+    "nb_chambres": champ("nbChambres"),
+    "type_bien": champ("typeBien"),
+    "cp": champ("codePostal"),
+    "commune": champ("communeNom"),
+    "localite": champ("localiteNom"),
+    "statut": champ("statut"),
+    "date_maj": champ("dateMaj"),
+    "url": champ("urlDetailAnnonceFr"),
+    "photo": champ("urlPhotoPrincipale"),
+})
+
+# Champs des annonces décodées qui entrent dans l'empreinte (récupération incrémentale), pas l'url de la photo
+SCHEMA_EMPREINTE = Schema('EmpreinteNotaires', {
+    nom: champ(nom) for nom in ("prix", "surface_m2", "nb_pieces", "nb_chambres", "type_bien", "statut", "date_maj")
+})
+
+# Champs gardés d'une page de résultats: les annonces et le nombre total d'annonces
+SCHEMA_PAGE = Schema('PageNotaires', {
+    "annonces": champ("annonceResumeDto", defaut=[], liste=SCHEMA_ANNONCE),
+    **{nom: champ(nom) for nom in CHAMPS_TOTAL},
+})
+
+# departement: code du département envoyé tel quel à l'API (ex: "06", ou "6" pour scraper_notaires_france.py)
+# return: page décodée (dictionnaire avec la liste 'annonces' et les champs de CHAMPS_TOTAL), None si 400
+def get_page(page: int, par_page: int, departement):
+    params = {
+        "offset": 0,
+        "page": page,
+        "parPage": par_page,
+        "perimetre": 0,
+        "departements": str(departement),
+        "typeTransaction": "VENTE,VNI,VAE"
+    }
+
+    r = transport.get(BASE_URL, params=params)
+
+    if r.status_code == 400:  # plus de pages
+        return None
+
+    # Erreur après les nouvelles tentatives de transport: la page est en échec (pas la fin des résultats)
+    if r.status_code != 200:
+        raise PageEchouee(f"Erreur HTTP {r.status_code}: département {departement}, page {page}")
+    return SCHEMA_PAGE.decoder_objet(r.content)
+
+
+def extraire_total(data):
+    for champ in CHAMPS_TOTAL:
+        total = data.get(champ)
+        if isinstance(total, (int, float)) and total >= 0:
+            return int(total)
+    return None
+
+# Les noms de CHAMPS_TOTAL ne sont pas confirmés: si aucun n'est dans la réponse,
+# les pages ne peuvent pas être planifiées d'après le total et sont parcourues l'une après l'autre.
+# Le message est affiché une seule fois par lancement.
+_total_absent_signale = threading.Event()
+
+def signaler_total_absent():
+    if not _total_absent_signale.is_set():
+        _total_absent_signale.set()
+        afficher(f"Notaires: nombre total d'annonces absent de la première page (champs essayés: {', '.join(CHAMPS_TOTAL)}),"
+                 f" pages parcourues l'une après l'autre")
+
+
+# Extraction de la ligne d'une annonce décodée avec SCHEMA_ANNONCE
+def extraire_ligne(a, dep):
+    prix = a["prix"]
+    surface = a["surface_m2"]
+    prix_m2 = None
+
+    if prix and surface:
+        try:
+            prix_m2 = round(prix / surface, 2)
+        except Exception:
+            prix_m2 = None
+
+    return {
+        "departement": dep,
+        "id": a["id"],
+        "prix": prix,
+        "surface_m2": surface,
+        "prix_m2": prix_m2,
+        "nb_pieces": a["nb_pieces"],
+        "nb_chambres": a["nb_chambres"],
+        "type_bien": a["type_bien"],
+        "cp": a["cp"],
+        "commune": a["commune"],
+        "localite": a["localite"],
+        "statut": a["statut"],
+        "date_maj": a["date_maj"],
+        "url": a["url"],
+        "photo": a["photo"],
+    }
+
+
+# departements: liste des numéros de départements (entiers)
+# nom: nom de la source dans le journal et l'index (un nom par périmètre, pour suivre les annonces retirées)
+# fichier_csv: fichier où toutes les annonces sont exportées à la fin (nom relatif: dans NOTAIRES_DIR)
+# budget_requetes: nombre maximal de requêtes d'un passage, les départements les moins frais d'abord
+#                  (les lignes des autres départements sont gardées du fichier précédent), None pour tout parcourir
+# deux_chiffres: département sur deux chiffres ("06") envoyé à l'API et écrit dans la colonne departement,
+#                sinon le numéro tel quel ("6" à l'API, 6 dans la colonne), comme scraper_notaires_france.py l'a toujours fait
+# colonne_departement: colonne departement en tête des lignes (False: colonnes de l'ancien notaires_paris_api.csv,
+#                      le fichier est alors toujours réécrit en entier)
+class SourceNotaires(Source):
+    host = NOTAIRES_HOST
+    colonne_unite = "departement"
+    schema_empreinte = SCHEMA_EMPREINTE
+
+    def __init__(self, departements, nom="notaires", fichier_csv="notaires_france.csv",
+                 par_page=50, max_pages=200, concurrency=4, budget_requetes=None, deux_chiffres=True,
+                 colonne_departement=True):
+        self.departements = departements
+        self.nom = nom
+        self.dossier = NOTAIRES_DIR
+        self.fichier_csv = None if fichier_csv is None else NOTAIRES_DIR / fichier_csv
+        self.par_page = par_page
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.budget_requetes = budget_requetes
+        self.deux_chiffres = deux_chiffres
+        if not colonne_departement:
+            self.colonne_unite = None
+
+    def configurer(self):
+        # Le pool de connexions doit couvrir toutes les requêtes simultanées
+        transport.configurer_hote(NOTAIRES_HOST, headers=HEADERS,
+                                  pool_maxsize=max(transport.POOL_MAXSIZE, self.concurrency))
+
+    # 'code': département envoyé à l'API, 'colonne': valeur de la colonne departement des lignes
+    def unites(self):
+        return [{'cle': f"{dep:02d}", 'nom': f"département {dep:02d}", 'departement': dep,
+                 'code': f"{dep:02d}" if self.deux_chiffres else str(dep),
+                 'colonne': f"{dep:02d}" if self.deux_chiffres else dep} for dep in self.departements]
+
+    def valeur_unite(self, unite):
+        return str(unite['colonne'])
+
+    def chercher(self, unite, page):
+        data = get_page(page, self.par_page, unite['code'])
+        if data is None:
+            return [], None
+        annonces = [a for a in data["annonces"] if a["id"] is not None]
+        total = extraire_total(data)
+        if page == 1 and annonces and total is None:
+            signaler_total_absent()
+        return annonces, total
+
+    def vers_ligne(self, unite, annonce):
+        ligne = extraire_ligne(annonce, unite['colonne'])
+        if self.colonne_unite is None:
+            del ligne["departement"]
+        return ligne
+
+# DataFrame des annonces exportées par une source dans son fichier_csv
+# (les scripts scraper_notaires_*.py renvoient ce DataFrame, comme avant l'ordonnanceur commun)
+# nb_lignes: résultat de l'ordonnanceur pour la source
+# return: DataFrame, None si la récupération est à reprendre
+def charger_export(source, nb_lignes):
+    if nb_lignes is None:
+        return None
+    if not nb_lignes or not Path(source.fichier_csv).exists():
+        return pd.DataFrame()
+    # Départements sur deux chiffres gardés en texte ("06")
+    return pd.read_csv(source.fichier_csv,
+                       dtype={"departement": str} if source.deux_chiffres and source.colonne_unite else None)
+
+# Enregistre la première page d'un département telle que l'API la renvoie
+# et affiche ses champs, pour confirmer le nom du champ du nombre total d'annonces
+def enregistrer_premiere_page(departement, chemin, par_page=50):
+    r = transport.get(BASE_URL, params={"offset": 0, "page": 1, "parPage": par_page, "perimetre": 0,
+                                        "departements": str(departement), "typeTransaction": "VENTE,VNI,VAE"})
+    r.raise_for_status()
+    Path(chemin).write_bytes(r.content)
+    data = r.json()
+    champs = sorted(data) if isinstance(data, dict) else []
+    afficher(f"Réponse enregistrée dans {chemin}, champs: {', '.join(champs)}")
+    trouves = [champ for champ in CHAMPS_TOTAL if champ in champs]
+    afficher(f"Champs de CHAMPS_TOTAL présents: {', '.join(trouves) or 'aucun'}")
+
+if __name__ == '__main__':
+    enregistrer_premiere_page(sys.argv[1] if len(sys.argv) > 1 else "75",
+                              sys.argv[2] if len(sys.argv) > 2 else "reponse_notaires.json")
@@ -0,0 +1,168 @@
+# Ce fichier contient le benchmark de débit des scrapers SeLoger et Notaires
+# Les scrapers sont lancés contre le serveur simulé (serveur_simule.py) à plusieurs niveaux de concurrence,
+# les requêtes vers www.seloger.com et www.immobilier.notaires.fr sont redirigées vers le serveur local
+# (transport.rediriger_hote). Pour chaque lancement on mesure:
+# - le nombre d'annonces écrites par seconde,
+# - la latence des requêtes (p50, p95), du départ de la requête à la réception des entêtes,
+# - le pic de mémoire allouée par python pendant le lancement (tracemalloc).
+# Par défaut le limiteur de débit est réglé très haut pour mesurer la capacité des scrapers eux-mêmes,
+# --debit-reel garde les budgets des sites (on mesure alors surtout le limiteur).
+# Le champ du nombre total d'annonces des pages Notaires n'est pas confirmé sur la vraie API:
+# --sans-total-notaires mesure Notaires sans ce champ (pages parcourues l'une après l'autre),
+# le cas à retenir tant qu'une vraie réponse ne l'a pas confirmé.
+# Utilisation: python benchmark.py --concurrency 1 2 4 8 --departements 4 --latence 0.05 --json resultats.json
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+DOSSIER_SCRAPPER = Path(__file__).resolve().parent.parent
+sys.path.append(str(DOSSIER_SCRAPPER))
+for sous_dossier in ('seloger', 'Notaires'):
+    sys.path.append(str(DOSSIER_SCRAPPER / sous_dossier))
+
+from commun import transport
+from commun.journal_crawl import JournalCrawl
+from commun.index_annonces import IndexAnnonces
+from commun.ordonnanceur import executer_sources
+from serveur_simule import ServeurSimule, ConfigServeur
+import scrapper_seloger
+from scrapper_seloger_async import execution_async
+from source_notaires import SourceNotaires, NOTAIRES_HOST
+from config import SELOGER_HOST
+
+# Débit (requêtes/seconde) donné au limiteur quand les budgets des sites ne sont pas gardés
+DEBIT_BENCH = 10000.0
+
+# Percentile d'une liste de valeurs (méthode du rang le plus proche)
+def percentile(valeurs, p):
+    if not valeurs:
+        return None
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, max(0, round(p / 100 * len(valeurs)) - 1))]
+
+# Nombre de lignes (hors entête) des fichiers CSV du dossier correspondant au motif
+def compter_lignes(dossier, motif):
+    total = 0
+    for chemin in dossier.glob(motif):
+        with open(chemin, 'rb') as f:
+            total += max(0, sum(1 for _ in f) - 1)
+    return total
+
+# Enregistre la latence de chaque réponse reçue par la couche HTTP
+@contextlib.contextmanager
+def mesurer_latences():
+    latences = []
+    request_origine = transport.request
+    def request_mesuree(method, url, **kwargs):
+        response = request_origine(method, url, **kwargs)
+        latences.append(response.elapsed.total_seconds())
+        return response
+    transport.request = request_mesuree
+    try:
+        yield latences
+    finally:
+        transport.request = request_origine
+
+def lancer_seloger(dossier, concurrency, nb_departements):
+    # Les fichiers des départements sont écrits dans le dossier temporaire du lancement
+    scrapper_seloger.DEPARTEMENTS_DIR = dossier
+    departements = [{'numero': f"B{i}", 'nom': f"Bench{i}", 'id': f"AD06BENCH{i}"} for i in range(nb_departements)]
+    journal = JournalCrawl(dossier / 'journal.sqlite')
+    index = IndexAnnonces(dossier / 'index.sqlite')
+    try:
+        asyncio.run(execution_async(departements, concurrency, journal=journal, index=index))
+    finally:
+        journal.fermer()
+        index.fermer()
+    return compter_lignes(dossier, 'seloger_dep_*.csv')
+
+def lancer_notaires(dossier, concurrency, nb_departements):
+    source = SourceNotaires(list(range(1, nb_departements + 1)), nom='notaires_bench', fichier_csv=None,
+                            concurrency=concurrency)
+    source.dossier = dossier
+    executer_sources([source], dossier / 'journal.sqlite', dossier / 'index.sqlite')
+    return compter_lignes(dossier, 'notaires_bench_*.csv')
+
+LANCEURS = {'seloger': (lancer_seloger, SELOGER_HOST), 'notaires': (lancer_notaires, NOTAIRES_HOST)}
+
+# Un lancement d'une source à un niveau de concurrence, contre un serveur simulé neuf
+# return: dictionnaire des mesures
+def mesurer(nom_source, concurrency, config, nb_departements, debit_reel):
+    lanceur, host = LANCEURS[nom_source]
+    serveur = ServeurSimule(config)
+    transport.rediriger_hote(host, serveur.demarrer())
+    if not debit_reel:
+        transport.limiteur.configurer_hote(host, debit_initial=DEBIT_BENCH, debit_max=DEBIT_BENCH, capacite=DEBIT_BENCH)
+
+    with tempfile.TemporaryDirectory() as temporaire, mesurer_latences() as latences:
+        tracemalloc.start()
+        debut = time.perf_counter()
+        # Les scrapers affichent chaque page: la sortie est mise de côté pendant la mesure
+        with contextlib.redirect_stdout(io.StringIO()):
+            nb_annonces = lanceur(Path(temporaire), concurrency, nb_departements)
+        duree = time.perf_counter() - debut
+        _, pic_memoire = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    compteurs = serveur.compteurs()
+    serveur.arreter()
+    transport.rediriger_hote(host, None)
+    p50, p95 = percentile(latences, 50), percentile(latences, 95)
+    return {
+        'source': nom_source,
+        'concurrency': concurrency,
+        'annonces': nb_annonces,
+        'duree_s': round(duree, 3),
+        'annonces_par_s': round(nb_annonces / duree, 1),
+        'requetes': len(latences),
+        'p50_ms': None if p50 is None else round(p50 * 1000, 1),
+        'p95_ms': None if p95 is None else round(p95 * 1000, 1),
+        'reponses_429': compteurs.get('429', 0),
+        'reponses_500': compteurs.get('500', 0),
+        'memoire_max_mo': round(pic_memoire / 1e6, 2),
+    }
+
+def afficher(resultats):
+    colonnes = ['source', 'concurrency', 'annonces', 'duree_s', 'annonces_par_s', 'requetes',
+                'p50_ms', 'p95_ms', 'reponses_429', 'reponses_500', 'memoire_max_mo']
+    largeurs = [max(len(c), *(len(str(r[c])) for r in resultats)) for c in colonnes]
+    print(' | '.join(c.ljust(l) for c, l in zip(colonnes, largeurs)))
+    print('-+-'.join('-' * l for l in largeurs))
+    for r in resultats:
+        print(' | '.join(str(r[c]).ljust(l) for c, l in zip(colonnes, largeurs)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark des scrapers contre le serveur simulé")
+    parser.add_argument('--sources', nargs='+', default=list(LANCEURS), choices=list(LANCEURS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--departements', type=int, default=4)
+    parser.add_argument('--annonces', type=int, default=300, help="annonces par département")
+    parser.add_argument('--latence', type=float, default=0.05, help="latence du serveur en secondes")
+    parser.add_argument('--gigue', type=float, default=0.02)
+    parser.add_argument('--taux-erreur', type=float, default=0.0, help="proportion de réponses 500")
+    parser.add_argument('--taux-429', type=float, default=0.0, help="proportion de réponses 429")
+    parser.add_argument('--debit-reel', action='store_true', help="garder les budgets de débit des sites")
+    parser.add_argument('--sans-total-notaires', action='store_true',
+                        help="ne pas envoyer le nombre total d'annonces dans les pages Notaires")
+    parser.add_argument('--json', help="fichier où écrire les résultats")
+    args = parser.parse_args()
+
+    config = ConfigServeur(latence=args.latence, gigue=args.gigue, annonces_par_lieu=args.annonces,
+                           taux_erreur=args.taux_erreur, taux_429=args.taux_429,
+                           champ_total_notaires=None if args.sans_total_notaires else 'nbTotalAnnonces')
+    resultats = []
+    for nom_source in args.sources:
+        for concurrency in args.concurrency:
+            resultats.append(mesurer(nom_source, concurrency, config, args.departements, args.debit_reel))
+            print(f"{nom_source} concurrency={concurrency}: {resultats[-1]['annonces_par_s']} annonces/s", file=sys.stderr)
+
+    afficher(resultats)
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultats, indent=2), encoding='utf-8')
@@ -0,0 +1,186 @@
+# Ce fichier contient un serveur HTTP local qui imite les API utilisées par les scrapers:
+# - SeLoger: POST /serp-bff/search, GET /classifiedList/<id1>,<id2>,..., POST /search-mfe-bff/autocomplete
+# - Notaires: GET /pub-services/inotr-www-annonces/v1/annonces
+# Les réponses ont la même forme que celles des sites (seulement les champs lus par les scrapers),
+# avec une latence, un nombre d'annonces par lieu et des taux d'erreurs 5xx et de refus 429 réglables.
+# Il sert au benchmark (benchmark.py) et aux essais des scrapers sans toucher aux vrais sites:
+#   serveur = ServeurSimule(ConfigServeur(latence=0.05, taux_429=0.01))
+#   adresse = serveur.demarrer()
+#   transport.rediriger_hote("www.seloger.com", adresse)
+#   ...
+#   serveur.arreter()
+# Utilisation seule: python serveur_simule.py [port]
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+class ConfigServeur:
+    # latence, gigue: temps de réponse en secondes (latence +/- gigue)
+    # annonces_par_lieu: nombre d'annonces de chaque lieu (placeId SeLoger ou département Notaires)
+    # taille_page_max: nombre maximal d'annonces par page de recherche SeLoger (au-delà la taille est plafonnée)
+    # taux_erreur: proportion de réponses 500, taux_429: proportion de réponses 429 (avec Retry-After)
+    # champ_total_notaires: champ du nombre total d'annonces des pages Notaires, None pour ne pas l'envoyer.
+    #   Le nom du champ de la vraie API n'est pas confirmé (voir CHAMPS_TOTAL dans source_notaires.py):
+    #   le benchmark avec None mesure le parcours page après page, sans planification d'après le total
+    def __init__(self, latence=0.05, gigue=0.02, annonces_par_lieu=300, taille_page_max=50,
+                 taux_erreur=0.0, taux_429=0.0, retry_after=1, graine=0, champ_total_notaires='nbTotalAnnonces'):
+        self.latence = latence
+        self.gigue = gigue
+        self.annonces_par_lieu = annonces_par_lieu
+        self.taille_page_max = taille_page_max
+        self.taux_erreur = taux_erreur
+        self.taux_429 = taux_429
+        self.retry_after = retry_after
+        self.graine = graine
+        self.champ_total_notaires = champ_total_notaires
+
+# Annonce détaillée SeLoger (réponse de classifiedList)
+def annonce_seloger(id_annonce):
+    numero = sum(map(ord, id_annonce))
+    return {
+        'id': id_annonce,
+        'metadata': {'creationDate': '2025-11-30T10:00:00'},
+        'location': {'address': {'city': 'Ville', 'district': 'Centre', 'zipCode': '75001'}},
+        'rawData': {
+            'distributionType': 'Buy', 'propertyType': 'Apartment', 'price': 100000 + numero * 10,
+            'surface': {'main': 20 + numero % 100}, 'nbroom': 1 + numero % 6, 'nbbedroom': numero % 4,
+        },
+        'mainDescription': {'description': 'Appartement lumineux ' * 10},
+    }
+
+# Annonce Notaires (élément de annonceResumeDto)
+def annonce_notaires(departement, k):
+    return {
+        'id': int(departement) * 1000000 + k, 'prixAffiche': 150000 + k * 100, 'surface': 30 + k % 120,
+        'nbPieces': 1 + k % 6, 'nbChambres': k % 4, 'typeBien': 'APP', 'codePostal': f"{int(departement):02d}000",
+        'communeNom': 'Commune', 'localiteNom': 'Localité', 'statut': 'DISPONIBLE', 'dateMaj': '2025-11-30',
+        'urlDetailAnnonceFr': f"https://www.immobilier.notaires.fr/fr/annonce/{k}", 'urlPhotoPrincipale': '',
+    }
+
+class GestionnaireSimule(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def repondre(self, status, contenu, entetes=None):
+        corps = json.dumps(contenu).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corps)))
+        for cle, valeur in (entetes or {}).items():
+            self.send_header(cle, valeur)
+        self.end_headers()
+        self.wfile.write(corps)
+
+    # Latence simulée, puis erreur ou refus éventuel
+    # return: vrai si la requête a déjà reçu une réponse d'erreur
+    def simuler(self, endpoint):
+        serveur = self.server
+        config = serveur.config
+        time.sleep(max(0.0, config.latence + serveur.aleatoire.uniform(-config.gigue, config.gigue)))
+        tirage = serveur.aleatoire.random()
+        serveur.compter(endpoint)
+        if tirage < config.taux_429:
+            serveur.compter('429')
+            self.repondre(429, {'erreur': 'trop de requêtes'}, {'Retry-After': str(config.retry_after)})
+            return True
+        if tirage < config.taux_429 + config.taux_erreur:
+            serveur.compter('500')
+            self.repondre(500, {'erreur': 'erreur interne'})
+            return True
+        return False
+
+    def lire_json(self):
+        longueur = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(longueur) or b'{}')
+
+    def do_POST(self):
+        chemin = urlparse(self.path).path
+        payload = self.lire_json()
+        if chemin == '/serp-bff/search':
+            if self.simuler('search'):
+                return
+            config = self.server.config
+            place_id = payload['criteria']['location']['placeIds'][0]
+            page = payload['paging']['page']
+            taille = min(payload['paging']['size'], config.taille_page_max)
+            debut = (page - 1) * taille
+            ids = range(debut, min(debut + taille, config.annonces_par_lieu))
+            self.repondre(200, {'classifieds': [{'id': f"{place_id}-{k}", 'prix': k} for k in ids]})
+        elif chemin == '/search-mfe-bff/autocomplete':
+            if self.simuler('autocomplete'):
+                return
+            self.repondre(200, [{'id': f"AD06FR{payload.get('text', '')}", 'label': payload.get('text', '')}])
+        else:
+            self.repondre(404, {'erreur': chemin})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/classifiedList/'):
+            if self.simuler('classifiedList'):
+                return
+            ids = [i for i in unquote(url.path[len('/classifiedList/'):]).split(',') if i]
+            self.repondre(200, [annonce_seloger(i) for i in ids])
+        elif url.path == '/pub-services/inotr-www-annonces/v1/annonces':
+            if self.simuler('notaires'):
+                return
+            config = self.server.config
+            params = {cle: valeurs[0] for cle, valeurs in parse_qs(url.query).items()}
+            page, par_page = int(params['page']), int(params['parPage'])
+            debut = (page - 1) * par_page
+            if debut >= config.annonces_par_lieu:
+                self.repondre(400, {'erreur': 'page hors limites'})
+                return
+            ks = range(debut, min(debut + par_page, config.annonces_par_lieu))
+            reponse = {'annonceResumeDto': [annonce_notaires(params['departements'], k) for k in ks]}
+            if config.champ_total_notaires:
+                reponse[config.champ_total_notaires] = config.annonces_par_lieu
+            self.repondre(200, reponse)
+        else:
+            self.repondre(404, {'erreur': url.path})
+
+class ServeurSimule:
+    def __init__(self, config=None, port=0):
+        self.config = config or ConfigServeur()
+        self.port = port
+        self.serveur = None
+        self.thread = None
+
+    # return: adresse du serveur (ex: http://127.0.0.1:8080)
+    def demarrer(self):
+        self.serveur = ThreadingHTTPServer(('127.0.0.1', self.port), GestionnaireSimule)
+        self.serveur.daemon_threads = True
+        self.serveur.config = self.config
+        self.serveur.aleatoire = random.Random(self.config.graine)
+        self.serveur.compteurs = Counter()
+        verrou = threading.Lock()
+        def compter(cle):
+            with verrou:
+                self.serveur.compteurs[cle] += 1
+        self.serveur.compter = compter
+        self.thread = threading.Thread(target=self.serveur.serve_forever, daemon=True)
+        self.thread.start()
+        return f"http://127.0.0.1:{self.serveur.server_port}"
+
+    # Nombre de requêtes reçues par endpoint, et de réponses 429 et 500
+    def compteurs(self):
+        return dict(self.serveur.compteurs)
+
+    def arreter(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    serveur = ServeurSimule(port=port)
+    print(f"Serveur simulé: {serveur.demarrer()} (Ctrl+C pour arrêter)")
+    try:
+        serveur.thread.join()
+    except KeyboardInterrupt:
+        serveur.arreter()
@@ -0,0 +1,190 @@
+# Ce fichier contient la source Bien'ici (API de bienici.com) pour l'ordonnanceur commun
+# (scrapper/commun/ordonnanceur.py): une unité par département, un fichier CSV par département
+# (bienici_dep_<numero>.csv) dans le dossier DEPARTEMENTS_DIR.
+# La recherche renvoie déjà toutes les informations des annonces, il n'y a pas de requête de détail.
+# Les départements sont identifiés par leur zone Bien'ici, trouvée avec l'autocomplétion du site
+# et gardée dans le cache des lieux (CACHE_LIEUX) pour les lancements suivants.
+# Si on execute directement ce fichier, on récupère les annonces de tous les départements de France
+import sys
+import json
+from pathlib import Path
+
+# Accès aux briques communes des scrapers (dossier scrapper/commun)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from commun import transport
+from commun.source import Source
+from commun.departements import DEPARTEMENTS
+from commun.ordonnanceur import executer_sources
+from commun.cache_lieux import CacheLieux, resoudre_lieux
+from commun.schema import Schema, champ, payload_avec
+from commun.affichage import afficher
+from commun.reprises import PageEchouee
+
+# Chemin vers le répertoire des départements (dans le dossier bienici)
+DEPARTEMENTS_DIR = Path(__file__).parent / 'departements'
+JOURNAL_FILE = DEPARTEMENTS_DIR / 'journal_crawl.sqlite'
+INDEX_FILE = DEPARTEMENTS_DIR / 'index_annonces.sqlite'
+CACHE_LIEUX = DEPARTEMENTS_DIR / 'cache_lieux.sqlite'
+
+SEARCH_URL = "https://www.bienici.com/realEstateAds.json"
+SUGGEST_URL = "https://res.bienici.com/suggest.json"
+
+BIENICI_HOST = "www.bienici.com"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:145.0) Gecko/20100101 Firefox/145.0",
+    "Accept": "application/json"
+}
+transport.configurer_hote(BIENICI_HOST, headers=HEADERS)
+transport.configurer_hote("res.bienici.com", headers=HEADERS)
+# Débit adaptatif (requêtes/seconde) selon les réponses du site
+transport.limiteur.configurer_hote(BIENICI_HOST, debit_initial=1.0, debit_max=5.0)
+
+# Nombre d'annonces par page, et nombre maximal de pages: le site ne renvoie pas
+# plus de 2400 annonces par recherche (100 pages de 24)
+PAR_PAGE = 24
+MAX_PAGES = 100
+
+## Filtres de la recherche (paramètre filters de realEstateAds.json)
+annonces_filters = {
+    "size": PAR_PAGE,
+    "from": 0,
+    "showAllModels": False,
+    "filterType": "buy",
+    "propertyType": ["house", "flat"],
+    "page": 1,
+    "sortBy": "publicationDate",
+    "sortOrder": "desc",
+    "onTheMarket": [True],
+    "zoneIdsByTypes": {
+        "zoneIds": []  # Mettre ici l'identifiant de la zone
+    }
+}
+
+# Cette fonction permet de récupérer l'identifiant de zone Bien'ici d'un département
+# dep_name: nom du département
+# return: identifiant de la zone, '' si non trouvé
+def get_zone_id(dep_name):
+    try:
+        result = transport.get(SUGGEST_URL, params={"q": dep_name})
+        result.raise_for_status()
+        zones = result.json()
+        # On préfère une zone de type département, sinon la première proposée
+        zones = sorted(zones, key=lambda zone: zone.get('type') != 'department')
+        return zones[0]['zoneIds'][0]
+    except Exception:
+        afficher("Erreur Récupération zone Bien'ici:", dep_name)
+        return ''
+
+# Cette fonction permet de charger la liste des départements avec leur zone Bien'ici
+# Les zones sont lues dans le cache des lieux, seules celles absentes ou expirées sont recherchées sur le site
+# return: liste des départements (dictionnaires numero, nom, id)
+def charger_departements():
+    DEPARTEMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    cache = CacheLieux(CACHE_LIEUX)
+    try:
+        zones = resoudre_lieux(cache, 'bienici', [dep['nom'] for dep in DEPARTEMENTS], get_zone_id)
+    finally:
+        cache.fermer()
+    return [dict(dep, id=zones.get(dep['nom'], '')) for dep in DEPARTEMENTS]
+
+# Champs gardés des annonces et d'une page de résultats
+SCHEMA_ANNONCE = Schema('AnnonceBienici', {
+    "id": champ("id"),
+    "prix": champ("price"),
+    "surface_m2": champ("surfaceArea"),
+    "nb_pieces": champ("roomsQuantity"),
+    "nb_chambres": champ("bedroomsQuantity"),
+    "type_bien": champ("propertyType"),
+    "cp": champ("postalCode"),
+    "commune": champ("city"),
+    "date_publication": champ("publicationDate"),
+    "date_maj": champ("modificationDate"),
+    "titre": champ("title"),
+})
+# Champs des annonces décodées qui entrent dans l'empreinte (récupération incrémentale)
+SCHEMA_EMPREINTE = Schema('EmpreinteBienici', {
+    nom: champ(nom) for nom in ("prix", "surface_m2", "nb_pieces", "nb_chambres", "type_bien", "date_maj", "titre")
+})
+SCHEMA_PAGE = Schema('PageBienici', {
+    "annonces": champ("realEstateAds", defaut=[], liste=SCHEMA_ANNONCE),
+    "total": champ("total"),
+})
+
+# Cette fonction permet de récupérer une page d'annonces d'une zone
+# return: (liste des annonces décodées avec SCHEMA_ANNONCE, nombre total d'annonces de la zone)
+def get_page(zone_id, page, par_page=PAR_PAGE):
+    filters = payload_avec(annonces_filters, {
+        ('size',): par_page,
+        ('from',): (page - 1) * par_page,
+        ('page',): page,
+        ('zoneIdsByTypes', 'zoneIds'): [zone_id],
+    })
+
+    r = transport.get(SEARCH_URL, params={"filters": json.dumps(filters)})
+    # Erreur après les nouvelles tentatives de transport: la page est en échec (pas la fin des résultats)
+    if r.status_code != 200:
+        raise PageEchouee(f"Erreur HTTP {r.status_code}: zone {zone_id}, page {page}")
+    data = SCHEMA_PAGE.decoder_objet(r.content)
+    return data['annonces'], data['total']
+
+# Extraction de la ligne d'une annonce
+def extraire_ligne(a, dep):
+    prix = a["prix"]
+    surface = a["surface_m2"]
+    prix_m2 = None
+
+    if prix and surface:
+        try:
+            prix_m2 = round(prix / surface, 2)
+        except Exception:
+            prix_m2 = None
+
+    return {
+        "departement": dep,
+        "id": a["id"],
+        "prix": prix,
+        "surface_m2": surface,
+        "prix_m2": prix_m2,
+        "nb_pieces": a["nb_pieces"],
+        "nb_chambres": a["nb_chambres"],
+        "type_bien": a["type_bien"],
+        "cp": a["cp"],
+        "commune": a["commune"],
+        "date_publication": a["date_publication"],
+        "date_maj": a["date_maj"],
+        "titre": a["titre"],
+        "url": f"https://www.bienici.com/annonce/{a['id']}",
+    }
+
+class SourceBienici(Source):
+    nom = 'bienici'
+    host = BIENICI_HOST
+    par_page = PAR_PAGE
+    max_pages = MAX_PAGES
+    dossier = DEPARTEMENTS_DIR
+    schema_empreinte = SCHEMA_EMPREINTE
+
+    def __init__(self, concurrency=2):
+        self.concurrency = concurrency
+
+    def configurer(self):
+        transport.configurer_hote(BIENICI_HOST, headers=HEADERS,
+                                  pool_maxsize=max(transport.POOL_MAXSIZE, self.concurrency))
+
+    def unites(self):
+        return [dict(dep, cle=dep['numero']) for dep in charger_departements() if dep.get('id')]
+
+    def chercher(self, unite, page):
+        annonces, total = get_page(unite['id'], page, self.par_page)
+        return [a for a in annonces if a['id']], total
+
+    def vers_ligne(self, unite, annonce):
+        return extraire_ligne(annonce, unite['numero'])
+
+    def chemin(self, unite, extension):
+        return DEPARTEMENTS_DIR / f"bienici_dep_{unite['numero']}.{extension}"
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    DEPARTEMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    executer_sources([SourceBienici(concurrency)], JOURNAL_FILE, INDEX_FILE)
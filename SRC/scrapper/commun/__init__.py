@@ -0,0 +1,3 @@
+# Briques communes à tous les scrapers (SeLoger, Notaires ...)
+# Les scripts des sous-dossiers ajoutent le dossier scrapper au sys.path pour pouvoir faire
+# from commun import transport
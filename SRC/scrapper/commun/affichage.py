@@ -0,0 +1,17 @@
+# Ce fichier contient l'affichage des messages de suivi des scrapers
+# (départements terminés, pages récupérées, erreurs ...)
+# Tous les messages passent par afficher, qui peut être coupé quand le suivi se fait
+# par les métriques (metriques.py), avec la variable d'environnement SCRAPPER_SILENCIEUX=1
+# ou depuis python: affichage.configurer(False)
+import os
+
+actif = os.environ.get('SCRAPPER_SILENCIEUX', '') not in ('1', 'true', 'oui')
+
+def configurer(afficher_messages):
+    global actif
+    actif = afficher_messages
+
+# Même utilisation que print
+def afficher(*args, **kwargs):
+    if actif:
+        print(*args, **kwargs)
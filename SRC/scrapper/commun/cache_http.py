@@ -0,0 +1,130 @@
+# Ce fichier contient le cache des réponses HTTP brutes utilisé par la couche HTTP (transport.py)
+# Deux modes:
+# - 'enregistrer': les requêtes partent sur le réseau normalement et chaque réponse (code, corps)
+#   est gardée sur disque,
+# - 'rejouer': aucune requête ne part sur le réseau, les réponses sont relues depuis le disque
+#   (une requête absente du cache lève ReponseAbsente).
+# On peut ainsi changer l'extraction des champs (get_annonces, lignes Notaires ...) et reconstruire
+# les données, ou mesurer les performances du parsing, à la vitesse du disque et sans accès au site.
+#
+# Stockage adressé par contenu:
+# - le corps de chaque réponse est compressé (zlib) dans objets/<2 caractères>/<sha256 du corps>.z,
+#   deux requêtes qui renvoient le même corps ne le stockent qu'une fois,
+# - une base SQLite (requetes.sqlite) associe la clé de chaque requête (sha256 de la méthode,
+#   de l'url avec ses paramètres et du corps envoyé) au code de réponse et au corps.
+#
+# Activation pour tous les scrapers, sans modifier leur code, avec des variables d'environnement:
+#   SCRAPPER_CACHE_HTTP=enregistrer python scrapper_seloger_async.py
+#   SCRAPPER_CACHE_HTTP=rejouer SCRAPPER_CACHE_DIR=/chemin/du/cache python scraper_notaires_france.py
+# ou depuis python: transport.configurer_cache(dossier, 'rejouer')
+# Pour réextraire toutes les annonces en mode rejouer, utiliser un journal de reprise et un index
+# des annonces vides: sinon les annonces inchangées sont relues depuis l'index avec l'ancienne extraction.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+import requests
+from requests.structures import CaseInsensitiveDict
+
+ENREGISTRER = 'enregistrer'
+REJOUER = 'rejouer'
+MODES = (ENREGISTRER, REJOUER)
+
+# Dossier du cache par défaut (dans le dossier scrapper)
+DOSSIER_DEFAUT = Path(__file__).resolve().parent.parent / 'cache_http'
+NIVEAU_COMPRESSION = 6
+
+class ReponseAbsente(requests.RequestException):
+    pass
+
+# Clé d'une requête: méthode, url finale (paramètres encodés par requests) et corps envoyé
+def cle_requete(method, url, **kwargs):
+    preparee = requests.Request(
+        method.upper(), url, params=kwargs.get('params'), json=kwargs.get('json'), data=kwargs.get('data')
+    ).prepare()
+    corps = preparee.body or b''
+    if isinstance(corps, str):
+        corps = corps.encode('utf-8')
+    empreinte = hashlib.sha256()
+    empreinte.update(f"{preparee.method} {preparee.url}\n".encode('utf-8'))
+    empreinte.update(corps)
+    return empreinte.hexdigest(), preparee.url
+
+class CacheHttp:
+    def __init__(self, dossier=DOSSIER_DEFAUT, mode=ENREGISTRER):
+        if mode not in MODES:
+            raise ValueError(f"Mode de cache inconnu: {mode} (attendu: {', '.join(MODES)})")
+        self.dossier = Path(dossier)
+        self.mode = mode
+        (self.dossier / 'objets').mkdir(parents=True, exist_ok=True)
+        self.verrou = threading.Lock()
+        # timeout: attente du verrou d'écriture tenu par un autre processus
+        self.connexion = sqlite3.connect(str(self.dossier / 'requetes.sqlite'), check_same_thread=False, timeout=60)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.execute("""
+            CREATE TABLE IF NOT EXISTS requetes (
+                cle TEXT PRIMARY KEY,
+                methode TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                content_type TEXT,
+                objet TEXT NOT NULL,
+                date REAL NOT NULL
+            )
+        """)
+        self.connexion.commit()
+        self.nb_enregistrees = 0
+        self.nb_rejouees = 0
+
+    def chemin_objet(self, objet):
+        return self.dossier / 'objets' / objet[:2] / f"{objet[2:]}.z"
+
+    # Garde la réponse d'une requête (le corps n'est écrit que s'il n'est pas déjà stocké)
+    def enregistrer(self, method, url, response, **kwargs):
+        cle, url_finale = cle_requete(method, url, **kwargs)
+        contenu = response.content
+        objet = hashlib.sha256(contenu).hexdigest()
+        chemin = self.chemin_objet(objet)
+        if not chemin.exists():
+            chemin.parent.mkdir(exist_ok=True)
+            temporaire = chemin.with_suffix(f".{threading.get_ident()}.tmp")
+            temporaire.write_bytes(zlib.compress(contenu, NIVEAU_COMPRESSION))
+            os.replace(temporaire, chemin)
+        with self.verrou:
+            self.connexion.execute(
+                "INSERT OR REPLACE INTO requetes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cle, method.upper(), url_finale, response.status_code,
+                 response.headers.get('Content-Type'), objet, time.time())
+            )
+            self.connexion.commit()
+            self.nb_enregistrees += 1
+
+    # Réponse enregistrée pour une requête
+    # return: requests.Response reconstruite depuis le disque
+    def rejouer(self, method, url, **kwargs):
+        cle, url_finale = cle_requete(method, url, **kwargs)
+        with self.verrou:
+            ligne = self.connexion.execute(
+                "SELECT status, content_type, objet FROM requetes WHERE cle = ?", (cle,)
+            ).fetchone()
+        if ligne is None:
+            raise ReponseAbsente(f"Réponse absente du cache: {method.upper()} {url_finale}")
+        status, content_type, objet = ligne
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = zlib.decompress(self.chemin_objet(objet).read_bytes())
+        response.headers = CaseInsensitiveDict({'Content-Type': content_type} if content_type else {})
+        response.url = url_finale
+        response.encoding = 'utf-8'
+        with self.verrou:
+            self.nb_rejouees += 1
+        return response
+
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
@@ -0,0 +1,74 @@
+# Ce fichier contient le cache persistant des identifiants de lieux (nom de département -> identifiant du site)
+# Les identifiants sont trouvés avec l'autocomplétion de chaque site, une requête par nom:
+# une fois trouvés, ils sont gardés dans une base SQLite pendant `ttl` secondes,
+# les lancements suivants démarrent donc sans attendre les requêtes d'autocomplétion.
+# Les noms absents du cache (ou expirés) sont résolus en parallèle par resoudre_lieux.
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from commun.affichage import afficher
+
+# Durée de validité d'un identifiant (secondes)
+TTL_DEFAUT = 30 * 24 * 3600
+# Nombre de requêtes d'autocomplétion simultanées (le débit reste réglé par le limiteur de transport.py)
+CONCURRENCY_RESOLUTION = 8
+
+class CacheLieux:
+    def __init__(self, chemin, ttl=TTL_DEFAUT):
+        self.chemin = chemin
+        self.ttl = ttl
+        self.verrou = threading.Lock()
+        # timeout: attente du verrou d'écriture tenu par un autre processus
+        self.connexion = sqlite3.connect(str(chemin), check_same_thread=False, timeout=60)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("""
+            CREATE TABLE IF NOT EXISTS lieux (
+                source TEXT NOT NULL,
+                nom TEXT NOT NULL,
+                identifiant TEXT NOT NULL,
+                date REAL NOT NULL,
+                PRIMARY KEY (source, nom)
+            )
+        """)
+        self.connexion.commit()
+
+    # return: identifiant du lieu, None s'il est absent ou expiré
+    def lire(self, source, nom):
+        with self.verrou:
+            ligne = self.connexion.execute(
+                "SELECT identifiant FROM lieux WHERE source = ? AND nom = ? AND date >= ?",
+                (source, nom, time.time() - self.ttl)
+            ).fetchone()
+        return None if ligne is None else ligne[0]
+
+    def ecrire(self, source, nom, identifiant):
+        with self.verrou:
+            self.connexion.execute("INSERT OR REPLACE INTO lieux VALUES (?, ?, ?, ?)", (source, nom, identifiant, time.time()))
+            self.connexion.commit()
+
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
+
+# Identifiants d'une liste de noms de lieux: lus dans le cache, sinon résolus en parallèle puis mis en cache
+# fonction: fonction bloquante nom -> identifiant ('' ou None si non trouvé, non mis en cache)
+# return: dictionnaire nom -> identifiant (les noms non trouvés sont absents)
+def resoudre_lieux(cache, source, noms, fonction, concurrency=CONCURRENCY_RESOLUTION):
+    identifiants = {}
+    a_resoudre = []
+    for nom in noms:
+        identifiant = cache.lire(source, nom)
+        if identifiant:
+            identifiants[nom] = identifiant
+        else:
+            a_resoudre.append(nom)
+
+    if a_resoudre:
+        afficher(f"{source}: {len(identifiants)} lieux en cache, {len(a_resoudre)} à rechercher")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for nom, identifiant in zip(a_resoudre, executor.map(fonction, a_resoudre)):
+                if identifiant:
+                    cache.ecrire(source, nom, identifiant)
+                    identifiants[nom] = identifiant
+    return identifiants
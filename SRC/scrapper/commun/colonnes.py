@@ -0,0 +1,169 @@
+# Ce fichier contient le constructeur de colonnes des lignes récupérées
+# Au lieu de garder un dictionnaire python par annonce (une clé et un objet par champ et par annonce,
+# puis un nouveau parcours de toutes les lignes par pd.DataFrame), les lignes sont rangées colonne par
+# colonne et converties par lots en tableaux Arrow typés (RecordBatch):
+# - un entier ou un flottant ne coûte plus que 8 octets dans un tableau contigu,
+# - les lots forment une table Arrow, convertie en DataFrame pandas ou écrite en CSV / Parquet
+#   sans recopie ligne par ligne.
+# Seul le lot en cours (TAILLE_LOT lignes au plus) est gardé sous forme d'objets python.
+#
+# Exemple:
+#   constructeur = ConstructeurColonnes()
+#   for ligne in lignes:
+#       constructeur.ajouter(ligne)
+#   df = constructeur.vers_pandas()
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Nombre de lignes d'un lot converti en tableaux Arrow
+TAILLE_LOT = 50_000
+
+# Conversion d'une colonne python en tableau Arrow
+# Les sites mélangent parfois les types d'un même champ (ex: nbroom vaut 3 ou ''):
+# la colonne est alors gardée en texte, comme dans un CSV
+def tableau_arrow(valeurs):
+    try:
+        return pa.array(valeurs, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if valeur is None else str(valeur) for valeur in valeurs], type=pa.string())
+
+# Type commun de deux lots pour une même colonne
+# (ex: entiers puis flottants -> flottants, colonne vide (null) puis texte -> texte)
+def type_commun(type_a, type_b):
+    if type_a == type_b or pa.types.is_null(type_b):
+        return type_a
+    if pa.types.is_null(type_a):
+        return type_b
+    numeriques = (pa.types.is_integer, pa.types.is_floating)
+    if any(test(type_a) for test in numeriques) and any(test(type_b) for test in numeriques):
+        return pa.float64()
+    return pa.string()
+
+class ConstructeurColonnes:
+    # colonnes: noms des colonnes, dans l'ordre de sortie
+    #           None: colonnes de la première ligne ajoutée (les clés absentes des lignes suivantes sont nulles)
+    def __init__(self, colonnes=None, taille_lot=TAILLE_LOT):
+        self.colonnes = list(colonnes) if colonnes is not None else None
+        self.taille_lot = taille_lot
+        self.valeurs = None
+        self.nb_en_cours = 0
+        self.lots = []
+        if self.colonnes is not None:
+            self._vider()
+
+    def _vider(self):
+        self.valeurs = {colonne: [] for colonne in self.colonnes}
+        self.nb_en_cours = 0
+
+    def __len__(self):
+        return sum(lot.num_rows for lot in self.lots) + self.nb_en_cours
+
+    # Ajoute une ligne (dictionnaire colonne -> valeur)
+    def ajouter(self, ligne):
+        if self.colonnes is None:
+            self.colonnes = list(ligne.keys())
+            self._vider()
+        for colonne, valeurs in self.valeurs.items():
+            valeurs.append(ligne.get(colonne))
+        self.nb_en_cours += 1
+        if self.nb_en_cours >= self.taille_lot:
+            self.lots.append(self.lot())
+
+    def etendre(self, lignes):
+        for ligne in lignes:
+            self.ajouter(ligne)
+
+    # Convertit les lignes en cours en un lot Arrow et le retire du constructeur
+    # return: RecordBatch (None si aucune ligne en cours)
+    def lot(self):
+        if not self.nb_en_cours:
+            return None
+        lot = pa.RecordBatch.from_arrays(
+            [tableau_arrow(self.valeurs[colonne]) for colonne in self.colonnes], names=self.colonnes
+        )
+        self._vider()
+        return lot
+
+    # return: table Arrow de toutes les lignes ajoutées (les lots gardent leurs tableaux, sans recopie)
+    def table(self):
+        dernier = self.lot()
+        if dernier is not None:
+            self.lots.append(dernier)
+        if not self.lots:
+            return pa.table({colonne: pa.array([], type=pa.null()) for colonne in self.colonnes or []})
+        self.lots = harmoniser(self.lots)
+        return pa.Table.from_batches(self.lots)
+
+    def vers_pandas(self):
+        return self.table().to_pandas()
+
+    def ecrire_parquet(self, chemin):
+        pq.write_table(self.table(), str(chemin))
+
+# Ramène des lots au même schéma (types communs de chaque colonne)
+def harmoniser(lots):
+    types = {}
+    for lot in lots:
+        for champ in lot.schema:
+            types[champ.name] = type_commun(types[champ.name], champ.type) if champ.name in types else champ.type
+    schema = pa.schema([(nom, types[nom]) for nom in lots[0].schema.names])
+    return [
+        lot if lot.schema == schema else pa.RecordBatch.from_arrays(
+            [convertir(lot.column(nom), schema.field(nom).type) for nom in schema.names], schema=schema
+        )
+        for lot in lots
+    ]
+
+def convertir(tableau, type_cible):
+    if tableau.type == type_cible:
+        return tableau
+    if pa.types.is_string(type_cible):
+        return colonne_texte(tableau)
+    return tableau.cast(type_cible)
+
+# Tableau Arrow converti en texte (les listes et objets imbriqués passent par str, comme dans csv.writer)
+def colonne_texte(tableau):
+    try:
+        return tableau.cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.array([None if valeur is None else str(valeur) for valeur in tableau.to_pylist()], type=pa.string())
+
+# Texte d'une colonne tel que l'écrit DataFrame.to_csv: booléens en True/False,
+# flottants entiers avec leur décimale (2.0), guillemets seulement autour des valeurs qui en ont besoin
+def colonne_csv(tableau):
+    if pa.types.is_boolean(tableau.type):
+        texte = pc.if_else(tableau, "True", "False")
+    elif pa.types.is_floating(tableau.type):
+        texte = colonne_texte(tableau)
+        texte = pc.if_else(pc.match_substring_regex(texte, r"^-?\d+$"),
+                           pc.binary_join_element_wise(texte, ".0", ""), texte)
+    else:
+        texte = colonne_texte(tableau)
+    a_proteger = pc.match_substring_regex(texte, '[",\r\n]')
+    protege = pc.binary_join_element_wise('"', pc.replace_substring(texte, '"', '""'), '"', "")
+    return pc.if_else(a_proteger, protege, texte)
+
+# Écrit des lots Arrow dans un fichier CSV, lot par lot, au même format que DataFrame.to_csv
+# (le CSVWriter de pyarrow met entre guillemets toutes les valeurs texte)
+# Les colonnes sont écrites en texte: les lots n'ont pas besoin d'avoir exactement les mêmes types
+# return: nombre de lignes écrites
+def ecrire_csv(lots, chemin_csv):
+    fichier = None
+    nb_lignes = 0
+    try:
+        for lot in lots:
+            if fichier is None:
+                noms = lot.schema.names
+                fichier = open(chemin_csv, 'w', encoding='utf-8', newline='')
+                entete = colonne_csv(pa.array(noms, type=pa.string()))
+                fichier.write(','.join(entete.to_pylist()) + '\n')
+            colonnes = [colonne_csv(lot.column(nom)) for nom in noms]
+            lignes = pc.binary_join_element_wise(*colonnes, ",", null_handling='replace', null_replacement="")
+            lignes = pc.binary_join_element_wise(lignes, "\n", "")
+            fichier.write(''.join(lignes.to_pylist()))
+            nb_lignes += lot.num_rows
+    finally:
+        if fichier is not None:
+            fichier.close()
+    return nb_lignes
@@ -0,0 +1,41 @@
+# Ce fichier contient le plafond de requêtes simultanées par hôte utilisé par les modes asyncio des scrapers
+# Les fonctions de requête des scrapers sont bloquantes (requests): elles sont exécutées
+# dans un pool de threads, au plus `concurrency` à la fois vers un même hôte.
+# Un hôte peut avoir son propre plafond (paramètre plafonds), utile quand plusieurs sources
+# sont récupérées en même temps (voir ordonnanceur.py)
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# Nombre maximal de threads du pool, tous hôtes confondus
+MAX_THREADS = 64
+
+class LimiteurHotes:
+    # concurrency: plafond des hôtes sans plafond propre
+    # plafonds: dictionnaire hôte -> plafond propre de l'hôte
+    def __init__(self, concurrency, plafonds=None):
+        self.concurrency = concurrency
+        self.plafonds = dict(plafonds or {})
+        self.semaphores = {}
+        # Pool de threads dimensionné pour ne jamais être le facteur limitant
+        self.executor = ThreadPoolExecutor(max_workers=min(MAX_THREADS, concurrency + sum(self.plafonds.values())))
+
+    def semaphore(self, url):
+        return self.semaphore_hote(urlparse(url).netloc)
+
+    def semaphore_hote(self, host):
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.plafonds.get(host, self.concurrency))
+        return self.semaphores[host]
+
+    # Exécute une fonction bloquante dans le pool de threads sous le plafond de l'hôte de `url`
+    async def appeler(self, url, fonction, *args):
+        return await self.appeler_hote(urlparse(url).netloc, fonction, *args)
+
+    async def appeler_hote(self, host, fonction, *args):
+        async with self.semaphore_hote(host):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fonction, *args)
+
+    def fermer(self):
+        self.executor.shutdown(wait=False)
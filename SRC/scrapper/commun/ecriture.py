@@ -0,0 +1,116 @@
+# Ce fichier contient l'écriture en flux des lignes récupérées
+# Chaque page est ajoutée sur disque dès qu'elle arrive (une ligne JSON par annonce, format JSONL)
+# au lieu d'être gardée dans une liste python jusqu'à la fin du département ou de la France:
+# la mémoire utilisée reste la même quelle que soit la taille de la récupération.
+# Le CSV final est produit à la fin, lui aussi en flux, par lots de colonnes Arrow (voir colonnes.py).
+#
+# Pour la reprise après interruption, ecrire_page retourne la position du fichier après la page:
+# elle est enregistrée dans le journal avec la page, et à la relance le fichier est tronqué
+# à la dernière position journalisée (une page écrite mais non journalisée est ainsi effacée).
+import csv
+import itertools
+import json
+import os
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from commun.colonnes import ConstructeurColonnes, ecrire_csv, TAILLE_LOT
+from commun.schema import charger_json
+
+class EcrivainJsonl:
+    def __init__(self, chemin, position=None):
+        self.chemin = Path(chemin)
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        self.fichier = open(self.chemin, 'ab')
+        if position is not None:
+            self.tronquer(position)
+
+    # Ramène le fichier à `position` octets (dernière page journalisée)
+    def tronquer(self, position):
+        self.fichier.truncate(position)
+        self.fichier.seek(position)
+
+    # Ajoute les lignes d'une page à la fin du fichier
+    # lignes: liste de dictionnaires (une annonce par dictionnaire)
+    # return: position du fichier après la page
+    def ecrire_page(self, lignes):
+        contenu = ''.join(json.dumps(ligne, ensure_ascii=False, default=str) + '\n' for ligne in lignes)
+        self.fichier.write(contenu.encode('utf-8'))
+        self.fichier.flush()
+        os.fsync(self.fichier.fileno())
+        return self.fichier.tell()
+
+    def fermer(self):
+        self.fichier.close()
+
+    def supprimer(self):
+        self.fermer()
+        self.chemin.unlink(missing_ok=True)
+
+# Parcourt les lignes d'un ou plusieurs fichiers JSONL, une à une
+def lire_jsonl(chemins):
+    for chemin in chemins:
+        with open(chemin, 'rb') as f:
+            for ligne in f:
+                if ligne.strip():
+                    yield charger_json(ligne)
+
+# Parcourt les lignes d'un ou plusieurs fichiers JSONL par lots de colonnes Arrow (RecordBatch)
+# Les colonnes sont celles de la première ligne (toutes les lignes d'une source ont les mêmes clés)
+# cle: colonne identifiant les lignes (ex: 'id'), seule la première ligne de chaque valeur est gardée
+#      (fusion de fichiers qui se recouvrent), None pour tout garder
+def lire_lots(chemins, cle=None, taille_lot=TAILLE_LOT):
+    constructeur = ConstructeurColonnes(taille_lot=taille_lot)
+    deja_vues = set()
+    for ligne in lire_jsonl(chemins):
+        if cle is not None:
+            valeur = ligne.get(cle)
+            if valeur in deja_vues:
+                continue
+            deja_vues.add(valeur)
+        constructeur.ajouter(ligne)
+        if constructeur.lots:
+            yield constructeur.lots.pop()
+    dernier = constructeur.lot()
+    if dernier is not None:
+        yield dernier
+
+# Lit un fichier CSV déjà exporté par lots Arrow, toutes les colonnes en texte
+# exclure: (colonne, valeurs): les lignes dont la colonne vaut une de ces valeurs sont écartées
+def lire_csv_lots(chemin_csv, exclure=None):
+    with open(chemin_csv, 'r', newline='', encoding='utf-8') as f:
+        colonnes = next(csv.reader(f), [])
+    if not colonnes:
+        return
+    lecteur = pa_csv.open_csv(str(chemin_csv), convert_options=pa_csv.ConvertOptions(
+        column_types={colonne: pa.string() for colonne in colonnes}, strings_can_be_null=True
+    ))
+    for lot in lecteur:
+        if exclure is not None:
+            colonne, valeurs = exclure
+            lot = lot.filter(pc.invert(pc.is_in(lot.column(colonne), value_set=pa.array(valeurs, type=pa.string()))))
+        if lot.num_rows:
+            yield lot
+
+# Convertit un ou plusieurs fichiers JSONL en un fichier CSV, sans tout charger en mémoire
+# Aucun fichier n'est créé s'il n'y a aucune ligne
+# cle: voir lire_lots
+# complement: lots Arrow à ajouter après les lignes des fichiers JSONL (ex: lignes gardées du fichier précédent,
+#             qui peut être chemin_csv lui-même: le fichier est écrit à côté puis remplacé)
+# return: nombre de lignes écrites
+def exporter_csv(chemins_jsonl, chemin_csv, cle=None, complement=None):
+    lots = lire_lots(chemins_jsonl, cle)
+    if complement is None:
+        return ecrire_csv(lots, chemin_csv)
+    temporaire = f"{chemin_csv}.tmp"
+    nb_lignes = ecrire_csv(itertools.chain(lots, complement), temporaire)
+    if nb_lignes:
+        os.replace(temporaire, chemin_csv)
+    return nb_lignes
+
+# Charge un ou plusieurs fichiers JSONL en une table Arrow (à convertir avec to_pandas ou à écrire en Parquet)
+def charger_table(chemins_jsonl, cle=None):
+    constructeur = ConstructeurColonnes()
+    constructeur.lots = list(lire_lots(chemins_jsonl, cle))
+    return constructeur.table()
@@ -0,0 +1,225 @@
+# Ce fichier contient la file de travail durable d'une récupération répartie sur plusieurs processus
+# (voir crawl_distribue.py): chaque tâche est une page d'une unité (département) d'une source.
+# Implémentation locale sur une base SQLite partagée par tous les processus qui l'ouvrent
+# (mode WAL: plusieurs lecteurs et un écrivain à la fois, les écritures attendent leur tour).
+# Le mode WAL repose sur de la mémoire partagée entre les processus: la base doit rester sur un disque
+# local de la machine qui fait tourner tous les travailleurs (jamais sur un partage réseau NFS/SMB,
+# où deux travailleurs pourraient louer la même tâche ou corrompre la base).
+# Pour répartir sur plusieurs machines, la file est à remplacer par une autre implémentation des mêmes
+# méthodes (ajouter_unite, louer, prolonger, terminer, echouer, reprendre) sur un serveur de base de données.
+#
+# Cycle d'une tâche:
+# - 'attente': à faire,
+# - 'louee': un travailleur l'a prise pour `duree_bail` secondes, qu'il prolonge tant qu'il y travaille
+#   (battement de cœur); un bail expiré (travailleur arrêté ou planté) remet la tâche à disposition,
+# - 'terminee': la page est écrite dans son fichier (shard) et les pages suivantes sont ajoutées à la file,
+#   Une page en erreur est remise en attente après un délai qui double à chaque tentative (ATTENTE_ECHEC),
+# - 'echec': la page a échoué `MAX_TENTATIVES` fois, l'unité reste incomplète jusqu'à ce que
+#   reprendre remette les tâches en échec en attente (crawl_distribue.py reprendre).
+import json
+import sqlite3
+import threading
+import time
+
+ATTENTE = 'attente'
+LOUEE = 'louee'
+TERMINEE = 'terminee'
+ECHEC = 'echec'
+
+# Durée d'un bail (secondes), prolongée par le battement de cœur du travailleur
+DUREE_BAIL = 120
+# Nombre de fois qu'une tâche peut être louée avant d'être abandonnée
+MAX_TENTATIVES = 5
+# Délai avant de relouer une page en erreur (secondes), doublé à chaque tentative et plafonné
+ATTENTE_ECHEC = 30
+ATTENTE_ECHEC_MAX = 900
+
+class FileTravail:
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.verrou = threading.Lock()
+        # isolation_level=None: les transactions sont ouvertes explicitement (BEGIN IMMEDIATE)
+        # timeout: attente du verrou d'écriture tenu par un autre processus
+        self.connexion = sqlite3.connect(str(chemin), check_same_thread=False, timeout=60, isolation_level=None)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.executescript("""
+            CREATE TABLE IF NOT EXISTS unites (
+                source TEXT NOT NULL,
+                unite TEXT NOT NULL,
+                donnees TEXT NOT NULL,
+                total INTEGER,
+                PRIMARY KEY (source, unite)
+            );
+            CREATE TABLE IF NOT EXISTS taches (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                unite TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                etat TEXT NOT NULL,
+                travailleur TEXT,
+                bail REAL,
+                tentatives INTEGER NOT NULL DEFAULT 0,
+                shard TEXT,
+                nb_lignes INTEGER,
+                erreur TEXT,
+                UNIQUE (source, unite, page)
+            );
+            CREATE INDEX IF NOT EXISTS taches_etat ON taches (etat, page);
+        """)
+
+    # Transaction d'écriture: BEGIN IMMEDIATE prend le verrou d'écriture dès le début,
+    # deux processus ne peuvent donc pas louer la même tâche
+    def _ecrire(self, fonction):
+        with self.verrou:
+            self.connexion.execute("BEGIN IMMEDIATE")
+            try:
+                resultat = fonction(self.connexion)
+            except Exception:
+                self.connexion.execute("ROLLBACK")
+                raise
+            self.connexion.execute("COMMIT")
+            return resultat
+
+    # Ajoute une unité et la tâche de sa première page (sans effet si l'unité est déjà dans la file)
+    # unite: dictionnaire de l'unité (Source.unites), transmis tel quel aux travailleurs
+    def ajouter_unite(self, source, unite):
+        def ajouter(connexion):
+            connexion.execute("INSERT OR IGNORE INTO unites VALUES (?, ?, ?, NULL)",
+                              (source, str(unite['cle']), json.dumps(unite, ensure_ascii=False)))
+            connexion.execute("INSERT OR IGNORE INTO taches (source, unite, page, etat) VALUES (?, ?, 1, ?)",
+                              (source, str(unite['cle']), ATTENTE))
+        self._ecrire(ajouter)
+
+    # Loue la prochaine tâche à faire (en attente dont le délai après erreur est passé, ou louée avec un bail expiré)
+    # Les premières pages passent d'abord: elles donnent le total des unités et donc les pages suivantes
+    # sources: noms des sources que le travailleur sait récupérer
+    # return: dictionnaire de la tâche (id, source, unite, page, donnees et total de l'unité), None si rien à faire
+    def louer(self, travailleur, sources, duree_bail=DUREE_BAIL):
+        marques = ','.join('?' * len(sources))
+
+        def louer_tache(connexion):
+            maintenant = time.time()
+            # Tâche dont le travailleur s'est arrêté trop souvent (ex: page qui fait planter le processus)
+            connexion.execute(
+                "UPDATE taches SET etat = ?, erreur = 'bail expiré' WHERE etat = ? AND bail < ? AND tentatives >= ?",
+                (ECHEC, LOUEE, maintenant, MAX_TENTATIVES)
+            )
+            ligne = connexion.execute(f"""
+                SELECT t.id, t.source, t.unite, t.page, u.donnees, u.total FROM taches t
+                JOIN unites u ON u.source = t.source AND u.unite = t.unite
+                WHERE t.source IN ({marques}) AND ((t.etat = ? AND (t.bail IS NULL OR t.bail < ?))
+                                                   OR (t.etat = ? AND t.bail < ?))
+                ORDER BY t.page, t.id LIMIT 1
+            """, (*sources, ATTENTE, maintenant, LOUEE, maintenant)).fetchone()
+            if ligne is None:
+                return None
+            connexion.execute(
+                "UPDATE taches SET etat = ?, travailleur = ?, bail = ?, tentatives = tentatives + 1 WHERE id = ?",
+                (LOUEE, travailleur, maintenant + duree_bail, ligne[0])
+            )
+            return {'id': ligne[0], 'source': ligne[1], 'unite': ligne[2], 'page': ligne[3],
+                    'donnees': json.loads(ligne[4]), 'total': ligne[5]}
+        return self._ecrire(louer_tache)
+
+    # Battement de cœur: prolonge les baux des tâches encore tenues par le travailleur
+    def prolonger(self, travailleur, ids, duree_bail=DUREE_BAIL):
+        if not ids:
+            return
+        marques = ','.join('?' * len(ids))
+        self._ecrire(lambda connexion: connexion.execute(
+            f"UPDATE taches SET bail = ? WHERE etat = ? AND travailleur = ? AND id IN ({marques})",
+            (time.time() + duree_bail, LOUEE, travailleur, *ids)
+        ))
+
+    # Termine une tâche: son fichier est écrit, les pages suivantes de l'unité sont ajoutées à la file
+    # total: nombre total d'annonces de l'unité s'il est connu (page 1)
+    # pages_suivantes: numéros des pages à ajouter
+    # return: False si le bail a été perdu entre-temps (la tâche a été reprise par un autre travailleur)
+    def terminer(self, tache, travailleur, shard, nb_lignes, pages_suivantes=(), total=None):
+        def terminer_tache(connexion):
+            curseur = connexion.execute(
+                "UPDATE taches SET etat = ?, shard = ?, nb_lignes = ?, erreur = NULL "
+                "WHERE id = ? AND etat = ? AND travailleur = ?",
+                (TERMINEE, str(shard), nb_lignes, tache['id'], LOUEE, travailleur)
+            )
+            if curseur.rowcount == 0:
+                return False
+            if total is not None:
+                connexion.execute("UPDATE unites SET total = ? WHERE source = ? AND unite = ?",
+                                  (total, tache['source'], tache['unite']))
+            connexion.executemany(
+                "INSERT OR IGNORE INTO taches (source, unite, page, etat) VALUES (?, ?, ?, ?)",
+                [(tache['source'], tache['unite'], page, ATTENTE) for page in pages_suivantes]
+            )
+            return True
+        return self._ecrire(terminer_tache)
+
+    # Rend une tâche en échec: remise en attente après un délai croissant (le bail sert de date de disponibilité),
+    # ou abandonnée après MAX_TENTATIVES locations
+    def echouer(self, tache, travailleur, erreur):
+        def echouer_tache(connexion):
+            ligne = connexion.execute("SELECT tentatives FROM taches WHERE id = ?", (tache['id'],)).fetchone()
+            tentatives = ligne[0] if ligne else MAX_TENTATIVES
+            delai = min(ATTENTE_ECHEC * 2 ** (tentatives - 1), ATTENTE_ECHEC_MAX)
+            connexion.execute(
+                "UPDATE taches SET etat = ?, bail = ?, erreur = ? WHERE id = ? AND etat = ? AND travailleur = ?",
+                (ECHEC if tentatives >= MAX_TENTATIVES else ATTENTE, time.time() + delai, str(erreur),
+                 tache['id'], LOUEE, travailleur)
+            )
+        self._ecrire(echouer_tache)
+
+    # Remet en attente les tâches abandonnées d'une source, avec toutes leurs tentatives
+    # (les pages terminées sont gardées)
+    # return: nombre de tâches remises en attente
+    def reprendre(self, source):
+        return self._ecrire(lambda connexion: connexion.execute(
+            "UPDATE taches SET etat = ?, travailleur = NULL, bail = NULL, tentatives = 0 WHERE source = ? AND etat = ?",
+            (ATTENTE, source, ECHEC)
+        ).rowcount)
+
+    # return: dictionnaire état -> nombre de tâches de la source
+    def compter(self, source):
+        with self.verrou:
+            curseur = self.connexion.execute("SELECT etat, COUNT(*) FROM taches WHERE source = ? GROUP BY etat", (source,))
+            return dict(curseur.fetchall())
+
+    # Nombre de tâches en attente (y compris après une erreur) ou louées des sources
+    # (une tâche louée peut encore ajouter des pages)
+    def reste_a_faire(self, sources):
+        marques = ','.join('?' * len(sources))
+        with self.verrou:
+            return self.connexion.execute(
+                f"SELECT COUNT(*) FROM taches WHERE source IN ({marques}) AND etat IN (?, ?)", (*sources, ATTENTE, LOUEE)
+            ).fetchone()[0]
+
+    # Vrai si toutes les tâches de la source sont terminées
+    def est_terminee(self, source):
+        comptes = self.compter(source)
+        return bool(comptes) and set(comptes) == {TERMINEE}
+
+    # return: liste des (dictionnaire de l'unité, fichiers de ses pages dans l'ordre des pages)
+    def shards(self, source):
+        with self.verrou:
+            unites = self.connexion.execute(
+                "SELECT unite, donnees FROM unites WHERE source = ? ORDER BY rowid", (source,)
+            ).fetchall()
+            resultat = []
+            for cle, donnees in unites:
+                curseur = self.connexion.execute(
+                    "SELECT shard FROM taches WHERE source = ? AND unite = ? AND etat = ? ORDER BY page",
+                    (source, cle, TERMINEE)
+                )
+                resultat.append((json.loads(donnees), [shard for (shard,) in curseur]))
+            return resultat
+
+    # Vide la file d'une source, à appeler quand ses fichiers ont été fusionnés
+    def vider(self, source):
+        def vider_source(connexion):
+            connexion.execute("DELETE FROM taches WHERE source = ?", (source,))
+            connexion.execute("DELETE FROM unites WHERE source = ?", (source,))
+        self._ecrire(vider_source)
+
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
@@ -0,0 +1,169 @@
+# Ce fichier contient l'ordonnancement des départements selon la fraîcheur des données
+# Les départements n'ont pas tous le même volume ni le même renouvellement (Paris contre la Lozère):
+# au lieu de tous les parcourir avec le même effort, on apprend pour chaque (source, département),
+# d'un passage à l'autre:
+# - le taux de renouvellement: annonces nouvelles ou modifiées par jour (index des annonces),
+#   lissé d'un passage à l'autre (moyenne exponentielle),
+# - le coût d'un passage: nombre de requêtes.
+# Entre deux passages, un département accumule en moyenne taux * âge annonces que nous n'avons pas:
+# la fraîcheur attendue est la part des annonces du département que nous avons à jour,
+#   fraicheur = nb_annonces / (nb_annonces + taux * âge)
+# Avec un budget de requêtes, les départements sont choisis par ordre de gain par requête
+# (annonces manquantes attendues / coût), jusqu'à épuisement du budget. Les départements jamais parcourus
+# passent en premier. Sans budget, tous les départements sont parcourus, les plus périmés d'abord.
+# L'historique est gardé dans la base de l'index des annonces (tables passages et fraicheur).
+import json
+import math
+import sqlite3
+import threading
+import time
+from commun.affichage import afficher
+
+# Poids du dernier passage dans le taux lissé
+LISSAGE = 0.5
+JOUR = 86400
+
+class HistoriqueFraicheur:
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.verrou = threading.Lock()
+        self.connexion = sqlite3.connect(str(chemin), check_same_thread=False, timeout=60)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.executescript("""
+            CREATE TABLE IF NOT EXISTS passages (
+                source TEXT NOT NULL,
+                unite TEXT NOT NULL,
+                date REAL NOT NULL,
+                nb_annonces INTEGER NOT NULL,
+                nb_nouvelles INTEGER NOT NULL,
+                nb_requetes INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fraicheur (
+                source TEXT NOT NULL,
+                unite TEXT NOT NULL,
+                dernier_passage REAL NOT NULL,
+                taux REAL,
+                nb_annonces INTEGER NOT NULL,
+                cout REAL NOT NULL,
+                PRIMARY KEY (source, unite)
+            );
+        """)
+        self.connexion.commit()
+
+    # Enregistre un passage complet sur un département
+    # nb_nouvelles: annonces nouvelles ou modifiées trouvées (passées par le détail)
+    # nb_requetes: requêtes faites pour le département
+    def enregistrer(self, source, unite, nb_annonces, nb_nouvelles, nb_requetes, date=None):
+        date = time.time() if date is None else date
+        unite = str(unite)
+        with self.verrou:
+            precedent = self.connexion.execute(
+                "SELECT dernier_passage, taux, cout FROM fraicheur WHERE source = ? AND unite = ?", (source, unite)
+            ).fetchone()
+            taux, cout = None, float(nb_requetes)
+            if precedent is not None:
+                dernier_passage, taux_precedent, cout_precedent = precedent
+                # Au premier passage toutes les annonces sont nouvelles: le taux n'est appris qu'à partir du second
+                jours = max(date - dernier_passage, 60) / JOUR
+                taux = nb_nouvelles / jours
+                if taux_precedent is not None:
+                    taux = LISSAGE * taux + (1 - LISSAGE) * taux_precedent
+                cout = LISSAGE * nb_requetes + (1 - LISSAGE) * cout_precedent
+            self.connexion.execute("INSERT INTO passages VALUES (?, ?, ?, ?, ?, ?)",
+                                   (source, unite, date, nb_annonces, nb_nouvelles, nb_requetes))
+            self.connexion.execute("INSERT OR REPLACE INTO fraicheur VALUES (?, ?, ?, ?, ?, ?)",
+                                   (source, unite, date, taux, nb_annonces, cout))
+            self.connexion.commit()
+
+    # return: dictionnaire unité -> (dernier passage, taux par jour ou None, nb_annonces, coût en requêtes)
+    def etats(self, source):
+        with self.verrou:
+            curseur = self.connexion.execute(
+                "SELECT unite, dernier_passage, taux, nb_annonces, cout FROM fraicheur WHERE source = ?", (source,)
+            )
+            return {unite: tuple(valeurs) for unite, *valeurs in curseur}
+
+    # Fraîcheur attendue de chaque unité à la date `date`
+    # return: liste de dictionnaires (unite, nom, age_jours, taux_jour, nb_annonces, manquantes, fraicheur, cout),
+    #         du moins frais au plus frais; les unités jamais parcourues ont une fraîcheur de 0
+    def rapport(self, source, unites, date=None):
+        date = time.time() if date is None else date
+        etats = self.etats(source)
+        lignes = []
+        for unite in unites:
+            etat = etats.get(str(unite['cle']))
+            if etat is None:
+                lignes.append({'unite': str(unite['cle']), 'nom': unite['nom'], 'age_jours': None, 'taux_jour': None,
+                               'nb_annonces': None, 'manquantes': None, 'fraicheur': 0.0, 'cout': None})
+                continue
+            dernier_passage, taux, nb_annonces, cout = etat
+            age = max(date - dernier_passage, 0) / JOUR
+            # Taux encore inconnu (un seul passage): on suppose tout le stock renouvelé en 30 jours
+            taux_estime = taux if taux is not None else nb_annonces / 30
+            manquantes = taux_estime * age
+            lignes.append({
+                'unite': str(unite['cle']), 'nom': unite['nom'], 'age_jours': round(age, 2),
+                'taux_jour': None if taux is None else round(taux, 2), 'nb_annonces': nb_annonces,
+                'manquantes': round(manquantes, 1),
+                'fraicheur': round(nb_annonces / (nb_annonces + manquantes), 3) if nb_annonces + manquantes else 1.0,
+                'cout': round(cout, 1),
+            })
+        return sorted(lignes, key=lambda ligne: ligne['fraicheur'])
+
+    # Choix des unités d'un passage
+    # budget: nombre maximal de requêtes, None pour tout parcourir
+    # Sans historique, le coût d'une unité est inconnu (compté 1 requête): le choix peut dépasser le budget,
+    # qui est alors tenu pendant le passage (plus d'unité commencée une fois le budget dépensé, voir ordonnanceur.py)
+    # return: unités à parcourir, par ordre de priorité
+    def planifier(self, source, unites, budget=None, date=None):
+        rapport = {ligne['unite']: ligne for ligne in self.rapport(source, unites, date)}
+        couts = [ligne['cout'] for ligne in rapport.values() if ligne['cout']]
+        cout_moyen = sum(couts) / len(couts) if couts else 1.0
+
+        def priorite(unite):
+            ligne = rapport[str(unite['cle'])]
+            if ligne['manquantes'] is None:
+                return math.inf
+            return ligne['manquantes'] / max(ligne['cout'] or cout_moyen, 1.0)
+
+        ordre = sorted(unites, key=priorite, reverse=True)
+        if budget is None:
+            return ordre
+        choisies = []
+        depense = 0.0
+        for unite in ordre:
+            cout = rapport[str(unite['cle'])]['cout'] or cout_moyen
+            if depense + cout > budget and choisies:
+                continue
+            choisies.append(unite)
+            depense += cout
+        return choisies
+
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
+
+# Unités du passage en cours d'une source, choisies au premier lancement et relues du journal à la reprise
+# (une récupération reprise continue sur les mêmes unités)
+# return: unités à parcourir, par ordre de priorité
+def selectionner_unites(historique, journal, source, unites, budget=None):
+    selection = journal.parametre(source, 'selection')
+    if selection is None:
+        choisies = historique.planifier(source, unites, budget)
+        journal.fixer_parametre(source, 'selection', json.dumps([str(unite['cle']) for unite in choisies]))
+        if len(choisies) < len(unites):
+            afficher(f"{source}: {len(choisies)} unités sur {len(unites)} dans le budget de {budget} requêtes")
+        return choisies
+    cles = json.loads(selection)
+    par_cle = {str(unite['cle']): unite for unite in unites}
+    return [par_cle[cle] for cle in cles if cle in par_cle]
+
+def afficher_rapport(historique, source, unites, nb_lignes=None):
+    lignes = historique.rapport(source, unites)
+    afficher(f"\n=== FRAICHEUR {source} ===")
+    afficher(f"{'unité':<28} {'âge (j)':>8} {'taux/j':>8} {'annonces':>9} {'manquantes':>11} {'fraîcheur':>10}")
+    for ligne in lignes[:nb_lignes]:
+        def texte(valeur):
+            return '-' if valeur is None else str(valeur)
+        afficher(f"{ligne['nom'][:28]:<28} {texte(ligne['age_jours']):>8} {texte(ligne['taux_jour']):>8} "
+                 f"{texte(ligne['nb_annonces']):>9} {texte(ligne['manquantes']):>11} {ligne['fraicheur']:>10}")
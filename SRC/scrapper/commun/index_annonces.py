@@ -0,0 +1,114 @@
+# Ce fichier contient l'index persistant des annonces déjà récupérées (récupération incrémentale)
+# Pour chaque (source, id) l'index garde:
+# - une empreinte du contenu de l'annonce tel que renvoyé par la recherche,
+# - la date de première et de dernière apparition,
+# - la ligne extraite lors de la dernière récupération des détails.
+# D'un lancement à l'autre, seules les annonces nouvelles ou modifiées (empreinte différente)
+# ont besoin d'une requête de détail: les autres sont marquées comme toujours en ligne
+# et leur ligne est relue depuis l'index.
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Empreinte du contenu d'une annonce (dictionnaire issu du JSON de l'API)
+# schema: champs qui comptent pour dire qu'une annonce a changé (prix, surface, description, date de modification ...)
+#         Les autres champs du résumé (rang, mise en avant, jetons des urls des photos) changent d'une recherche
+#         à l'autre sans que l'annonce change: ils ne doivent pas entrer dans l'empreinte.
+#         Si aucun champ du schéma n'est dans le contenu (format de réponse inattendu), tout le contenu est pris
+#         pour ne pas donner la même empreinte à toutes les annonces. None: tout le contenu.
+def empreinte(contenu, schema=None):
+    if schema is not None:
+        contenu = schema.extraire_presents(contenu) or contenu
+    texte = json.dumps(contenu, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(texte.encode('utf-8')).hexdigest()
+
+class IndexAnnonces:
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.verrou = threading.Lock()
+        # timeout: attente du verrou d'écriture tenu par un autre processus
+        self.connexion = sqlite3.connect(str(chemin), check_same_thread=False, timeout=60)
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.execute("""
+            CREATE TABLE IF NOT EXISTS annonces (
+                source TEXT NOT NULL,
+                id TEXT NOT NULL,
+                empreinte TEXT NOT NULL,
+                premiere_vue REAL NOT NULL,
+                derniere_vue REAL NOT NULL,
+                ligne TEXT,
+                PRIMARY KEY (source, id)
+            )
+        """)
+        self.connexion.commit()
+
+    # Sépare les annonces d'une page de recherche en deux groupes
+    # empreintes: dictionnaire id -> empreinte du contenu renvoyé par la recherche
+    # return: (ids à récupérer car nouveaux ou modifiés, lignes connues des annonces inchangées)
+    # Les annonces inchangées sont marquées comme vues maintenant
+    def trier(self, source, empreintes):
+        if not empreintes:
+            return [], []
+        ids = [str(i) for i in empreintes]
+        with self.verrou:
+            marqueurs = ','.join('?' * len(ids))
+            curseur = self.connexion.execute(
+                f"SELECT id, empreinte, ligne FROM annonces WHERE source = ? AND id IN ({marqueurs})",
+                [source] + ids
+            )
+            connues = {id_: (emp, ligne) for id_, emp, ligne in curseur}
+
+            a_recuperer = []
+            lignes_connues = []
+            inchanges = []
+            for id_ in empreintes:
+                connue = connues.get(str(id_))
+                if connue is not None and connue[0] == empreintes[id_] and connue[1] is not None:
+                    lignes_connues.append(json.loads(connue[1]))
+                    inchanges.append(str(id_))
+                else:
+                    a_recuperer.append(id_)
+
+            if inchanges:
+                self.connexion.execute(
+                    f"UPDATE annonces SET derniere_vue = ? WHERE source = ? AND id IN ({','.join('?' * len(inchanges))})",
+                    [time.time(), source] + inchanges
+                )
+                self.connexion.commit()
+        return a_recuperer, lignes_connues
+
+    # Enregistre (ou met à jour) des annonces récupérées
+    # lignes: dictionnaire id -> ligne extraite (None si on ne garde pas la ligne)
+    # empreintes: dictionnaire id -> empreinte du contenu renvoyé par la recherche
+    def enregistrer(self, source, lignes, empreintes):
+        maintenant = time.time()
+        valeurs = [
+            (source, str(id_), empreintes[id_], maintenant, maintenant,
+             None if ligne is None else json.dumps(ligne, ensure_ascii=False, default=str))
+            for id_, ligne in lignes.items() if id_ in empreintes
+        ]
+        with self.verrou:
+            self.connexion.executemany("""
+                INSERT INTO annonces VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, id) DO UPDATE SET
+                    empreinte = excluded.empreinte,
+                    derniere_vue = excluded.derniere_vue,
+                    ligne = excluded.ligne
+            """, valeurs)
+            self.connexion.commit()
+
+    # Nombre d'annonces de la source qui n'ont pas été revues depuis `depuis` (timestamp):
+    # après une récupération complète, ce sont les annonces retirées du site
+    def nb_non_vues_depuis(self, source, depuis):
+        with self.verrou:
+            curseur = self.connexion.execute(
+                "SELECT COUNT(*) FROM annonces WHERE source = ? AND derniere_vue < ?", (source, depuis)
+            )
+            return curseur.fetchone()[0]
+
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
@@ -0,0 +1,136 @@
+# Ce fichier contient le journal de reprise des récupérations (SeLoger, Notaires ...)
+# Le journal est une base SQLite qui enregistre, pour chaque (source, département, page) terminée,
+# le nombre de lignes de la page et la position du fichier JSONL (voir ecriture.py) après son écriture.
+# Une récupération interrompue (plantage, cookie expiré ...) reprend exactement où elle s'était arrêtée:
+# les pages déjà journalisées ne sont pas redemandées et le fichier JSONL est repris
+# à la dernière position journalisée.
+# Quand toute la récupération d'une source est terminée, son journal est vidé
+# et le lancement suivant repart de zéro.
+import sqlite3
+import threading
+import time
+
+class JournalCrawl:
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.verrou = threading.Lock()
+        # timeout: attente du verrou d'écriture tenu par un autre processus
+        self.connexion = sqlite3.connect(str(chemin), check_same_thread=False, timeout=60)
+        # WAL: une écriture par page reste rapide et le fichier reste cohérent en cas d'arrêt brutal
+        self.connexion.execute("PRAGMA journal_mode=WAL")
+        self.connexion.execute("PRAGMA synchronous=NORMAL")
+        self.connexion.executescript("""
+            CREATE TABLE IF NOT EXISTS pages_ecrites (
+                source TEXT NOT NULL,
+                departement TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                nb_lignes INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (source, departement, page)
+            );
+            CREATE TABLE IF NOT EXISTS departements (
+                source TEXT NOT NULL,
+                departement TEXT NOT NULL,
+                PRIMARY KEY (source, departement)
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                source TEXT PRIMARY KEY,
+                debut REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS parametres (
+                source TEXT NOT NULL,
+                nom TEXT NOT NULL,
+                valeur TEXT NOT NULL,
+                PRIMARY KEY (source, nom)
+            );
+        """)
+        self.connexion.commit()
+
+    # Date de début (timestamp) de la récupération en cours de la source,
+    # celle du premier lancement si la récupération a été reprise
+    def debut(self, source):
+        with self.verrou:
+            self.connexion.execute("INSERT OR IGNORE INTO runs VALUES (?, ?)", (source, time.time()))
+            self.connexion.commit()
+            return self.connexion.execute("SELECT debut FROM runs WHERE source = ?", (source,)).fetchone()[0]
+
+    # Paramètres fixés au début d'une récupération et à réutiliser à la reprise
+    # (ex: taille des pages de recherche, dont dépend la numérotation des pages journalisées)
+    # return: la valeur enregistrée (string), None si absente
+    def parametre(self, source, nom):
+        with self.verrou:
+            ligne = self.connexion.execute(
+                "SELECT valeur FROM parametres WHERE source = ? AND nom = ?", (source, nom)
+            ).fetchone()
+            return None if ligne is None else ligne[0]
+
+    def fixer_parametre(self, source, nom, valeur):
+        with self.verrou:
+            self.connexion.execute("INSERT OR REPLACE INTO parametres VALUES (?, ?, ?)", (source, nom, str(valeur)))
+            self.connexion.commit()
+
+    # Enregistre une page terminée, à appeler juste après l'écriture de ses lignes
+    # nb_lignes: nombre de lignes de la page
+    # position: position du fichier JSONL après l'écriture de la page
+    def enregistrer_page(self, source, departement, page, nb_lignes, position):
+        with self.verrou:
+            self.connexion.execute(
+                "INSERT OR REPLACE INTO pages_ecrites VALUES (?, ?, ?, ?, ?)",
+                (source, str(departement), page, nb_lignes, position)
+            )
+            self.connexion.commit()
+
+    # return: ensemble des numéros de pages déjà terminées du département
+    def pages_terminees(self, source, departement):
+        with self.verrou:
+            curseur = self.connexion.execute(
+                "SELECT page FROM pages_ecrites WHERE source = ? AND departement = ?", (source, str(departement))
+            )
+            return {page for (page,) in curseur}
+
+    # Position du fichier JSONL après la dernière page journalisée
+    # departement: None si toute la source écrit dans un seul fichier
+    # return: position à laquelle reprendre l'écriture (0 si aucune page)
+    def position(self, source, departement=None):
+        requete = "SELECT MAX(position) FROM pages_ecrites WHERE source = ?"
+        parametres = [source]
+        if departement is not None:
+            requete += " AND departement = ?"
+            parametres.append(str(departement))
+        with self.verrou:
+            return self.connexion.execute(requete, parametres).fetchone()[0] or 0
+
+    # return: nombre de lignes déjà écrites pour le département
+    def nb_lignes(self, source, departement):
+        with self.verrou:
+            curseur = self.connexion.execute(
+                "SELECT SUM(nb_lignes) FROM pages_ecrites WHERE source = ? AND departement = ?",
+                (source, str(departement))
+            )
+            return curseur.fetchone()[0] or 0
+
+    # Un département est terminé quand sa dernière page (page vide) a été atteinte
+    def marquer_termine(self, source, departement):
+        with self.verrou:
+            self.connexion.execute("INSERT OR IGNORE INTO departements VALUES (?, ?)", (source, str(departement)))
+            self.connexion.commit()
+
+    def est_termine(self, source, departement):
+        with self.verrou:
+            curseur = self.connexion.execute(
+                "SELECT 1 FROM departements WHERE source = ? AND departement = ?", (source, str(departement))
+            )
+            return curseur.fetchone() is not None
+
+    # Vide le journal d'une source, à appeler quand toute sa récupération est terminée
+    def terminer(self, source):
+        with self.verrou:
+            self.connexion.execute("DELETE FROM pages_ecrites WHERE source = ?", (source,))
+            self.connexion.execute("DELETE FROM departements WHERE source = ?", (source,))
+            self.connexion.execute("DELETE FROM runs WHERE source = ?", (source,))
+            self.connexion.execute("DELETE FROM parametres WHERE source = ?", (source,))
+            self.connexion.commit()
+
+    def fermer(self):
+        with self.verrou:
+            self.connexion.close()
@@ -0,0 +1,117 @@
+# Ce fichier contient le limiteur de débit adaptatif utilisé par la couche HTTP (transport.py)
+# Chaque hôte a son propre seau à jetons (token bucket): une requête consomme un jeton,
+# les jetons se regénèrent au débit courant de l'hôte (requêtes/seconde).
+# Le débit s'adapte aux réponses du serveur (AIMD):
+# - augmentation additive tant que les réponses sont 200 et rapides,
+# - diminution multiplicative sur 429/403/5xx, erreur réseau ou latence en hausse.
+# On obtient ainsi le débit le plus élevé que le site accepte sans se faire bloquer.
+import threading
+import time
+
+# Codes HTTP signalant que le serveur sature ou nous bloque
+CODES_RALENTISSEMENT = {403, 429}
+
+# Paramètres par défaut d'un hôte
+DEBIT_INITIAL = 1.0     # requêtes/seconde au démarrage
+DEBIT_MIN = 0.1         # jamais moins d'une requête toutes les 10 secondes
+DEBIT_MAX = 10.0        # plafond de requêtes/seconde
+CAPACITE = 2.0          # nombre de jetons accumulables (taille des rafales)
+PAS_ADDITIF = 0.1       # gain de débit par réponse rapide
+FACTEUR_DIMINUTION = 0.5
+SEUIL_LATENCE = 2.0     # une réponse plus lente que SEUIL_LATENCE * latence de référence est un signal de saturation
+MARGE_LATENCE = 0.25    # secondes, écart minimal avec la référence pour ignorer la gigue des réponses rapides
+DELAI_ENTRE_DIMINUTIONS = 1.0  # secondes, une rafale de refus ne divise le débit qu'une fois
+
+# Seau à jetons et état AIMD d'un hôte
+class SeauJetons:
+    def __init__(self, debit_initial=DEBIT_INITIAL, debit_min=DEBIT_MIN, debit_max=DEBIT_MAX, capacite=CAPACITE):
+        self.debit = debit_initial
+        self.debit_min = debit_min
+        self.debit_max = debit_max
+        self.capacite = capacite
+        self.jetons = 1.0
+        self.derniere_recharge = time.monotonic()
+        self.derniere_diminution = 0.0
+        # Moyenne glissante des latences des réponses 200 (référence de l'hôte)
+        self.latence_reference = None
+        # Pause imposée par le serveur (entête Retry-After)
+        self.pause_jusqua = 0.0
+
+    def recharger(self, maintenant):
+        self.jetons = min(self.capacite, self.jetons + (maintenant - self.derniere_recharge) * self.debit)
+        self.derniere_recharge = maintenant
+
+    # Temps d'attente avant de pouvoir consommer un jeton (0 si un jeton est disponible, qui est alors consommé)
+    def reserver(self, maintenant):
+        if maintenant < self.pause_jusqua:
+            return self.pause_jusqua - maintenant
+        self.recharger(maintenant)
+        if self.jetons >= 1:
+            self.jetons -= 1
+            return 0.0
+        return (1 - self.jetons) / self.debit
+
+    def augmenter(self):
+        self.debit = min(self.debit_max, self.debit + PAS_ADDITIF)
+
+    def diminuer(self, maintenant):
+        if maintenant - self.derniere_diminution < DELAI_ENTRE_DIMINUTIONS:
+            return
+        self.debit = max(self.debit_min, self.debit * FACTEUR_DIMINUTION)
+        self.derniere_diminution = maintenant
+
+# Limiteur adaptatif multi-hôtes, partagé par tous les threads
+class LimiteurAdaptatif:
+    def __init__(self):
+        self.seaux = {}
+        self.budgets = {}
+        self.verrou = threading.Lock()
+
+    # Déclare le budget d'un hôte (débit initial, minimal et maximal en requêtes/seconde)
+    def configurer_hote(self, host, debit_initial=DEBIT_INITIAL, debit_min=DEBIT_MIN, debit_max=DEBIT_MAX, capacite=CAPACITE):
+        with self.verrou:
+            self.budgets[host] = dict(debit_initial=debit_initial, debit_min=debit_min, debit_max=debit_max, capacite=capacite)
+            self.seaux[host] = SeauJetons(**self.budgets[host])
+
+    def seau(self, host):
+        if host not in self.seaux:
+            self.seaux[host] = SeauJetons(**self.budgets.get(host, {}))
+        return self.seaux[host]
+
+    # Bloque jusqu'à ce qu'une requête vers l'hôte soit autorisée
+    def acquerir(self, host):
+        while True:
+            with self.verrou:
+                attente = self.seau(host).reserver(time.monotonic())
+            if attente <= 0:
+                return
+            time.sleep(attente)
+
+    # Ajuste le débit de l'hôte d'après la réponse obtenue
+    # status: code HTTP, None en cas d'erreur réseau
+    # latence: durée de la requête en secondes
+    # retry_after: valeur de l'entête Retry-After en secondes, si le serveur l'a fournie
+    def enregistrer(self, host, status, latence, retry_after=None):
+        with self.verrou:
+            seau = self.seau(host)
+            maintenant = time.monotonic()
+            if status is None or status in CODES_RALENTISSEMENT or status >= 500:
+                seau.diminuer(maintenant)
+                if retry_after:
+                    seau.pause_jusqua = max(seau.pause_jusqua, maintenant + retry_after)
+                return
+            if status != 200:
+                return
+            reference = seau.latence_reference
+            if reference is not None and latence > max(SEUIL_LATENCE * reference, reference + MARGE_LATENCE):
+                seau.diminuer(maintenant)
+            else:
+                seau.augmenter()
+            if seau.latence_reference is None:
+                seau.latence_reference = latence
+            else:
+                seau.latence_reference = 0.9 * seau.latence_reference + 0.1 * latence
+
+    def debit(self, host):
+        with self.verrou:
+            return self.seau(host).debit
@@ -0,0 +1,258 @@
+# Ce fichier contient les métriques des récupérations, communes à tous les scrapers
+# Mesures gardées en mémoire pendant la récupération:
+# - requêtes par hôte et par point d'accès (chemin de l'url), par code de réponse,
+# - histogramme des latences et octets envoyés / reçus par point d'accès,
+# - temps de décodage des réponses (par schéma, voir schema.py),
+# - annonces récupérées par source et par département, et leur débit (annonces/s),
+# - événements par hôte (nouvelles tentatives, ouvertures du disjoncteur, voir reprises.py).
+# Les requêtes sont mesurées par la couche HTTP (transport.py), le décodage par les schémas,
+# les annonces par l'ordonnanceur et le pipeline SeLoger: aucun scraper n'a à s'en occuper.
+#
+# Les métriques sont écrites dans un fichier mis à jour pendant la récupération:
+# - format texte Prometheus si le fichier finit par .prom (lisible par le node_exporter, textfile collector),
+# - format JSON sinon.
+# Activation avec la variable d'environnement SCRAPPER_METRIQUES (et SCRAPPER_METRIQUES_INTERVALLE en secondes):
+#   SCRAPPER_METRIQUES=metriques.prom python lancer_sources.py
+# ou depuis python: metriques.demarrer_export('metriques.json', intervalle=5)
+import atexit
+import json
+import math
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+# Bornes des histogrammes de latence des requêtes et de temps de décodage (secondes)
+BORNES_LATENCE = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BORNES_ANALYSE = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+INTERVALLE_EXPORT = 10
+
+# Morceau de chemin qui contient un identifiant (ex: liste d'ids d'annonces de classifiedList)
+_IDENTIFIANT = re.compile(r'\d{3,}')
+
+# Point d'accès d'une url: chemin sans les paramètres, les morceaux qui contiennent un nombre (3 chiffres ou plus)
+# sont remplacés par {id} pour ne pas créer une série par annonce
+def point_acces(url):
+    chemin = urlparse(url).path or '/'
+    return '/'.join('{id}' if _IDENTIFIANT.search(morceau) else morceau for morceau in chemin.split('/'))
+
+class Histogramme:
+    def __init__(self, bornes):
+        self.bornes = bornes
+        # comptes[i]: nombre de valeurs <= bornes[i], le dernier compte est celui des valeurs au-delà
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nb = 0
+
+    def observer(self, valeur):
+        for i, borne in enumerate(self.bornes):
+            if valeur <= borne:
+                self.comptes[i] += 1
+                break
+        else:
+            self.comptes[-1] += 1
+        self.somme += valeur
+        self.nb += 1
+
+    # Comptes cumulés (format Prometheus): nombre de valeurs <= chaque borne, puis le total (+Inf)
+    def cumules(self):
+        total = 0
+        resultat = []
+        for borne, compte in zip(list(self.bornes) + [math.inf], self.comptes):
+            total += compte
+            resultat.append((borne, total))
+        return resultat
+
+    def instantane(self):
+        return {
+            'nb': self.nb,
+            'somme': round(self.somme, 6),
+            'moyenne': round(self.somme / self.nb, 6) if self.nb else None,
+            'cumules': {('+Inf' if math.isinf(borne) else str(borne)): total for borne, total in self.cumules()},
+        }
+
+class Metriques:
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.debut = time.time()
+        # (host, point d'accès, code) -> nombre de requêtes, code 'erreur' pour une requête sans réponse
+        self.requetes = {}
+        # (host, point d'accès) -> Histogramme des latences
+        self.latences = {}
+        # (host, point d'accès) -> [octets envoyés, octets reçus]
+        self.octets = {}
+        # schéma -> Histogramme des temps de décodage, schéma -> nombre d'objets décodés
+        self.analyses = {}
+        self.objets_analyses = {}
+        # (source, département) -> [nombre d'annonces, date de la première page, date de la dernière page]
+        self.annonces = {}
+        # (événement, host) -> nombre
+        self.evenements = {}
+        self._export = None
+
+    # Enregistre une requête (appelé par transport.request)
+    # status: code de réponse, None si la requête n'a pas eu de réponse (erreur réseau, timeout)
+    def requete(self, url, status, latence, envoyes=0, recus=0):
+        morceaux = urlparse(url)
+        cle = (morceaux.netloc, point_acces(url))
+        code = 'erreur' if status is None else str(status)
+        with self.verrou:
+            self.requetes[cle + (code,)] = self.requetes.get(cle + (code,), 0) + 1
+            if cle not in self.latences:
+                self.latences[cle] = Histogramme(BORNES_LATENCE)
+                self.octets[cle] = [0, 0]
+            self.latences[cle].observer(latence)
+            self.octets[cle][0] += envoyes
+            self.octets[cle][1] += recus
+
+    # Enregistre le décodage d'une réponse
+    # nom: nom du schéma (ou de la réponse décodée), nb: nombre d'objets décodés
+    def analyse(self, nom, duree, nb=1):
+        with self.verrou:
+            if nom not in self.analyses:
+                self.analyses[nom] = Histogramme(BORNES_ANALYSE)
+                self.objets_analyses[nom] = 0
+            self.analyses[nom].observer(duree)
+            self.objets_analyses[nom] += nb
+
+    # Compte un événement d'un hôte (ex: 'reprise', 'disjoncteur_ouvert')
+    def evenement(self, nom, host):
+        with self.verrou:
+            self.evenements[(nom, host)] = self.evenements.get((nom, host), 0) + 1
+
+    # Enregistre les annonces d'une page écrite d'un département
+    def annonces_page(self, source, departement, nb):
+        maintenant = time.time()
+        cle = (source, str(departement))
+        with self.verrou:
+            if cle not in self.annonces:
+                self.annonces[cle] = [0, maintenant, maintenant]
+            self.annonces[cle][0] += nb
+            self.annonces[cle][2] = maintenant
+
+    # return: dictionnaire de toutes les métriques (format JSON)
+    def instantane(self):
+        with self.verrou:
+            maintenant = time.time()
+            departements = []
+            for (source, departement), (nb, debut, fin) in sorted(self.annonces.items()):
+                # Débit mesuré depuis la première page (encore en cours: jusqu'à maintenant)
+                duree = max(maintenant - debut, 1e-9)
+                departements.append({
+                    'source': source, 'departement': departement, 'annonces': nb,
+                    'annonces_par_seconde': round(nb / duree, 3), 'derniere_page': round(fin, 3),
+                })
+            return {
+                'debut': round(self.debut, 3),
+                'date': round(maintenant, 3),
+                'requetes': [
+                    {'host': host, 'point_acces': point, 'code': code, 'nb': nb}
+                    for (host, point, code), nb in sorted(self.requetes.items())
+                ],
+                'points_acces': [
+                    {'host': host, 'point_acces': point, 'octets_envoyes': self.octets[(host, point)][0],
+                     'octets_recus': self.octets[(host, point)][1], 'latence': histogramme.instantane()}
+                    for (host, point), histogramme in sorted(self.latences.items())
+                ],
+                'analyses': [
+                    {'schema': nom, 'objets': self.objets_analyses[nom], 'duree': histogramme.instantane()}
+                    for nom, histogramme in sorted(self.analyses.items())
+                ],
+                'departements': departements,
+                'evenements': [
+                    {'evenement': nom, 'host': host, 'nb': nb} for (nom, host), nb in sorted(self.evenements.items())
+                ],
+            }
+
+    # return: métriques au format texte Prometheus
+    def prometheus(self):
+        etat = self.instantane()
+        lignes = []
+
+        # Valeurs échappées selon le format texte Prometheus: \\, \" et \n
+        def etiquettes(**valeurs):
+            return '{' + ','.join(f'{nom}="{echapper(valeur)}"' for nom, valeur in valeurs.items()) + '}'
+
+        def echapper(valeur):
+            return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def histogramme(nom, description, elements):
+            lignes.append(f"# HELP {nom} {description}")
+            lignes.append(f"# TYPE {nom} histogram")
+            for labels, valeurs in elements:
+                for borne, total in valeurs['cumules'].items():
+                    lignes.append(f"{nom}_bucket{etiquettes(**labels, le=borne)} {total}")
+                lignes.append(f"{nom}_sum{etiquettes(**labels)} {valeurs['somme']}")
+                lignes.append(f"{nom}_count{etiquettes(**labels)} {valeurs['nb']}")
+
+        def serie(nom, type_serie, description, elements):
+            lignes.append(f"# HELP {nom} {description}")
+            lignes.append(f"# TYPE {nom} {type_serie}")
+            for labels, valeur in elements:
+                lignes.append(f"{nom}{etiquettes(**labels)} {valeur}")
+
+        serie('scrapper_requetes_total', 'counter', "Requêtes HTTP par point d'accès et code de réponse",
+              [({'host': r['host'], 'point_acces': r['point_acces'], 'code': r['code']}, r['nb']) for r in etat['requetes']])
+        histogramme('scrapper_latence_secondes', "Latence des requêtes HTTP",
+                    [({'host': p['host'], 'point_acces': p['point_acces']}, p['latence']) for p in etat['points_acces']])
+        serie('scrapper_octets_envoyes_total', 'counter', "Octets envoyés (corps des requêtes)",
+              [({'host': p['host'], 'point_acces': p['point_acces']}, p['octets_envoyes']) for p in etat['points_acces']])
+        serie('scrapper_octets_recus_total', 'counter', "Octets reçus (corps des réponses)",
+              [({'host': p['host'], 'point_acces': p['point_acces']}, p['octets_recus']) for p in etat['points_acces']])
+        histogramme('scrapper_analyse_secondes', "Temps de décodage des réponses",
+                    [({'schema': a['schema']}, a['duree']) for a in etat['analyses']])
+        serie('scrapper_objets_analyses_total', 'counter', "Objets décodés",
+              [({'schema': a['schema']}, a['objets']) for a in etat['analyses']])
+        serie('scrapper_annonces_total', 'counter', "Annonces écrites par département",
+              [({'source': d['source'], 'departement': d['departement']}, d['annonces']) for d in etat['departements']])
+        serie('scrapper_annonces_par_seconde', 'gauge', "Débit d'annonces par département",
+              [({'source': d['source'], 'departement': d['departement']}, d['annonces_par_seconde']) for d in etat['departements']])
+        serie('scrapper_evenements_total', 'counter', "Nouvelles tentatives et ouvertures du disjoncteur par hôte",
+              [({'evenement': e['evenement'], 'host': e['host']}, e['nb']) for e in etat['evenements']])
+        return '\n'.join(lignes) + '\n'
+
+    # Écrit les métriques dans un fichier (.prom: texte Prometheus, sinon JSON)
+    # Le fichier est remplacé d'un coup: un lecteur ne voit jamais un fichier à moitié écrit
+    def ecrire(self, chemin):
+        chemin = str(chemin)
+        if chemin.endswith('.prom'):
+            contenu = self.prometheus()
+        else:
+            contenu = json.dumps(self.instantane(), ensure_ascii=False, indent=2)
+        temporaire = f"{chemin}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            f.write(contenu)
+        os.replace(temporaire, chemin)
+
+    # Réécrit le fichier de métriques toutes les `intervalle` secondes (thread en arrière-plan)
+    # et une dernière fois à la fin du programme
+    def demarrer_export(self, chemin, intervalle=INTERVALLE_EXPORT):
+        self.arreter_export()
+        arret = threading.Event()
+
+        def boucle():
+            while not arret.wait(intervalle):
+                self.ecrire(chemin)
+
+        thread = threading.Thread(target=boucle, daemon=True)
+        thread.start()
+        self._export = (chemin, arret, thread)
+        atexit.register(self.arreter_export)
+
+    def arreter_export(self):
+        if self._export is None:
+            return
+        chemin, arret, thread = self._export
+        self._export = None
+        arret.set()
+        thread.join()
+        self.ecrire(chemin)
+
+# Métriques partagées par tous les scrapers
+metriques = Metriques()
+
+if os.environ.get('SCRAPPER_METRIQUES'):
+    metriques.demarrer_export(
+        os.environ['SCRAPPER_METRIQUES'], float(os.environ.get('SCRAPPER_METRIQUES_INTERVALLE', INTERVALLE_EXPORT))
+    )
@@ -0,0 +1,226 @@
+# Ce fichier contient l'ordonnanceur global des sources d'annonces (voir source.py)
+# Toutes les sources sont récupérées en même temps dans une seule boucle asyncio:
+# chaque hôte a son propre plafond de requêtes simultanées (Source.concurrency) et son propre débit
+# (limiteur adaptatif de transport.py), une source lente ne retarde donc pas les autres.
+#
+# Pour chaque unité (département) d'une source:
+# - la page 1 donne le nombre total d'annonces quand la source le fournit: les pages suivantes
+#   sont alors planifiées et récupérées en parallèle, sinon elles sont parcourues l'une après l'autre,
+# - seules les annonces nouvelles ou modifiées (index des annonces) passent par recuperer_details,
+# - chaque page est écrite dans le fichier JSONL de l'unité puis enregistrée dans le journal de reprise,
+# - à la fin, le CSV de l'unité est écrit (ou toutes les unités sont fusionnées dans Source.fichier_csv).
+# Une unité dont une page a échoué n'est pas marquée terminée: elle est reprise au lancement suivant.
+# Chaque passage complet d'une unité est enregistré dans l'historique de fraîcheur (fraicheur.py):
+# les unités sont parcourues des moins fraîches aux plus fraîches, et seulement dans la limite
+# de Source.budget_requetes quand il est fixé. Le coût des unités jamais parcourues n'étant qu'estimé,
+# les requêtes sont aussi comptées pendant le passage: une fois le budget dépensé, plus aucune unité
+# n'est commencée (les unités en cours sont finies), les autres unités choisies sont reprises au lancement suivant.
+import asyncio
+from pathlib import Path
+from commun.concurrence import LimiteurHotes
+from commun.journal_crawl import JournalCrawl
+from commun.index_annonces import IndexAnnonces, empreinte
+from commun.ecriture import EcrivainJsonl, exporter_csv, lire_csv_lots
+from commun.fraicheur import HistoriqueFraicheur, selectionner_unites
+from commun.metriques import metriques
+from commun.affichage import afficher
+
+# Plafond de requêtes simultanées des hôtes qui ne sont pas l'hôte principal d'une source
+CONCURRENCY_DEFAUT = 2
+
+def afficher_erreur(message, e):
+    afficher(message)
+    afficher(f"Type d'erreur: {type(e).__name__}")
+    afficher(f"Message d'erreur: {str(e)} \n")
+
+class Ordonnanceur:
+    # sources: liste des sources à récupérer (instances de Source)
+    # journal: journal de reprise (JournalCrawl), index: index des annonces (IndexAnnonces)
+    def __init__(self, sources, journal, index, concurrency=CONCURRENCY_DEFAUT):
+        self.sources = sources
+        self.journal = journal
+        self.index = index
+        self.limiteur = LimiteurHotes(concurrency, {source.host: source.concurrency for source in sources})
+        # Historique de fraîcheur des unités, gardé dans la base de l'index des annonces
+        self.fraicheur = HistoriqueFraicheur(index.chemin)
+        # Requêtes faites par chaque source pendant ce lancement (budget de requêtes)
+        self.requetes = {}
+
+    # Récupère toutes les sources en même temps
+    # return: dictionnaire nom de la source -> nombre de lignes exportées (None si la récupération est incomplète)
+    async def executer(self):
+        for source in self.sources:
+            source.configurer()
+        try:
+            resultats = await asyncio.gather(*[self.executer_source(source) for source in self.sources])
+        finally:
+            self.limiteur.fermer()
+            self.fraicheur.fermer()
+        return {source.nom: resultat for source, resultat in zip(self.sources, resultats)}
+
+    async def executer_source(self, source):
+        try:
+            return await source.executer(self)
+        except Exception as e:
+            afficher_erreur(f"Erreur lors de la récupération de la source {source.nom}", e)
+            return None
+
+    # Exécute une fonction bloquante de la source sous le plafond de son hôte
+    async def appeler(self, source, fonction, *args):
+        return await self.limiteur.appeler_hote(source.host, fonction, *args)
+
+    # Récupération générique d'une source, unité par unité (plusieurs unités à la fois)
+    # return: nombre de lignes exportées par ce lancement, None si des unités restent à reprendre
+    async def parcourir_source(self, source):
+        debut_run = self.journal.debut(source.nom)
+        # La liste des unités peut demander des requêtes (identifiants des lieux au premier lancement)
+        toutes = await self.appeler(source, source.unites)
+        # Unités du passage: les moins fraîches d'abord, dans la limite du budget de requêtes
+        # (une source fusionnée dans un seul fichier sans colonne_unite est toujours parcourue en entier)
+        budget = None if source.fichier_csv is not None and source.colonne_unite is None else source.budget_requetes
+        unites = selectionner_unites(self.fraicheur, self.journal, source.nom, toutes, budget)
+        file_unites = asyncio.Queue()
+        for unite in unites:
+            if self.journal.est_termine(source.nom, unite['cle']):
+                afficher(f"DEJA RECUPERE >>> {source.nom} | {unite['nom']}")
+                continue
+            file_unites.put_nowait(unite)
+
+        nb_lignes = [0]
+        async def worker():
+            while not file_unites.empty():
+                # Budget dépensé: les unités restantes attendent le lancement suivant
+                if budget is not None and self.requetes.get(source.nom, 0) >= budget:
+                    return
+                unite = file_unites.get_nowait()
+                nb_lignes[0] += await self.parcourir_unite(source, unite)
+        await asyncio.gather(*[worker() for _ in range(source.concurrency)])
+
+        if not file_unites.empty():
+            afficher(f"\n{source.nom}: budget de {budget} requêtes dépensé ({self.requetes.get(source.nom, 0)} requêtes),"
+                     f" {file_unites.qsize()} unités reportées au prochain lancement")
+            return None
+        termine = all(self.journal.est_termine(source.nom, unite['cle']) for unite in unites)
+        if not termine:
+            afficher(f"\n⚠ {source.nom}: récupération incomplète, relancer pour reprendre les unités en erreur")
+            return None
+
+        if source.fichier_csv is not None:
+            chemins = [source.chemin(unite, 'jsonl') for unite in unites]
+            # Passage sur une partie des unités: les lignes des autres unités sont gardées du fichier précédent
+            complement = None
+            if len(unites) < len(toutes) and source.colonne_unite is not None and Path(source.fichier_csv).exists():
+                complement = lire_csv_lots(source.fichier_csv,
+                                           (source.colonne_unite, [source.valeur_unite(unite) for unite in unites]))
+            nb_lignes[0] = exporter_csv([chemin for chemin in chemins if chemin.exists()], source.fichier_csv,
+                                        complement=complement)
+            for chemin in chemins:
+                chemin.unlink(missing_ok=True)
+            afficher(f"\nExport {source.nom} terminé → {source.fichier_csv} ({nb_lignes[0]} lignes)")
+
+        # Récupération complète: le journal de la source est vidé, le prochain lancement repartira de zéro
+        self.journal.terminer(source.nom)
+        # Les annonces des unités hors du passage ne sont pas revues: le compte n'a de sens que sur toutes les unités
+        if len(unites) == len(toutes):
+            afficher(f"{source.nom}: {self.index.nb_non_vues_depuis(source.nom, debut_run)} annonces retirées depuis le dernier export")
+        return nb_lignes[0]
+
+    # Récupération d'une unité
+    # return: nombre de lignes du CSV de l'unité (0 si les unités sont fusionnées à la fin de la source)
+    async def parcourir_unite(self, source, unite):
+        cle = str(unite['cle'])
+        pages_faites = self.journal.pages_terminees(source.nom, cle)
+        ecrivain = EcrivainJsonl(source.chemin(unite, 'jsonl'), position=self.journal.position(source.nom, cle))
+        echec = False
+        # Requêtes et annonces nouvelles ou modifiées de ce lancement (historique de fraîcheur)
+        compteurs = {'requetes': 0, 'nouvelles': 0}
+
+        # Une requête de l'unité, comptée aussi dans le budget de la source
+        def compter_requete():
+            compteurs['requetes'] += 1
+            self.requetes[source.nom] = self.requetes.get(source.nom, 0) + 1
+
+        # Tri des annonces d'une page (index), détail des nouvelles, écriture et journalisation
+        async def traiter_page(page, resumes):
+            empreintes = {str(resume['id']): empreinte(resume, source.schema_empreinte) for resume in resumes}
+            a_recuperer, lignes = self.index.trier(source.nom, empreintes)
+            if a_recuperer:
+                # Le détail ne coûte une requête que si la source en envoie une (pas Notaires ni Bien'ici)
+                if source.detail_par_requete():
+                    compter_requete()
+                compteurs['nouvelles'] += len(a_recuperer)
+                ids = set(a_recuperer)
+                details = await self.appeler(source, source.recuperer_details, unite,
+                                             [resume for resume in resumes if str(resume['id']) in ids])
+                nouvelles = [source.vers_ligne(unite, annonce) for annonce in details]
+                self.index.enregistrer(source.nom, {str(ligne['id']): ligne for ligne in nouvelles}, empreintes)
+                lignes = lignes + nouvelles
+            position = ecrivain.ecrire_page(lignes)
+            self.journal.enregistrer_page(source.nom, cle, page, len(lignes), position)
+            metriques.annonces_page(source.nom, cle, len(lignes))
+
+        async def recuperer_page(page):
+            compter_requete()
+            resumes, _ = await self.appeler(source, source.chercher, unite, page)
+            if resumes:
+                await traiter_page(page, resumes)
+            return resumes
+
+        try:
+            total = self.journal.parametre(source.nom, f"total_{cle}")
+            fin = False
+            if 1 not in pages_faites:
+                compter_requete()
+                resumes, total_page = await self.appeler(source, source.chercher, unite, 1)
+                if total_page is not None:
+                    total = total_page
+                    self.journal.fixer_parametre(source.nom, f"total_{cle}", total)
+                if resumes:
+                    await traiter_page(1, resumes)
+                else:
+                    fin = True
+
+            if not fin and total is not None:
+                # Pages planifiées d'après le total: récupérées en parallèle, sous le plafond de l'hôte
+                nb_pages = min(source.max_pages, -(-int(total) // source.par_page))
+                pages = [page for page in range(2, nb_pages + 1) if page not in pages_faites]
+                resultats = await asyncio.gather(*[recuperer_page(page) for page in pages], return_exceptions=True)
+                for page, resultat in zip(pages, resultats):
+                    if isinstance(resultat, Exception):
+                        afficher_erreur(f"Erreur {source.nom} | {unite['nom']} à la page {page}", resultat)
+                        echec = True
+            elif not fin:
+                # Total inconnu: parcours page par page jusqu'à une page vide
+                for page in range(2, source.max_pages + 1):
+                    if page in pages_faites:
+                        continue
+                    if not await recuperer_page(page):
+                        break
+        except Exception as e:
+            afficher_erreur(f"Erreur {source.nom} | {unite['nom']}", e)
+            echec = True
+
+        ecrivain.fermer()
+        nb_csv = 0
+        if source.fichier_csv is None:
+            nb_csv = exporter_csv([source.chemin(unite, 'jsonl')], source.chemin(unite, 'csv'))
+            afficher(f"FIN >>> {source.nom} | {unite['nom']}: {nb_csv} annonces")
+        if not echec:
+            self.fraicheur.enregistrer(source.nom, cle, self.journal.nb_lignes(source.nom, cle),
+                                       compteurs['nouvelles'], compteurs['requetes'])
+            self.journal.marquer_termine(source.nom, cle)
+            # Le fichier JSONL n'est plus utile, sauf s'il doit être fusionné à la fin de la source
+            if source.fichier_csv is None:
+                ecrivain.supprimer()
+        return nb_csv
+
+# Récupère des sources en même temps, avec un journal de reprise et un index des annonces communs
+# return: dictionnaire nom de la source -> nombre de lignes exportées (None si la récupération est incomplète)
+def executer_sources(sources, journal_path, index_path, concurrency=CONCURRENCY_DEFAUT):
+    journal = JournalCrawl(journal_path)
+    index = IndexAnnonces(index_path)
+    try:
+        return asyncio.run(Ordonnanceur(sources, journal, index, concurrency).executer())
+    finally:
+        journal.fermer()
+        index.fermer()
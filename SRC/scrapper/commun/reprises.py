@@ -0,0 +1,123 @@
+# Ce fichier contient les nouvelles tentatives des requêtes en échec et le disjoncteur par hôte,
+# utilisés par la couche HTTP (transport.py) pour toutes les requêtes de tous les scrapers
+# Nouvelles tentatives:
+# - une requête sans réponse (erreur réseau, timeout) ou avec un code temporaire (429, 5xx ...)
+#   est relancée jusqu'à `tentatives` fois,
+# - l'attente avant chaque nouvelle tentative double à chaque échec (base, 2*base, 4*base ... jusqu'à plafond),
+#   tirée au hasard entre 0 et cette valeur (gigue) pour que les workers ne relancent pas tous en même temps,
+#   et au moins égale à l'entête Retry-After quand le site l'envoie.
+# Une nouvelle tentative ne coûte qu'une requête: la page n'est pas perdue et le département n'est pas
+# à reprendre au lancement suivant.
+# Disjoncteur:
+# - après `seuil` échecs consécutifs vers un hôte (blocage 403 / 429, erreurs serveur, timeouts),
+#   le disjoncteur s'ouvre: toutes les requêtes vers cet hôte, de tous les workers, attendent `pause` secondes,
+# - à la fin de la pause, les requêtes repartent: une réussite referme le disjoncteur,
+#   un nouvel échec le rouvre avec une pause deux fois plus longue (jusqu'à pause_max).
+# Une page dont toutes les tentatives ont échoué lève PageEchouee (voir les scrapers): elle n'est pas
+# confondue avec une page vide, qui signifie la fin des résultats.
+import random
+import threading
+import time
+from commun.metriques import metriques
+from commun.affichage import afficher
+
+# Codes de réponse temporaires: la requête est relancée
+STATUTS_A_REPRENDRE = {408, 425, 429, 500, 502, 503, 504}
+# Codes de réponse d'un blocage: comptés par le disjoncteur, sans nouvelle tentative immédiate
+STATUTS_BLOCAGE = {403}
+
+# Une page dont toutes les tentatives ont échoué (à distinguer d'une page vide: fin des résultats)
+class PageEchouee(Exception):
+    pass
+
+class PolitiqueReprises:
+    def __init__(self, tentatives=4, base=0.5, plafond=30.0):
+        self.tentatives = tentatives
+        self.base = base
+        self.plafond = plafond
+
+    # Attente avant la nouvelle tentative numéro `tentative` (1 pour la première relance)
+    # retry_after: délai demandé par le site (entête Retry-After), None s'il n'y en a pas
+    def delai(self, tentative, retry_after=None):
+        delai = random.uniform(0, min(self.plafond, self.base * 2 ** (tentative - 1)))
+        if retry_after is not None:
+            delai = max(delai, min(retry_after, self.plafond))
+        return delai
+
+class Disjoncteur:
+    def __init__(self, host, seuil=5, pause=30.0, pause_max=600.0):
+        self.host = host
+        self.seuil = seuil
+        self.pause_initiale = pause
+        self.pause = pause
+        self.pause_max = pause_max
+        self.echecs = 0
+        # Date (time.monotonic) jusqu'à laquelle les requêtes attendent, 0 si le disjoncteur est fermé
+        self.ouvert_jusqu_a = 0.0
+        # Vrai entre la fin d'une pause et la première réponse: un échec rouvre aussitôt le disjoncteur
+        self.essai = False
+        self.verrou = threading.Lock()
+
+    # Temps de pause restant (0 si le disjoncteur est fermé), à appeler avec le verrou
+    # A la fin d'une pause, le disjoncteur passe à l'essai
+    def _reste(self):
+        if not self.ouvert_jusqu_a:
+            return 0
+        reste = self.ouvert_jusqu_a - time.monotonic()
+        if reste <= 0:
+            self.ouvert_jusqu_a = 0.0
+            self.essai = True
+            return 0
+        return reste
+
+    # Attend la fin de la pause si le disjoncteur est ouvert (appelé avant chaque requête)
+    def attendre(self):
+        while True:
+            with self.verrou:
+                reste = self._reste()
+            if not reste:
+                return
+            time.sleep(reste)
+
+    def succes(self):
+        with self.verrou:
+            self.echecs = 0
+            self.essai = False
+            self.pause = self.pause_initiale
+
+    def echec(self):
+        with self.verrou:
+            # Réponses des requêtes parties avant l'ouverture: déjà comptées
+            if self._reste():
+                return
+            self.echecs += 1
+            if self.echecs < self.seuil and not self.essai:
+                return
+            # Réouverture après une pause: la pause suivante est plus longue
+            if self.essai:
+                self.pause = min(self.pause * 2, self.pause_max)
+            self.essai = False
+            self.echecs = 0
+            self.ouvert_jusqu_a = time.monotonic() + self.pause
+            pause = self.pause
+        metriques.evenement('disjoncteur_ouvert', self.host)
+        afficher(f"⚠ {self.host}: trop d'échecs consécutifs, toutes les requêtes attendent {pause:.0f}s")
+
+# Disjoncteurs de tous les hôtes, créés à la première requête vers chaque hôte
+class Disjoncteurs:
+    def __init__(self):
+        self.disjoncteurs = {}
+        self.reglages = {}
+        self.verrou = threading.Lock()
+
+    # Réglage du disjoncteur d'un hôte (seuil, pause, pause_max), à appeler avant ses premières requêtes
+    def configurer_hote(self, host, **reglages):
+        with self.verrou:
+            self.reglages[host] = reglages
+            self.disjoncteurs.pop(host, None)
+
+    def hote(self, host):
+        with self.verrou:
+            if host not in self.disjoncteurs:
+                self.disjoncteurs[host] = Disjoncteur(host, **self.reglages.get(host, {}))
+            return self.disjoncteurs[host]
@@ -0,0 +1,186 @@
+# Ce fichier contient le décodage JSON des réponses des sites, guidé par un schéma des champs gardés
+# Un schéma associe chaque colonne de sortie au chemin du champ dans le JSON, ex:
+#   SCHEMA = Schema('Annonce', {
+#       'id': champ('id', defaut=''),
+#       'price': champ('rawData', 'price', defaut=0),
+#       'surface': champ('rawData', 'surface', 'main', defaut=0),
+#   })
+#   lignes = SCHEMA.decoder_liste(response.content)
+# Une fois les requêtes lancées en parallèle, le décodage et l'extraction des champs deviennent
+# le travail le plus coûteux en CPU:
+# - si msgspec est installé, le schéma est converti en structures typées et seuls les champs gardés
+#   sont décodés (le reste du JSON est sauté sans créer d'objets python),
+# - sinon le JSON est décodé par orjson (ou json) et les chemins sont parcourus sans créer
+#   les dictionnaires vides des chaînes .get('x', {}).get('y', {}).
+# Règles d'extraction (comme les chaînes .get): un champ absent donne la valeur par défaut,
+# un champ présent à null donne None.
+#
+# Le temps de décodage de chaque réponse est compté dans les métriques (metriques.py), par schéma.
+# msgspec et orjson sont dans scrapper/requirements.txt, mais restent facultatifs: sans eux le décodage
+# passe par le module json de la bibliothèque standard, avec les mêmes résultats.
+#
+# Ce fichier contient aussi payload_avec, qui construit le payload d'une requête à partir d'un modèle
+# en ne recopiant que les dictionnaires modifiés (au lieu d'un copy.deepcopy par requête).
+import json
+import time
+from commun.metriques import metriques
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Marqueur d'un champ absent du JSON
+_ABSENT = object()
+
+# Décode un contenu JSON (bytes ou str) avec le décodeur le plus rapide disponible
+def charger_json(contenu):
+    if orjson is not None:
+        return orjson.loads(contenu)
+    return json.loads(contenu)
+
+# Description d'une colonne: chemin du champ dans le JSON, valeur par défaut si absent,
+# et sous-schéma si le champ est une liste d'objets à décoder avec ce sous-schéma
+class Champ:
+    def __init__(self, chemin, defaut=None, liste=None):
+        self.chemin = tuple(chemin)
+        self.defaut = defaut
+        self.liste = liste
+
+def champ(*chemin, defaut=None, liste=None):
+    return Champ(chemin, defaut, liste)
+
+class Schema:
+    # nom: nom de la structure typée (msgspec)
+    # champs: dictionnaire colonne de sortie -> Champ
+    def __init__(self, nom, champs):
+        self.nom = nom
+        self.champs = list(champs.items())
+        self._decodeur_objet = None
+        self._decodeur_liste = None
+
+    # Valeur du champ au bout du chemin d'un objet décodé (dictionnaires et listes python)
+    @staticmethod
+    def _valeur(objet, chemin):
+        valeur = objet
+        for cle in chemin:
+            if type(valeur) is not dict:
+                return _ABSENT
+            valeur = valeur.get(cle, _ABSENT)
+            if valeur is _ABSENT:
+                return _ABSENT
+        return valeur
+
+    # Extraction des colonnes d'un objet décodé
+    # return: dictionnaire colonne -> valeur
+    def extraire(self, objet):
+        ligne = {}
+        for colonne, description in self.champs:
+            valeur = self._valeur(objet, description.chemin)
+            if valeur is _ABSENT:
+                valeur = description.defaut
+            elif description.liste is not None and valeur is not None:
+                valeur = [description.liste.extraire(element) for element in valeur]
+            ligne[colonne] = valeur
+        return ligne
+
+    # Champs du schéma présents dans un objet décodé (les champs absents sont omis, sans valeur par défaut)
+    # return: dictionnaire colonne -> valeur
+    def extraire_presents(self, objet):
+        ligne = {}
+        for colonne, description in self.champs:
+            valeur = self._valeur(objet, description.chemin)
+            if valeur is not _ABSENT:
+                ligne[colonne] = valeur
+        return ligne
+
+    # Structure msgspec qui ne décode que les champs du schéma
+    # Les chemins qui partagent un début (ex: rawData.price et rawData.surface.main) partagent la sous-structure
+    def type_msgspec(self):
+        arbre = {}
+        for _, description in self.champs:
+            noeud = arbre
+            for cle in description.chemin[:-1]:
+                noeud = noeud.setdefault(cle, {})
+                if not isinstance(noeud, dict):
+                    raise ValueError(f"{self.nom}: le champ {cle} est à la fois une valeur et un objet")
+            feuille = description.chemin[-1]
+            noeud[feuille] = list[description.liste.type_msgspec()] if description.liste is not None else None
+
+        def construire(nom, noeud):
+            champs = []
+            for cle, sous_noeud in noeud.items():
+                if isinstance(sous_noeud, dict):
+                    type_champ = construire(f"{nom}_{cle}", sous_noeud) | None
+                elif sous_noeud is None:
+                    type_champ = object
+                else:
+                    type_champ = sous_noeud | None
+                champs.append((cle, type_champ, msgspec.UNSET))
+            return msgspec.defstruct(nom, champs)
+
+        return construire(self.nom, arbre)
+
+    # Décodage d'un contenu JSON dont la racine est un objet
+    # return: dictionnaire colonne -> valeur
+    def decoder_objet(self, contenu):
+        debut = time.perf_counter()
+        ligne = self._decoder_objet(contenu)
+        metriques.analyse(self.nom, time.perf_counter() - debut)
+        return ligne
+
+    def _decoder_objet(self, contenu):
+        if msgspec is not None:
+            if self._decodeur_objet is None:
+                self._decodeur_objet = msgspec.json.Decoder(self.type_msgspec())
+            try:
+                # to_builtins convertit les structures en dictionnaires, sans les champs absents (UNSET)
+                return self.extraire(msgspec.to_builtins(self._decodeur_objet.decode(contenu)))
+            except msgspec.ValidationError:
+                # Type inattendu dans la réponse: décodage complet, les champs sont extraits sans contrôle de type
+                pass
+        objet = charger_json(contenu)
+        if not isinstance(objet, dict):
+            raise TypeError(f"{self.nom}: la réponse n'est pas un objet (type: {type(objet)})")
+        return self.extraire(objet)
+
+    # Décodage d'un contenu JSON dont la racine est une liste d'objets
+    # return: liste de dictionnaires colonne -> valeur
+    def decoder_liste(self, contenu):
+        debut = time.perf_counter()
+        lignes = self._decoder_liste(contenu)
+        metriques.analyse(self.nom, time.perf_counter() - debut, len(lignes))
+        return lignes
+
+    def _decoder_liste(self, contenu):
+        if msgspec is not None:
+            if self._decodeur_liste is None:
+                self._decodeur_liste = msgspec.json.Decoder(list[self.type_msgspec()])
+            try:
+                objets = msgspec.to_builtins(self._decodeur_liste.decode(contenu))
+                return [self.extraire(objet) for objet in objets]
+            except msgspec.ValidationError:
+                pass
+        objets = charger_json(contenu)
+        if not isinstance(objets, list):
+            raise TypeError(f"{self.nom}: la réponse n'est pas une liste (type: {type(objets)})")
+        return [self.extraire(objet) for objet in objets]
+
+# Payload construit à partir d'un modèle, avec des valeurs remplacées
+# modifications: dictionnaire chemin (tuple de clés) -> nouvelle valeur
+# Seuls les dictionnaires sur le chemin des valeurs modifiées sont recopiés, le reste est partagé
+# avec le modèle: le payload ne doit donc pas être modifié après coup (il est seulement envoyé)
+def payload_avec(modele, modifications):
+    payload = dict(modele)
+    for chemin, valeur in modifications.items():
+        noeud = payload
+        for cle in chemin[:-1]:
+            noeud[cle] = dict(noeud[cle])
+            noeud = noeud[cle]
+        noeud[chemin[-1]] = valeur
+    return payload
@@ -0,0 +1,89 @@
+# Ce fichier contient l'interface commune des sources d'annonces (SeLoger, Notaires, Bien'ici ...)
+# Une source découpe sa récupération en unités (en général un département) et sait:
+# - chercher une page de résultats d'une unité (résumés des annonces, chacun avec une clé 'id'),
+# - récupérer le détail des annonces nouvelles ou modifiées (par défaut la recherche suffit),
+# - transformer une annonce en ligne du fichier de sortie.
+# Tout le reste (reprise, index des annonces, écriture en flux, plafond de requêtes par hôte,
+# récupération simultanée de toutes les sources) est fait par l'ordonnanceur (ordonnanceur.py).
+#
+# Exemple minimal:
+#   class SourceExemple(Source):
+#       nom = 'exemple'
+#       host = 'www.exemple.fr'
+#       def unites(self):
+#           return [{'cle': '75', 'nom': 'Paris'}]
+#       def chercher(self, unite, page):
+#           data = transport.get(URL, params={'dep': unite['cle'], 'page': page}).json()
+#           return data['annonces'], data['total']
+#       def vers_ligne(self, unite, annonce):
+#           return {'id': annonce['id'], 'prix': annonce['prix']}
+from pathlib import Path
+
+class Source:
+    # Nom de la source dans le journal de reprise et l'index des annonces
+    nom = ''
+    # Hôte interrogé par la source: le plafond de requêtes simultanées et le débit s'appliquent par hôte
+    host = ''
+    # Nombre maximal de requêtes simultanées vers l'hôte
+    concurrency = 2
+    # Nombre d'annonces par page de recherche et nombre maximal de pages par unité
+    par_page = 50
+    max_pages = 200
+    # Dossier des fichiers produits
+    dossier = Path('.')
+    # None: un fichier CSV par unité (chemin(unite, 'csv'))
+    # sinon: nom du fichier CSV unique où toutes les unités sont fusionnées à la fin de la récupération
+    fichier_csv = None
+    # Nombre maximal de requêtes d'un passage, None pour parcourir toutes les unités
+    # Les unités sont alors choisies selon la fraîcheur de leurs données (voir fraicheur.py)
+    budget_requetes = None
+    # Colonne du fichier_csv qui identifie l'unité d'une ligne: pour un passage sur une partie des unités,
+    # les lignes des autres unités sont gardées depuis le fichier précédent (None: toutes les unités sont parcourues)
+    colonne_unite = None
+    # Champs des résumés de la recherche qui entrent dans l'empreinte des annonces (Schema, voir index_annonces.py)
+    # None: tout le résumé
+    schema_empreinte = None
+
+    # Déclare les entêtes, cookies et le budget de débit de l'hôte (voir transport.py)
+    def configurer(self):
+        pass
+
+    # return: liste des unités à récupérer (dictionnaires avec au moins les clés 'cle' et 'nom')
+    # (fonction bloquante, exécutée dans un thread)
+    def unites(self):
+        raise NotImplementedError
+
+    # Recherche d'une page de résultats d'une unité (fonction bloquante, exécutée dans un thread)
+    # return: (liste des résumés des annonces, nombre total d'annonces de l'unité ou None s'il est inconnu)
+    #         une liste vide signifie que la dernière page est dépassée,
+    #         une page en échec doit lever une exception (ex: PageEchouee de reprises.py), jamais renvoyer une liste vide
+    def chercher(self, unite, page):
+        raise NotImplementedError
+
+    # Détail des annonces nouvelles ou modifiées (fonction bloquante, exécutée dans un thread)
+    # resumes: résumés de la recherche à compléter
+    # return: liste des annonces complètes, passées ensuite à vers_ligne
+    def recuperer_details(self, unite, resumes):
+        return resumes
+
+    # Vrai si recuperer_details envoie une requête: la source remplace la méthode par défaut
+    # (qui rend les résumés de la recherche tels quels, sans requête)
+    def detail_par_requete(self):
+        return type(self).recuperer_details is not Source.recuperer_details
+
+    # return: ligne du fichier de sortie (dictionnaire avec une clé 'id')
+    def vers_ligne(self, unite, annonce):
+        raise NotImplementedError
+
+    # Valeur de colonne_unite dans les lignes de l'unité
+    def valeur_unite(self, unite):
+        return str(unite['cle'])
+
+    # Chemin d'un fichier d'une unité ('jsonl' pendant la récupération, 'csv' pour le fichier final)
+    def chemin(self, unite, extension):
+        return Path(self.dossier) / f"{self.nom}_{unite['cle']}.{extension}"
+
+    # Récupération complète de la source par l'ordonnanceur
+    # Une source qui a son propre mode de récupération (ex: le pipeline SeLoger) peut la remplacer
+    async def executer(self, ordonnanceur):
+        return await ordonnanceur.parcourir_source(self)
@@ -0,0 +1,193 @@
+# Ce fichier contient la couche HTTP partagée par tous les scrapers
+# Une session requests est créée par hôte et réutilisée pour toutes les requêtes vers cet hôte:
+# les connexions restent ouvertes (keep-alive) et la poignée de main TLS n'est faite
+# qu'une fois par connexion au lieu d'une fois par page.
+# Les entêtes et cookies d'un hôte sont appliqués une seule fois, à la création de sa session.
+# Toutes les requêtes passent par le limiteur de débit adaptatif (limiteur_debit.py),
+# le budget d'un hôte se règle avec transport.limiteur.configurer_hote(host, debit_initial=..., debit_max=...)
+# Les réponses peuvent être enregistrées sur disque puis rejouées sans réseau (cache_http.py),
+# avec configurer_cache ou les variables d'environnement SCRAPPER_CACHE_HTTP et SCRAPPER_CACHE_DIR
+# Chaque requête est comptée dans les métriques (metriques.py): code de réponse, latence, octets
+# Les requêtes en échec temporaire (réseau, 429, 5xx) sont relancées avec une attente croissante,
+# et un disjoncteur par hôte suspend toutes les requêtes vers un hôte qui bloque (reprises.py)
+#
+# Utilisation:
+#   from commun import transport
+#   transport.configurer_hote("www.seloger.com", headers=headers, cookies=cookies)
+#   result = transport.post("https://www.seloger.com/serp-bff/search", json=filters)
+import os
+import threading
+import time
+from urllib.parse import urlparse, urlunparse
+import requests
+from requests.adapters import HTTPAdapter
+from commun.limiteur_debit import LimiteurAdaptatif
+from commun.cache_http import CacheHttp, DOSSIER_DEFAUT, REJOUER
+from commun.metriques import metriques
+from commun.reprises import PolitiqueReprises, Disjoncteurs, STATUTS_A_REPRENDRE, STATUTS_BLOCAGE
+
+# Nombre d'hôtes différents gardés en cache par l'adaptateur
+POOL_CONNECTIONS = 10
+# Nombre de connexions gardées ouvertes par hôte,
+# doit être au moins égal au nombre de requêtes simultanées vers un même hôte
+POOL_MAXSIZE = 32
+# Délai maximal d'une requête sans réponse (secondes), au-delà elle est relancée
+TIMEOUT_DEFAUT = 30
+
+# Configuration (entêtes, cookies, taille du pool) déclarée pour chaque hôte
+_configurations = {}
+# Sessions ouvertes, une par hôte
+_sessions = {}
+_verrou = threading.Lock()
+
+# Limiteur de débit partagé par toutes les requêtes de tous les scrapers
+limiteur = LimiteurAdaptatif()
+
+# Nouvelles tentatives et disjoncteurs partagés par toutes les requêtes
+# (réglage par hôte: transport.disjoncteurs.configurer_hote(host, seuil=..., pause=...))
+reprises = PolitiqueReprises()
+disjoncteurs = Disjoncteurs()
+
+# Cache des réponses brutes (None: désactivé)
+cache = None
+
+# Redirection d'hôtes: hôte -> adresse qui répond à sa place (ex: serveur simulé du benchmark)
+_redirections = {}
+
+# Envoie les requêtes destinées à `host` vers `adresse` (ex: "http://127.0.0.1:8080"), None pour annuler
+# La session, le limiteur de débit et les plafonds restent ceux de l'hôte d'origine
+def rediriger_hote(host, adresse=None):
+    if adresse is None:
+        _redirections.pop(host, None)
+    else:
+        _redirections[host] = urlparse(adresse)
+
+def _url_redirigee(url):
+    morceaux = urlparse(url)
+    cible = _redirections.get(morceaux.netloc)
+    if cible is None:
+        return url
+    return urlunparse(morceaux._replace(scheme=cible.scheme, netloc=cible.netloc))
+
+# Active l'enregistrement ('enregistrer') ou le rejeu ('rejouer') des réponses, None pour désactiver
+# dossier: dossier du cache (par défaut scrapper/cache_http)
+def configurer_cache(dossier=None, mode=None):
+    global cache
+    if cache is not None:
+        cache.fermer()
+    cache = None if mode is None else CacheHttp(dossier or DOSSIER_DEFAUT, mode)
+
+if os.environ.get('SCRAPPER_CACHE_HTTP'):
+    configurer_cache(os.environ.get('SCRAPPER_CACHE_DIR'), os.environ['SCRAPPER_CACHE_HTTP'])
+
+# Déclare les entêtes et cookies à utiliser pour un hôte
+# A appeler avant la première requête vers l'hôte: la configuration est appliquée à la création de la session
+# host: nom de l'hôte (ex: www.seloger.com)
+# headers, cookies: dictionnaires python où les clés et les valeurs sont des strings
+# pool_maxsize: nombre de connexions gardées ouvertes vers l'hôte
+def configurer_hote(host, headers=None, cookies=None, pool_maxsize=POOL_MAXSIZE):
+    configuration = {'headers': headers or {}, 'cookies': cookies or {}, 'pool_maxsize': pool_maxsize}
+    with _verrou:
+        if _configurations.get(host) == configuration:
+            return
+        _configurations[host] = configuration
+        # Une session déjà ouverte avec une autre configuration est recréée à la prochaine requête
+        session = _sessions.pop(host, None)
+    if session is not None:
+        session.close()
+
+def _creer_session(host):
+    configuration = _configurations.get(host, {'headers': {}, 'cookies': {}, 'pool_maxsize': POOL_MAXSIZE})
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=configuration['pool_maxsize'])
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(configuration['headers'])
+    session.cookies.update(configuration['cookies'])
+    return session
+
+# Retourne la session de l'hôte, créée à la première demande
+def get_session(host):
+    with _verrou:
+        if host not in _sessions:
+            _sessions[host] = _creer_session(host)
+        return _sessions[host]
+
+# Lecture de l'entête Retry-After (en secondes), None s'il est absent ou sous forme de date
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+# Taille du corps envoyé d'une requête préparée (0 pour un GET)
+def _taille_corps(preparee):
+    corps = getattr(preparee, 'body', None)
+    if corps is None:
+        return 0
+    if isinstance(corps, str):
+        return len(corps.encode('utf-8'))
+    return len(corps) if isinstance(corps, bytes) else 0
+
+# Envoie une requête via la session de l'hôte de l'url
+# La requête attend son tour auprès du disjoncteur et du limiteur de débit, puis la réponse ajuste le débit de l'hôte
+# Une requête sans réponse ou avec un code temporaire (STATUTS_A_REPRENDRE) est relancée jusqu'à
+# reprises.tentatives fois: l'exception ou la réponse de la dernière tentative est renvoyée à l'appelant
+# En mode rejouer, la réponse est relue depuis le cache sans requête ni attente
+# kwargs: mêmes paramètres que requests.request (params, json, timeout ...)
+# return: requests.Response
+def request(method, url, **kwargs):
+    if cache is not None and cache.mode == REJOUER:
+        debut = time.monotonic()
+        response = cache.rejouer(method, url, **kwargs)
+        metriques.requete(url, response.status_code, time.monotonic() - debut, 0, len(response.content))
+        return response
+    kwargs.setdefault('timeout', TIMEOUT_DEFAUT)
+    host = urlparse(url).netloc
+    session = get_session(host)
+    disjoncteur = disjoncteurs.hote(host)
+    for tentative in range(1, reprises.tentatives + 1):
+        derniere = tentative == reprises.tentatives
+        disjoncteur.attendre()
+        limiteur.acquerir(host)
+        debut = time.monotonic()
+        try:
+            response = session.request(method, _url_redirigee(url), **kwargs)
+        except requests.RequestException:
+            limiteur.enregistrer(host, None, time.monotonic() - debut)
+            metriques.requete(url, None, time.monotonic() - debut)
+            disjoncteur.echec()
+            if derniere:
+                raise
+            metriques.evenement('reprise', host)
+            time.sleep(reprises.delai(tentative))
+            continue
+        latence = time.monotonic() - debut
+        retry_after = _retry_after(response)
+        limiteur.enregistrer(host, response.status_code, latence, retry_after)
+        metriques.requete(url, response.status_code, latence, _taille_corps(response.request), len(response.content))
+        if response.status_code in STATUTS_A_REPRENDRE or response.status_code in STATUTS_BLOCAGE:
+            disjoncteur.echec()
+        else:
+            disjoncteur.succes()
+        if response.status_code not in STATUTS_A_REPRENDRE or derniere:
+            break
+        metriques.evenement('reprise', host)
+        time.sleep(reprises.delai(tentative, retry_after))
+    if cache is not None:
+        cache.enregistrer(method, url, response, **kwargs)
+    return response
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+# Ferme toutes les sessions ouvertes
+def fermer():
+    with _verrou:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
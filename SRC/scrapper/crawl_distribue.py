@@ -0,0 +1,258 @@
+# Ce fichier lance une récupération répartie sur plusieurs processus d'une même machine
+# autour d'une file de travail durable (commun/file_travail.py):
+# 1. planifier: les unités (départements) des sources sont ajoutées à la file, une tâche par première page,
+# 2. travailler: chaque processus loue des tâches, récupère la page, écrit ses lignes dans un fichier JSONL
+#    par page (shard) et ajoute les pages suivantes à la file (toutes d'un coup quand la page 1 donne le total,
+#    sinon la page suivante tant que les pages ne sont pas vides); tant qu'il travaille sur une tâche,
+#    il prolonge son bail: les tâches d'un processus arrêté sont reprises par les autres,
+# 3. fusionner: quand toutes les tâches d'une source sont terminées, les pages sont fusionnées sans doublon
+#    dans les mêmes fichiers qu'une récupération sur une seule machine (un CSV par département,
+#    ou Source.fichier_csv), puis la file et les shards de la source sont vidés.
+# Une page qui a échoué MAX_TENTATIVES fois reste en échec et bloque la fusion de sa source:
+# reprendre la remet en attente (les pages terminées sont gardées), puis relancer travailler.
+# Tous les processus tournent sur une même machine: la file, l'index des annonces et les caches sont des bases
+# SQLite en mode WAL, qui ne supportent pas d'être partagées par un disque réseau (voir commun/file_travail.py).
+# La répartition sur plusieurs machines n'est pas prise en charge.
+# Chaque processus a son propre limiteur de débit: le budget d'un site est à diviser par le nombre de processus.
+# SeLoger est récupéré par les méthodes de l'interface Source (sans le découpage en codes postaux du pipeline).
+#
+# Utilisation:
+#   python crawl_distribue.py planifier seloger notaires
+#   python crawl_distribue.py travailler seloger notaires --processus 4 --threads 2
+#   python crawl_distribue.py etat seloger notaires
+#   python crawl_distribue.py reprendre seloger notaires
+#   python crawl_distribue.py fusionner seloger notaires
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+# lancer_sources ajoute les dossiers des sources au sys.path
+from lancer_sources import creer_source, DOSSIER, INDEX_FILE
+from commun.file_travail import FileTravail, DUREE_BAIL
+from commun.index_annonces import IndexAnnonces, empreinte
+from commun.ecriture import EcrivainJsonl, exporter_csv
+from commun.ordonnanceur import afficher_erreur
+from commun.metriques import metriques
+from commun.affichage import afficher
+
+FILE_TRAVAIL = DOSSIER / 'file_travail.sqlite'
+DOSSIER_SHARDS = DOSSIER / 'shards'
+SOURCES = ['seloger', 'notaires', 'bienici']
+# Attente d'un travailleur quand aucune tâche n'est disponible mais que d'autres sont en cours
+ATTENTE_TACHE = 1.0
+
+def planifier(noms, chemin_file=FILE_TRAVAIL):
+    file = FileTravail(chemin_file)
+    try:
+        for nom in noms:
+            source = creer_source(nom)
+            source.configurer()
+            unites = source.unites()
+            for unite in unites:
+                file.ajouter_unite(source.nom, unite)
+            afficher(f"PLANIFICATION >>> {source.nom}: {len(unites)} unités")
+    finally:
+        file.fermer()
+
+# Fichier d'une page récupérée: shards/<source>/<unité>/page_<page>.jsonl
+def chemin_shard(dossier, tache):
+    return dossier / tache['source'] / tache['unite'] / f"page_{tache['page']:05d}.jsonl"
+
+# Écrit les lignes d'une page dans un fichier temporaire renommé à la fin:
+# un shard est complet ou absent, même si deux travailleurs ont fait la même page
+def ecrire_shard(chemin, lignes):
+    temporaire = chemin.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    ecrivain = EcrivainJsonl(temporaire, position=0)
+    ecrivain.ecrire_page(lignes)
+    ecrivain.fermer()
+    os.replace(temporaire, chemin)
+
+# Récupère la page d'une tâche et écrit son shard
+# return: (chemin du shard, nombre de lignes, pages suivantes à ajouter, total de l'unité ou None)
+def traiter_tache(source, tache, index, dossier):
+    unite = tache['donnees']
+    page = tache['page']
+    resumes, total = source.chercher(unite, page)
+
+    lignes = []
+    if resumes:
+        if index is not None:
+            # Seules les annonces nouvelles ou modifiées passent par le détail (voir ordonnanceur.py)
+            empreintes = {str(resume['id']): empreinte(resume, source.schema_empreinte) for resume in resumes}
+            a_recuperer, lignes = index.trier(source.nom, empreintes)
+            if a_recuperer:
+                ids = set(a_recuperer)
+                details = source.recuperer_details(unite, [resume for resume in resumes if str(resume['id']) in ids])
+                nouvelles = [source.vers_ligne(unite, annonce) for annonce in details]
+                index.enregistrer(source.nom, {str(ligne['id']): ligne for ligne in nouvelles}, empreintes)
+                lignes = lignes + nouvelles
+        else:
+            lignes = [source.vers_ligne(unite, annonce) for annonce in source.recuperer_details(unite, resumes)]
+
+    shard = chemin_shard(dossier, tache)
+    shard.parent.mkdir(parents=True, exist_ok=True)
+    ecrire_shard(shard, lignes)
+    metriques.annonces_page(source.nom, tache['unite'], len(lignes))
+
+    suivantes = []
+    if page == 1 and total is not None:
+        # Total connu: toutes les pages de l'unité sont ajoutées à la file d'un coup
+        suivantes = range(2, min(source.max_pages, -(-int(total) // source.par_page)) + 1)
+    elif (page == 1 or tache['total'] is None) and resumes and page < source.max_pages:
+        # Total inconnu: page suivante tant que la page n'est pas vide
+        suivantes = [page + 1]
+    return shard, len(lignes), suivantes, total if page == 1 else None
+
+# Processus de travail: `nb_threads` tâches à la fois, jusqu'à ce que la file des sources soit vide
+def travailleur(noms, chemin_file, dossier, index_path, nb_threads):
+    nom_travailleur = f"{socket.gethostname()}:{os.getpid()}"
+    sources = {}
+    for nom in noms:
+        source = creer_source(nom)
+        source.configurer()
+        sources[source.nom] = source
+    file = FileTravail(chemin_file)
+    index = IndexAnnonces(index_path) if index_path else None
+    en_cours = set()
+    verrou = threading.Lock()
+    fin = threading.Event()
+
+    # Battement de cœur: les baux des tâches en cours sont prolongés régulièrement
+    def battre():
+        while not fin.wait(DUREE_BAIL / 3):
+            with verrou:
+                ids = list(en_cours)
+            file.prolonger(nom_travailleur, ids)
+
+    def boucle():
+        while True:
+            tache = file.louer(nom_travailleur, list(sources))
+            if tache is None:
+                # Des tâches en cours ailleurs peuvent encore ajouter des pages
+                if file.reste_a_faire(list(sources)) == 0:
+                    return
+                time.sleep(ATTENTE_TACHE)
+                continue
+            with verrou:
+                en_cours.add(tache['id'])
+            source = sources[tache['source']]
+            try:
+                shard, nb_lignes, suivantes, total = traiter_tache(source, tache, index, dossier)
+                if not file.terminer(tache, nom_travailleur, shard, nb_lignes, suivantes, total):
+                    afficher(f"Bail perdu >>> {tache['source']} | {tache['unite']} page {tache['page']}")
+            except Exception as e:
+                afficher_erreur(f"Erreur {tache['source']} | {tache['unite']} à la page {tache['page']}", e)
+                file.echouer(tache, nom_travailleur, f"{type(e).__name__}: {e}")
+            finally:
+                with verrou:
+                    en_cours.discard(tache['id'])
+
+    battement = threading.Thread(target=battre, daemon=True)
+    battement.start()
+    threads = [threading.Thread(target=boucle) for _ in range(nb_threads)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        fin.set()
+        battement.join()
+        file.fermer()
+        if index is not None:
+            index.fermer()
+
+# Lance `nb_processus` processus de travail sur cette machine
+def travailler(noms, nb_processus=1, nb_threads=2, chemin_file=FILE_TRAVAIL, dossier=DOSSIER_SHARDS, index_path=INDEX_FILE):
+    if nb_processus == 1:
+        travailleur(noms, chemin_file, dossier, index_path, nb_threads)
+        return
+    contexte = multiprocessing.get_context('spawn')
+    processus = [
+        contexte.Process(target=travailleur, args=(noms, chemin_file, dossier, index_path, nb_threads))
+        for _ in range(nb_processus)
+    ]
+    for p in processus:
+        p.start()
+    for p in processus:
+        p.join()
+
+def afficher_etat(noms, chemin_file=FILE_TRAVAIL):
+    file = FileTravail(chemin_file)
+    try:
+        for nom in noms:
+            source = creer_source(nom)
+            afficher(f"{source.nom}: {file.compter(source.nom) or 'aucune tâche'}")
+    finally:
+        file.fermer()
+
+# Remet en attente les tâches en échec des sources
+def reprendre(noms, chemin_file=FILE_TRAVAIL):
+    file = FileTravail(chemin_file)
+    try:
+        for nom in noms:
+            source = creer_source(nom)
+            afficher(f"REPRISE >>> {source.nom}: {file.reprendre(source.nom)} tâches en échec remises en attente")
+    finally:
+        file.fermer()
+
+# Fusionne les shards des sources terminées dans les fichiers habituels des sources
+# return: dictionnaire nom de la source -> nombre de lignes exportées (None si la source n'est pas terminée)
+def fusionner(noms, chemin_file=FILE_TRAVAIL):
+    file = FileTravail(chemin_file)
+    resultats = {}
+    try:
+        for nom in noms:
+            source = creer_source(nom)
+            if not file.est_terminee(source.nom):
+                afficher(f"⚠ {source.nom}: récupération incomplète {file.compter(source.nom)}, fusion impossible"
+                         f" (tâches en échec: crawl_distribue.py reprendre {source.nom}, puis travailler)")
+                resultats[source.nom] = None
+                continue
+            shards = file.shards(source.nom)
+            if source.fichier_csv is not None:
+                chemins = [chemin for _, chemins_unite in shards for chemin in chemins_unite]
+                nb_lignes = exporter_csv(chemins, source.fichier_csv, cle='id')
+                afficher(f"Export {source.nom} terminé → {source.fichier_csv} ({nb_lignes} lignes)")
+            else:
+                nb_lignes = 0
+                for unite, chemins in shards:
+                    chemin_csv = source.chemin(unite, 'csv')
+                    chemin_csv.parent.mkdir(parents=True, exist_ok=True)
+                    nb_unite = exporter_csv(chemins, chemin_csv, cle='id')
+                    afficher(f"FIN >>> {source.nom} | {unite['nom']}: {nb_unite} annonces")
+                    nb_lignes += nb_unite
+            for _, chemins in shards:
+                for chemin in chemins:
+                    Path(chemin).unlink(missing_ok=True)
+                if chemins and not any(Path(chemins[0]).parent.iterdir()):
+                    Path(chemins[0]).parent.rmdir()
+            file.vider(source.nom)
+            resultats[source.nom] = nb_lignes
+    finally:
+        file.fermer()
+    return resultats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Récupération répartie autour d'une file de travail")
+    parser.add_argument('commande', choices=['planifier', 'travailler', 'etat', 'reprendre', 'fusionner'])
+    parser.add_argument('sources', nargs='*', default=SOURCES)
+    parser.add_argument('--processus', type=int, default=1, help="processus de travail sur cette machine")
+    parser.add_argument('--threads', type=int, default=2, help="tâches à la fois par processus")
+    parser.add_argument('--file', default=str(FILE_TRAVAIL), help="base SQLite de la file de travail")
+    arguments = parser.parse_args()
+
+    if arguments.commande == 'planifier':
+        planifier(arguments.sources, arguments.file)
+    elif arguments.commande == 'travailler':
+        travailler(arguments.sources, arguments.processus, arguments.threads, arguments.file)
+    elif arguments.commande == 'etat':
+        afficher_etat(arguments.sources, arguments.file)
+    elif arguments.commande == 'reprendre':
+        reprendre(arguments.sources, arguments.file)
+    else:
+        for nom, nb_lignes in fusionner(arguments.sources, arguments.file).items():
+            print(f"{nom}: {'récupération incomplète' if nb_lignes is None else f'{nb_lignes} annonces'}")
@@ -0,0 +1,67 @@
+# Ce fichier lance la récupération de plusieurs sources d'annonces en même temps
+# avec l'ordonnanceur commun (commun/ordonnanceur.py): chaque site a son propre plafond
+# de requêtes simultanées et son propre débit, les sources ne s'attendent pas les unes les autres.
+# Une récupération interrompue reprend là où elle s'était arrêtée (journal de reprise commun).
+# Utilisation: python lancer_sources.py [seloger] [notaires] [bienici]   (par défaut toutes les sources)
+# Les départements sont parcourus des moins frais aux plus frais (voir commun/fraicheur.py):
+#   python lancer_sources.py notaires --budget 500   (au plus 500 requêtes par source, là où les données vieillissent le plus vite)
+#   python lancer_sources.py --rapport                (fraîcheur attendue par département, sans récupération)
+# Suivi par les métriques au lieu des messages (voir commun/metriques.py):
+#   SCRAPPER_METRIQUES=metriques.prom SCRAPPER_SILENCIEUX=1 python lancer_sources.py
+import argparse
+import sys
+from pathlib import Path
+
+DOSSIER = Path(__file__).resolve().parent
+# Les scripts de chaque source importent leurs modules voisins (ex: from config import ...)
+for sous_dossier in ('seloger', 'Notaires', 'bienici'):
+    sys.path.append(str(DOSSIER / sous_dossier))
+
+from commun.ordonnanceur import executer_sources
+from commun.fraicheur import HistoriqueFraicheur, afficher_rapport
+
+# Journal de reprise et index des annonces communs à toutes les sources
+JOURNAL_FILE = DOSSIER / 'journal_sources.sqlite'
+INDEX_FILE = DOSSIER / 'index_sources.sqlite'
+
+def creer_source(nom):
+    if nom == 'seloger':
+        from source_seloger import SourceSeloger
+        return SourceSeloger()
+    if nom == 'notaires':
+        from source_notaires import SourceNotaires
+        from scraper_notaires_france import DEPARTEMENTS
+        # Même fichier notaires_france.csv que scraper_notaires_france.py, donc même format de département
+        return SourceNotaires(DEPARTEMENTS, deux_chiffres=False)
+    if nom == 'bienici':
+        from scraper_bienici import SourceBienici
+        return SourceBienici()
+    raise ValueError(f"Source inconnue: {nom}")
+
+# Affiche la fraîcheur attendue des départements de chaque source, d'après l'historique des passages
+def rapport_fraicheur(noms, index_path=INDEX_FILE):
+    historique = HistoriqueFraicheur(index_path)
+    try:
+        for nom in noms:
+            source = creer_source(nom)
+            source.configurer()
+            afficher_rapport(historique, source.nom, source.unites())
+    finally:
+        historique.fermer()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Récupération de plusieurs sources d'annonces en même temps")
+    parser.add_argument('sources', nargs='*', default=['seloger', 'notaires', 'bienici'])
+    parser.add_argument('--budget', type=int, default=None, help="nombre maximal de requêtes par source")
+    parser.add_argument('--rapport', action='store_true', help="affiche la fraîcheur des départements sans récupérer")
+    arguments = parser.parse_args()
+
+    if arguments.rapport:
+        rapport_fraicheur(arguments.sources)
+        sys.exit()
+    sources = [creer_source(nom) for nom in arguments.sources]
+    for source in sources:
+        source.budget_requetes = arguments.budget
+    resultats = executer_sources(sources, JOURNAL_FILE, INDEX_FILE)
+    for nom, nb_lignes in resultats.items():
+        print(f"{nom}: {'récupération incomplète' if nb_lignes is None else f'{nb_lignes} annonces'}")
@@ -1,9 +1,35 @@
 ### VARIABLES
+import sys
 from pathlib import Path
 
+# Accès aux briques communes des scrapers (dossier scrapper/commun)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from commun.departements import DEPARTEMENTS
+
 # Chemin vers le répertoire des départements (dans le dossier seloger)
 DEPARTEMENTS_DIR = Path(__file__).parent / 'departements'
 
+# Journal de reprise: une récupération interrompue reprend là où elle s'était arrêtée
+JOURNAL_CRAWL = DEPARTEMENTS_DIR / 'journal_crawl.sqlite'
+
+# Index des annonces déjà récupérées: seules les annonces nouvelles ou modifiées sont redemandées
+INDEX_ANNONCES = DEPARTEMENTS_DIR / 'index_annonces.sqlite'
+
+# Cache des identifiants des départements (autocomplétion), valable CACHE_LIEUX_TTL secondes
+CACHE_LIEUX = DEPARTEMENTS_DIR / 'cache_lieux.sqlite'
+CACHE_LIEUX_TTL = 30 * 24 * 3600
+
+# Hôte du site, une session HTTP partagée est ouverte par hôte (voir scrapper/commun/transport.py)
+SELOGER_HOST = "www.seloger.com"
+
+# Budget de débit de seloger.com (requêtes/seconde), ajusté automatiquement entre debit_min et debit_max
+# selon les réponses du site (voir scrapper/commun/limiteur_debit.py)
+budget_seloger = {
+    "debit_initial": 1.0,
+    "debit_min": 0.1,
+    "debit_max": 5.0
+}
+
 # Entête des requêtes
 headers = {
     "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:145.0) Gecko/20100101 Firefox/145.0",
@@ -76,6 +102,14 @@ annonces_filters = {
     }
 }
 
+## Taille des lots de requêtes
+# Taille maximale essayée pour les pages de recherche, la taille réellement acceptée par le site
+# est mesurée au début de chaque récupération (sinon on garde annonces_filters['paging']['size'])
+TAILLE_PAGE_RECHERCHE_MAX = 100
+# Longueur maximale des urls classifiedList/<id1>,<id2>,... : les identifiants de plusieurs pages
+# de recherche sont regroupés dans une même requête de détail jusqu'à cette longueur
+LONGUEUR_URL_MAX = 2000
+
 ## Payload de la requêtes d'autocompletion du nom des lieux
 payload_search_id_dep = {
     "limit": 10,
@@ -105,105 +139,11 @@ payload_search_id_dep = {
     "text": "Bouches-du-Rhône" # mettre ici le nom du departement, de la ville ...
 }
 
+## Découpage des gros départements
+# Ces départements sont découpés en codes postaux (trouvés avec l'autocomplétion, placeType POCO)
+# récupérés en parallèle puis fusionnés (sans doublon) dans le même fichier seloger_dep_*.csv
+DEPARTEMENTS_A_DECOUPER = ['75', '59', '13', '69', '92', '93', '94', '33', '31', '06']
+
 ## Departements de France
-departements = [
-    {'numero': '59', 'nom': 'Nord'},
-    {'numero': '75', 'nom': 'Paris'},
-    {'numero': '13', 'nom': 'Bouches-du-Rhône'},
-    {'numero': '69', 'nom': 'Rhône'},
-    {'numero': '93', 'nom': 'Seine-Saint-Denis'},
-    {'numero': '33', 'nom': 'Gironde'},
-    {'numero': '92', 'nom': 'Hauts-de-Seine'},
-    {'numero': '44', 'nom': 'Loire-Atlantique'},
-    {'numero': '78', 'nom': 'Yvelines'},
-    {'numero': '62', 'nom': 'Pas-de-Calais'},
-    {'numero': '31', 'nom': 'Haute-Garonne'},
-    {'numero': '77', 'nom': 'Seine-et-Marne'},
-    {'numero': '94', 'nom': 'Val-de-Marne'},
-    {'numero': '91', 'nom': 'Essonne'},
-    {'numero': '38', 'nom': 'Isère'},
-    {'numero': '95', 'nom': 'Val-d\'Oise'},
-    {'numero': '76', 'nom': 'Seine-Maritime'},
-    {'numero': '34', 'nom': 'Hérault'},
-    {'numero': '67', 'nom': 'Bas-Rhin'},
-    {'numero': '06', 'nom': 'Alpes-Maritimes'},
-    {'numero': '83', 'nom': 'Var'},
-    {'numero': '35', 'nom': 'Ille-et-Vilaine'},
-    {'numero': '68', 'nom': 'Haut-Rhin'},
-    {'numero': '57', 'nom': 'Moselle'},
-    {'numero': '974', 'nom': 'La Réunion'},
-    {'numero': '42', 'nom': 'Loire'},
-    {'numero': '85', 'nom': 'Vendée'},
-    {'numero': '60', 'nom': 'Oise'},
-    {'numero': '14', 'nom': 'Calvados'},
-    {'numero': '54', 'nom': 'Meurthe-et-Moselle'},
-    {'numero': '30', 'nom': 'Gard'},
-    {'numero': '74', 'nom': 'Haute-Savoie'},
-    {'numero': '29', 'nom': 'Finistère'},
-    {'numero': '63', 'nom': 'Puy-de-Dôme'},
-    {'numero': '84', 'nom': 'Vaucluse'},
-    {'numero': '49', 'nom': 'Maine-et-Loire'},
-    {'numero': '64', 'nom': 'Pyrénées-Atlantiques'},
-    {'numero': '45', 'nom': 'Loiret'},
-    {'numero': '56', 'nom': 'Morbihan'},
-    {'numero': '86', 'nom': 'Vienne'},
-    {'numero': '37', 'nom': 'Indre-et-Loire'},
-    {'numero': '22', 'nom': 'Côtes-d\'Armor'},
-    {'numero': '81', 'nom': 'Tarn'},
-    {'numero': '26', 'nom': 'Drôme'},
-    {'numero': '27', 'nom': 'Eure'},
-    {'numero': '40', 'nom': 'Landes'},
-    {'numero': '80', 'nom': 'Somme'},
-    {'numero': '17', 'nom': 'Charente-Maritime'},
-    {'numero': '50', 'nom': 'Manche'},
-    {'numero': '51', 'nom': 'Marne'},
-    {'numero': '25', 'nom': 'Doubs'},
-    {'numero': '73', 'nom': 'Savoie'},
-    {'numero': '16', 'nom': 'Charente'},
-    {'numero': '11', 'nom': 'Aude'},
-    {'numero': '21', 'nom': 'Côte-d\'Or'},
-    {'numero': '72', 'nom': 'Sarthe'},
-    {'numero': '39', 'nom': 'Jura'},
-    {'numero': '24', 'nom': 'Dordogne'},
-    {'numero': '41', 'nom': 'Loir-et-Cher'},
-    {'numero': '88', 'nom': 'Vosges'},
-    {'numero': '47', 'nom': 'Lot-et-Garonne'},
-    {'numero': '972', 'nom': 'Martinique'},
-    {'numero': '971', 'nom': 'Guadeloupe'},
-    {'numero': '01', 'nom': 'Ain'},
-    {'numero': '28', 'nom': 'Eure-et-Loir'},
-    {'numero': '89', 'nom': 'Yonne'},
-    {'numero': '07', 'nom': 'Ardèche'},
-    {'numero': '71', 'nom': 'Saône-et-Loire'},
-    {'numero': '58', 'nom': 'Nièvre'},
-    {'numero': '08', 'nom': 'Ardennes'},
-    {'numero': '18', 'nom': 'Cher'},
-    {'numero': '36', 'nom': 'Indre'},
-    {'numero': '87', 'nom': 'Haute-Vienne'},
-    {'numero': '61', 'nom': 'Orne'},
-    {'numero': '03', 'nom': 'Allier'},
-    {'numero': '46', 'nom': 'Lot'},
-    {'numero': '10', 'nom': 'Aube'},
-    {'numero': '53', 'nom': 'Mayenne'},
-    {'numero': '82', 'nom': 'Tarn-et-Garonne'},
-    {'numero': '55', 'nom': 'Meuse'},
-    {'numero': '65', 'nom': 'Hautes-Pyrénées'},
-    {'numero': '04', 'nom': 'Alpes-de-Haute-Provence'},
-    {'numero': '90', 'nom': 'Territoire de Belfort'},
-    {'numero': '43', 'nom': 'Haute-Loire'},
-    {'numero': '19', 'nom': 'Corrèze'},
-    {'numero': '66', 'nom': 'Pyrénées-Orientales'},
-    {'numero': '32', 'nom': 'Gers'},
-    {'numero': '70', 'nom': 'Haute-Saône'},
-    {'numero': '09', 'nom': 'Ariège'},
-    {'numero': '973', 'nom': 'Guyane'},
-    {'numero': '12', 'nom': 'Aveyron'},
-    {'numero': '976', 'nom': 'Mayotte'},
-    {'numero': '2A', 'nom': 'Corse-du-Sud'},
-    {'numero': '2B', 'nom': 'Haute-Corse'},
-    {'numero': '23', 'nom': 'Creuse'},
-    {'numero': '52', 'nom': 'Haute-Marne'},
-    {'numero': '15', 'nom': 'Cantal'},
-    {'numero': '05', 'nom': 'Hautes-Alpes'},
-    {'numero': '48', 'nom': 'Lozère'}
-]
+# La liste est partagée par toutes les sources (scrapper/commun/departements.py)
+departements = DEPARTEMENTS
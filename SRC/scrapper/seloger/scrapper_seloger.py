@@ -5,179 +5,169 @@
 # il faudrais consulter le site sur un naviguateur,
 # récuperer les cookies, et les transformer en dictionaire python où lesc clés et les valeurs sont des strings
 # et remplacer la valeur de la variable cookies dans le fichier config.py
-import requests
-import pandas as pd
-import random
-import copy
-from time import sleep
-from config import headers, cookies, annonces_filters, DEPARTEMENTS_DIR
+import sys
+import time
+import asyncio
+from pathlib import Path
+from config import headers, cookies, annonces_filters, DEPARTEMENTS_DIR, SELOGER_HOST, budget_seloger
 from scrapper_seloger_departements import get_departements
 
+# Accès aux briques communes des scrapers (dossier scrapper/commun)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from commun import transport
+from commun.ecriture import exporter_csv
+from commun.schema import Schema, champ, charger_json, payload_avec
+from commun.metriques import metriques
+from commun.affichage import afficher
+from commun.reprises import PageEchouee
+
+# Les entêtes et cookies sont appliqués une fois à la session partagée de seloger.com
+transport.configurer_hote(SELOGER_HOST, headers=headers, cookies=cookies)
+# Débit adaptatif: remplace les pauses aléatoires entre les pages
+transport.limiteur.configurer_hote(SELOGER_HOST, **budget_seloger)
+
+# Champs gardés des annonces de classifiedList (colonnes des fichiers CSV des départements)
+SCHEMA_ANNONCE = Schema('AnnonceSeloger', {
+    'id': champ('id', defaut=''),
+    'creationDate': champ('metadata', 'creationDate', defaut=''),
+    'city': champ('location', 'address', 'city', defaut=''),
+    'district': champ('location', 'address', 'district', defaut=''),
+    'zipCode': champ('location', 'address', 'zipCode', defaut=0),
+    'distributionType': champ('rawData', 'distributionType', defaut=''),
+    'propertyType': champ('rawData', 'propertyType', defaut=''),
+    'price': champ('rawData', 'price', defaut=0), # Prix par défaut à 0 (chiffre)
+    'surface': champ('rawData', 'surface', 'main', defaut=0), # Surface par défaut à 0 (chiffre)
+    'nbroom': champ('rawData', 'nbroom', defaut=''),
+    'nbbedroom': champ('rawData', 'nbbedroom', defaut=''),
+    'description': champ('mainDescription', 'description', defaut=''),
+})
+
+# Champs des résumés de la recherche qui entrent dans l'empreinte des annonces (récupération incrémentale):
+# prix, surface, pièces, description et dates, pas le rang ni les photos
+SCHEMA_EMPREINTE = Schema('EmpreinteSeloger', {
+    'price': champ('rawData', 'price'),
+    'surface': champ('rawData', 'surface', 'main'),
+    'nbroom': champ('rawData', 'nbroom'),
+    'nbbedroom': champ('rawData', 'nbbedroom'),
+    'propertyType': champ('rawData', 'propertyType'),
+    'description': champ('mainDescription', 'description'),
+    'creationDate': champ('metadata', 'creationDate'),
+    'updateDate': champ('metadata', 'updateDate'),
+})
+
+# Cette fonction permet de récupérer les résumés des annonces d'un lieu donné
+# (éléments 'classifieds' de la recherche, qui servent d'empreinte pour la récupération incrémentale)
+# placeId: identifiant du lieu
+# page: numéro de la page
+# taille: nombre d'annonces par page (par défaut celui de annonces_filters)
+# return: liste des résumés des annonces (dictionnaires contenant au moins la clé 'id'),
+#         une liste vide signifie que la dernière page est dépassée
+# Une page en échec (après les nouvelles tentatives de transport) lève PageEchouee
+def get_annonces_resume(placeId, page, taille=None):
+    # Seuls les dictionnaires modifiés sont recopiés, annonces_filters n'est pas modifié
+    modifications = {('criteria', 'location', 'placeIds'): [placeId], ('paging', 'page'): page}
+    if taille:
+        modifications[('paging', 'size')] = taille
+    filters = payload_avec(annonces_filters, modifications)
+
+    result = transport.post("https://www.seloger.com/serp-bff/search", json=filters)
+    afficher('placeId:', placeId, '| page:', page, '\ncode réponse:', result.status_code)
+
+    # Vérification du statut HTTP
+    if result.status_code != 200:
+        raise PageEchouee(f"Erreur HTTP {result.status_code}: placeId {placeId}, page {page}")
+
+    # Les résumés sont gardés en entier: ils servent d'empreinte pour la récupération incrémentale
+    debut = time.perf_counter()
+    result_json = charger_json(result.content)
+    classifieds = result_json.get('classifieds') if isinstance(result_json, dict) else None
+    metriques.analyse('RechercheSeloger', time.perf_counter() - debut, len(classifieds or []))
+
+    # Vérification de l'existence de la clé 'classifieds' (réponse de blocage ou format inattendu)
+    if classifieds is None:
+        raise PageEchouee(f"Clé 'classifieds' absente dans la réponse: placeId {placeId}, page {page}")
+
+    return [elt for elt in classifieds if 'id' in elt]
+
 # Cette fonction permet de récupérer les identifiants des annonces d'un lieu donné
 # placeId: identifiant du lieu
 # page: numéro de la page
 # return: liste des identifiants des annonces
 def get_annonces_id(placeId, page):
-    # Copie profonde pour éviter de modifier le dictionnaire original
-    filters = copy.deepcopy(annonces_filters)
-    filters['criteria']['location']['placeIds'] = [placeId]
-    filters['paging']['page'] = page
-    
-    try: 
-        result = requests.post("https://www.seloger.com/serp-bff/search", headers=headers, cookies=cookies, json=filters)
-        print('placeId:', placeId, '| page:', page, '\ncode réponse:', result.status_code)
-        
-        # Vérification du statut HTTP
-        if result.status_code != 200:
-            print(f"Erreur HTTP {result.status_code}")
-            return []
-        
-        result_json = result.json()
-        
-        # Vérification de l'existence de la clé 'classifieds'
-        if 'classifieds' not in result_json:
-            print(f"Clé 'classifieds' absente dans la réponse")
-            return []
-        
-        return [elt['id'] for elt in result_json['classifieds'] if 'id' in elt]
-    except Exception as e:
-        print(f"\nErreur Récupération ids d'annonce: placeId {placeId}, page {page}")
-        print(f"Type d'erreur: {type(e).__name__}")
-        print(f"Message d'erreur: {str(e)} \n")
-        return []
+    return [elt['id'] for elt in get_annonces_resume(placeId, page)]
     
+# Longueur de l'url classifiedList pour une liste d'identifiants d'annonces
+def longueur_url_annonces(placeIds):
+    return len("https://www.seloger.com/classifiedList/") + sum(len(pid) + 1 for pid in placeIds)
+
 # Cette fonction permet de récupérer les informations des annonces d'un lieu donné
 # placeIds: liste des identifiants des annonces
 # return: liste des informations des annonces
+# Une requête en échec (après les nouvelles tentatives de transport) lève PageEchouee
 def get_annonces(placeIds):
     # Vérification que placeIds n'est pas vide
     if not placeIds or len(placeIds) == 0:
-        print("Erreur: placeIds est vide")
+        afficher("Erreur: placeIds est vide")
         return []
     
     # Vérification que tous les éléments sont des strings
     if not all(isinstance(pid, str) for pid in placeIds):
-        print("Erreur: placeIds doit contenir uniquement des strings")
+        afficher("Erreur: placeIds doit contenir uniquement des strings")
         return []
     
     baseUrl = "https://www.seloger.com/classifiedList/"
-    url = baseUrl + ','.join(placeIds)    
-    try:
-        result = requests.get(url=url, headers=headers, cookies=cookies)
-        
-        # Vérification du statut HTTP
-        if result.status_code != 200:
-            print(f"Erreur HTTP {result.status_code}")
-            return []
-        
-        result_json = result.json()
-        
-        # Vérification que result_json est une liste
-        if not isinstance(result_json, list):
-            print(f"Erreur: la réponse n'est pas une liste (type: {type(result_json)})")
-            return []
-        
-        datas = []
-        
-        for elt in result_json:
-            eltDict = {
-                'id': elt.get('id', ''),
-                'creationDate': elt.get('metadata', {}).get('creationDate', ''),
-                'city': elt.get('location', {}).get('address', {}).get('city', ''),
-                'district': elt.get('location', {}).get('address', {}).get('district', ''),
-                'zipCode': elt.get('location', {}).get('address', {}).get('zipCode', 0),
-                'distributionType': elt.get('rawData', {}).get('distributionType', ''),
-                'propertyType': elt.get('rawData', {}).get('propertyType', ''),
-                'price': elt.get('rawData', {}).get('price', 0), # Prix par défaut à 0 (chiffre)
-                'surface': elt.get('rawData', {}).get('surface', {}).get('main', 0), # Surface par défaut à 0 (chiffre)
-                'nbroom': elt.get('rawData', {}).get('nbroom', ''), 
-                'nbbedroom': elt.get('rawData', {}).get('nbbedroom', ''), 
-                'description': elt.get('mainDescription', {}).get('description', ''),
-            }
-            datas.append(eltDict)
-            
-        return datas
-    except Exception as e:
-        print(f"\nErreur Récupération des annonces: placeIds {placeIds}")
-        print(f"Type d'erreur: {type(e).__name__}")
-        print(f"Message d'erreur: {str(e)} \n")
-        return []
+    url = baseUrl + ','.join(placeIds)
+    result = transport.get(url)
 
-def execution():
-    # Étape 1: Récupération des identifiants de tout les département de France
+    # Vérification du statut HTTP
+    if result.status_code != 200:
+        raise PageEchouee(f"Erreur HTTP {result.status_code}: {len(placeIds)} annonces")
+
+    # Décodage des seuls champs de SCHEMA_ANNONCE
+    # (une réponse qui n'est pas une liste lève TypeError)
+    return SCHEMA_ANNONCE.decoder_liste(result.content)
+
+# Cette fonction permet de charger la liste des départements avec leurs identifiants
+# Les identifiants sont lus dans le cache des lieux, seuls ceux absents ou expirés sont recherchés sur le site
+# return: liste des départements (dictionnaires numero, nom, id)
+def charger_departements():
+    return get_departements()
+
+# Chemin d'un fichier d'annonces d'un département dans le dossier DEPARTEMENTS_DIR
+# dep: dictionnaire du département (numero, nom, id), ou d'une zone d'un département découpé (avec la clé shard)
+# extension: 'csv' pour le fichier final, 'jsonl' pour le fichier écrit au fil des pages
+def chemin_departement(dep, extension='csv'):
+    if dep.get('shard'):
+        return DEPARTEMENTS_DIR / f"seloger_dep_{dep['numero']}_{dep['nom']}.{dep['shard']}.{extension}"
+    return DEPARTEMENTS_DIR / f"seloger_dep_{dep['numero']}_{dep['nom']}.{extension}"
+
+# Cette fonction permet d'enregistrer les annonces d'un département dans un fichier CSV
+# dans le dossier DEPARTEMENTS_DIR, à partir du fichier JSONL écrit au fil des pages
+# dep: dictionnaire du département (numero, nom, id)
+# return: nombre d'annonces enregistrées
+def enregistrer_annonces(dep):
     DEPARTEMENTS_DIR.mkdir(parents=True, exist_ok=True)
-    departements_file = DEPARTEMENTS_DIR / 'seloger_departements_id.csv'
-    departements_list = []
-    
-    try:
-        df_departement = pd.read_csv(departements_file)
-        departements_list = df_departement.to_dict('records')
-    except FileNotFoundError:
-        print(f'le fichier {departements_file} n\'est pas present', "\nRécupération depuis le site web...\n")
-        departements_list = get_departements()
-        if departements_list:
-            df_departement = pd.DataFrame(departements_list)
-            df_departement.to_csv(departements_file, index=False)
-    
+    chemin_csv = chemin_departement(dep)
+    nb_annonces = exporter_csv([chemin_departement(dep, 'jsonl')], chemin_csv)
+    if nb_annonces > 0:
+        afficher(f"annonces enregistrées dans le fichier: {chemin_csv.name} \n")
+    return nb_annonces
+
+# Récupération des annonces de tous les départements
+# La récupération est faite par le pipeline de scrapper_seloger_async.py:
+# recherche des identifiants et récupération des détails se recouvrent
+# concurrency: nombre maximal de requêtes simultanées vers seloger.com
+# (avec 1, les deux étages ne se recouvrent pas et on retrouve le rythme d'une boucle séquentielle)
+def execution(concurrency=2):
+    # Étape 1: Récupération des identifiants de tout les département de France
+    departements_list = charger_departements()
+
     # Étape 2: Pour chaque département on
     # 2.1- on récupère les identifiants des annonces, 
     # 2.2- on extrait les informations utiles des annonces 
     # 2.3- on enregistre les informations extraites sous forme de csv
-    for dep in departements_list:
-        # Vérification de l'existence de dep['id']
-        if 'id' not in dep or not dep['id']:
-            print(f"Erreur: pas d'id pour le département {dep.get('nom', 'inconnu')}")
-            continue
-        
-        has_more_pages = True
-        total_departement_annonces = []
-        page = 1
-        print(f"RECUPERATION ANNONCES >>> {dep['nom']}")
-        try:
-            while has_more_pages:
-                print(f"\n>>> {dep['nom']} | {page} <<<")
-                placeIds = get_annonces_id(dep['id'], page)
-
-                if len(placeIds) == 0:
-                    has_more_pages = False
-                    print(f"FIN DE LA RECUPERATION DES ANNONCES >>> {dep['nom']}")
-                    break
-                
-                annonces = get_annonces(placeIds)
-                
-                # Vérification que annonces est bien une liste
-                if annonces is None:
-                    print(f"Erreur: get_annonces a retourné None pour le département {dep['nom']} à la page {page}")
-                    page += 1
-                    continue
-                
-                if len(annonces) == 0:
-                    print(f"Aucune annonce trouvée pour le département {dep['nom']} à la page {page}")
-                    page += 1
-                    continue
-
-                total_departement_annonces.extend(annonces)
-                page += 1
-                
-                # Délai aléatoire entre 1 et 10 secondes pour éviter la surcharge du serveur et la detection de bot
-                #delay = random.uniform(1, 10)
-                #print(f"Pause de {delay:.2f} secondes...\n")
-                #sleep(delay)
-            
-            print(f"FIN DE LA RECUPERATION DES ANNONCES >>> {dep['nom']}\nTOTAL DES ANNONCES: {len(total_departement_annonces)}")
-        except Exception as e:
-            print(f"Erreur lors de la récupération des annonces pour le département {dep['nom']} à la page {page}")
-            print(f"Type d'erreur: {type(e).__name__}")
-            print(f"Message d'erreur: {str(e)} \n")
-            continue
-
-        # Enregistrement des annonces dans un fichier CSV dans le dossier DEPARTEMENTS_DIR
-        if len(total_departement_annonces) > 0:
-            df_annonces = pd.DataFrame(total_departement_annonces)
-            # Remplacement des caractères spéciaux dans le nom de fichier
-            filename = f'seloger_dep_{dep["numero"]}_{dep['nom']}.csv'
-            DEPARTEMENTS_DIR.mkdir(parents=True, exist_ok=True)
-            df_annonces.to_csv(DEPARTEMENTS_DIR / filename, index=False)
-            print(f"annonces enregistrées dans le fichier: {filename} \n")
+    from scrapper_seloger_async import execution_async
+    asyncio.run(execution_async(departements_list, concurrency))
+
 if __name__ == '__main__':
-execution()      
\ No newline at end of file
+    execution()
@@ -0,0 +1,601 @@
+# Ce fichier contient le mode de récupération concurrent (asyncio) des annonces SeLoger
+# La récupération est organisée en pipeline producteur/consommateur:
+# - les workers de recherche parcourent les pages des départements (get_annonces_id), par fenêtres
+#   de `fenetre` pages demandées en même temps, et déposent les lots d'identifiants dans une file bornée,
+# - les workers de détail vident la file et récupèrent les annonces (get_annonces).
+# La récupération des détails de la page N se fait donc pendant la recherche de la page N+1.
+# Le nombre de requêtes simultanées vers un même hôte est plafonné par `concurrency`.
+# Les fonctions bloquantes get_annonces_id et get_annonces sont exécutées dans un pool de threads,
+# le résultat est identique au mode séquentiel: un fichier CSV par département dans DEPARTEMENTS_DIR
+# Les annonces ne sont pas gardées en mémoire: chaque page est ajoutée dès son arrivée au fichier JSONL
+# du département, converti en CSV à la fin du département
+# Chaque page terminée est enregistrée dans le journal de reprise (JOURNAL_CRAWL):
+# une récupération interrompue reprend à la relance sans redemander les pages déjà faites
+# Les annonces déjà connues de l'index (INDEX_ANNONCES) et inchangées depuis le lancement précédent
+# ne passent pas par l'étage de détail: leur ligne est relue depuis l'index
+# Taille des lots: la taille des pages de recherche est mesurée au début de la récupération
+# (la plus grande acceptée par le site, jusqu'à TAILLE_PAGE_RECHERCHE_MAX) et l'étage de détail
+# regroupe les identifiants de plusieurs pages dans une même requête classifiedList (jusqu'à LONGUEUR_URL_MAX)
+# Les gros départements (DEPARTEMENTS_A_DECOUPER) sont découpés en codes postaux (scrapper_seloger_decoupage.py):
+# chaque code postal est parcouru comme un département, par plusieurs workers en parallèle,
+# et les fichiers des codes postaux sont fusionnés sans doublon dans le CSV du département
+# Chaque département complet est enregistré dans l'historique de fraîcheur (commun/fraicheur.py):
+# les départements sont parcourus des moins frais aux plus frais, dans la limite d'un budget de requêtes s'il est fixé
+# (budget vérifié avant chaque découpage et chaque fenêtre de pages: une fois dépensé, les départements en cours
+# s'arrêtent à leur dernière page journalisée et sont repris à la page suivante au lancement suivant)
+# Utilisation: python scrapper_seloger_async.py [concurrency] [budget de requêtes]
+import sys
+import json
+import time
+import asyncio
+from scrapper_seloger import get_annonces_resume, get_annonces, charger_departements, enregistrer_annonces, chemin_departement
+from scrapper_seloger import longueur_url_annonces, SCHEMA_EMPREINTE
+from scrapper_seloger_decoupage import planifier_shards
+from scrapper_seloger_departements import AUTOCOMPLETE_URL
+# scrapper_seloger a ajouté le dossier scrapper au sys.path
+from commun import transport
+from commun.journal_crawl import JournalCrawl
+from commun.index_annonces import IndexAnnonces, empreinte
+from commun.ecriture import EcrivainJsonl, exporter_csv
+from commun.fraicheur import HistoriqueFraicheur, selectionner_unites
+# Plafond de requêtes simultanées par hôte: les deux endpoints utilisés sont sur www.seloger.com,
+# ils partagent donc le même plafond
+from commun.concurrence import LimiteurHotes
+from commun.metriques import metriques
+from commun.affichage import afficher
+from config import headers, cookies, SELOGER_HOST, DEPARTEMENTS_DIR, JOURNAL_CRAWL, INDEX_ANNONCES
+from config import annonces_filters, TAILLE_PAGE_RECHERCHE_MAX, LONGUEUR_URL_MAX, DEPARTEMENTS_A_DECOUPER
+
+# Nom de la source dans le journal de reprise
+SOURCE = 'seloger'
+
+SEARCH_URL = "https://www.seloger.com/serp-bff/search"
+CLASSIFIED_LIST_URL = "https://www.seloger.com/classifiedList/"
+
+# Intervalle (en secondes) entre deux affichages des compteurs du pipeline
+INTERVALLE_RAPPORT = 30
+
+# Compteurs du pipeline: profondeur de la file et débit de chaque étage
+# - attente_depot: temps passé par la recherche à attendre une place dans la file
+#   (file pleine => l'étage de détail est le goulot d'étranglement)
+# - attente_retrait: temps passé par le détail à attendre un lot
+#   (file vide => l'étage de recherche est le goulot d'étranglement)
+# - profondeur de la file: une file qui reste à moitié pleine indique aussi un détail trop lent
+class StatsPipeline:
+    def __init__(self, taille_file):
+        self.taille_file = taille_file
+        self.debut = time.monotonic()
+        self.pages_recherche = 0
+        # Requêtes d'autocomplétion et de recherche du découpage des gros départements
+        self.requetes_decoupage = 0
+        # Départements ou zones arrêtés en cours de recherche faute de budget
+        self.departements_interrompus = 0
+        self.temps_recherche = 0.0
+        self.lots_detail = 0
+        self.requetes_detail = 0
+        self.annonces_detail = 0
+        self.annonces_inchangees = 0
+        self.temps_detail = 0.0
+        self.attente_depot = 0.0
+        self.attente_retrait = 0.0
+        self.profondeur_max = 0
+        self.somme_profondeur = 0
+        self.nb_mesures_profondeur = 0
+
+    def mesurer_file(self, file):
+        profondeur = file.qsize()
+        self.profondeur_max = max(self.profondeur_max, profondeur)
+        self.somme_profondeur += profondeur
+        self.nb_mesures_profondeur += 1
+
+    def profondeur_moyenne(self):
+        return self.somme_profondeur / max(self.nb_mesures_profondeur, 1)
+
+    def goulot(self):
+        if self.attente_depot > self.attente_retrait or self.profondeur_moyenne() >= self.taille_file / 2:
+            return 'détail'
+        return 'recherche'
+
+    def nb_requetes(self):
+        return self.pages_recherche + self.requetes_detail + self.requetes_decoupage
+
+    # Nombre de requêtes encore permises par le budget (None: pas de budget)
+    def budget_restant(self, budget):
+        if budget is None:
+            return None
+        return max(budget - self.nb_requetes(), 0)
+
+    def nb_annonces(self):
+        return self.annonces_detail + self.annonces_inchangees
+
+    def afficher(self, file=None):
+        duree = max(time.monotonic() - self.debut, 1e-9)
+        afficher(f"\n=== PIPELINE ({duree:.0f}s) ===")
+        if file is not None:
+            afficher(f"file: {file.qsize()}/{self.taille_file} lots")
+        afficher(f"profondeur file: moyenne {self.profondeur_moyenne():.1f} | max {self.profondeur_max}")
+        afficher(f"recherche: {self.pages_recherche} pages | {self.pages_recherche / duree:.2f} pages/s"
+              f" | attente file pleine {self.attente_depot:.1f}s")
+        if self.requetes_decoupage:
+            afficher(f"découpage: {self.requetes_decoupage} requêtes")
+        afficher(f"détail: {self.lots_detail} lots en {self.requetes_detail} requêtes, {self.annonces_detail} annonces"
+              f" | {self.annonces_detail / duree:.2f} annonces/s | attente file vide {self.attente_retrait:.1f}s")
+        afficher(f"index: {self.annonces_inchangees} annonces inchangées, requêtes de détail évitées")
+        afficher(f"total: {self.nb_annonces()} annonces | {self.nb_annonces() / duree:.2f} annonces/s"
+              f" | {self.nb_requetes() / max(self.nb_annonces(), 1):.3f} requêtes/annonce")
+        afficher(f"goulot d'étranglement probable: {self.goulot()}\n")
+
+# Clé d'un département (ou d'une zone d'un département découpé) dans le journal de reprise
+def cle_departement(dep):
+    if dep.get('shard'):
+        return f"{dep['numero']}_{dep['shard']}"
+    return str(dep['numero'])
+
+# Nom affiché d'un département ou d'une zone
+def nom_departement(dep):
+    if dep.get('shard'):
+        return f"{dep['nom']} ({dep['shard']})"
+    return dep['nom']
+
+# Suivi d'un département découpé en zones: le CSV du département est écrit
+# quand toutes les zones lancées ont été parcourues
+class GroupeShards:
+    def __init__(self, dep, shards, fraicheur):
+        self.dep = dep
+        self.shards = shards
+        self.fraicheur = fraicheur
+        self.restants = 0
+        # Requêtes et annonces nouvelles ou modifiées des zones terminées (historique de fraîcheur)
+        self.nb_requetes = 0
+        self.nb_nouvelles = 0
+
+# Suivi d'un département en cours: les annonces de chaque page sont ajoutées au fichier JSONL du département
+# et le fichier CSV est écrit quand la recherche est terminée et que tous les lots sont traités
+# Les pages déjà présentes dans le journal ne seront pas redemandées,
+# le fichier JSONL est repris à la position de la dernière page journalisée
+# groupe: GroupeShards si dep est une zone d'un département découpé
+class EtatDepartement:
+    def __init__(self, dep, journal, index, fraicheur, groupe=None):
+        self.dep = dep
+        self.cle = cle_departement(dep)
+        self.groupe = groupe
+        self.journal = journal
+        self.index = index
+        self.fraicheur = fraicheur
+        # Requêtes (une requête de détail est partagée entre ses lots) et annonces nouvelles ou modifiées
+        # de ce lancement, pour l'historique de fraîcheur
+        self.nb_requetes = 0
+        self.nb_nouvelles = 0
+        self.pages_faites = journal.pages_terminees(SOURCE, self.cle)
+        self.nb_annonces = journal.nb_lignes(SOURCE, self.cle)
+        self.ecrivain = EcrivainJsonl(chemin_departement(dep, 'jsonl'), position=journal.position(SOURCE, self.cle))
+        self.lots_en_cours = 0
+        self.recherche_terminee = False
+        # Vrai si la dernière page (page vide) a été atteinte sans erreur
+        self.fin_atteinte = False
+        # Vrai si le détail d'une page a échoué: la page n'est pas journalisée et sera redemandée
+        self.echec = False
+        # Vrai si la recherche s'est arrêtée faute de budget: les pages suivantes seront demandées au lancement suivant
+        self.budget_atteint = False
+
+    def est_termine(self):
+        return self.recherche_terminee and self.lots_en_cours == 0
+
+    # Département complet: dernière page atteinte et aucune page en échec
+    def est_complet(self):
+        return self.fin_atteinte and not self.echec
+
+# Un lot de la file: les annonces d'une page de recherche à récupérer en détail
+# lignes_connues: lignes relues depuis l'index pour les annonces inchangées de la page
+# empreintes: empreinte de chaque annonce de la page (id -> empreinte)
+class Lot:
+    def __init__(self, etat, page, placeIds, lignes_connues, empreintes):
+        self.etat = etat
+        self.page = page
+        self.placeIds = placeIds
+        self.lignes_connues = lignes_connues
+        self.empreintes = empreintes
+
+# Une page est terminée: ses annonces sont écrites sur disque puis la page est journalisée
+def terminer_page(etat, page, annonces):
+    position = etat.ecrivain.ecrire_page(annonces)
+    etat.journal.enregistrer_page(SOURCE, etat.cle, page, len(annonces), position)
+    etat.pages_faites.add(page)
+    etat.nb_annonces += len(annonces)
+    metriques.annonces_page(SOURCE, etat.cle, len(annonces))
+
+# Finalisation protégée: une erreur (export CSV, fichiers, journal) ne doit pas arrêter le worker appelant,
+# sinon les workers de recherche resteraient bloqués sur une file de lots que plus personne ne vide
+# Le département est laissé en échec et sera repris au prochain lancement
+def finaliser(etat):
+    try:
+        finaliser_departement(etat)
+    except Exception as e:
+        etat.echec = True
+        afficher(f"Erreur lors de la finalisation du département {nom_departement(etat.dep)}")
+        afficher(f"Type d'erreur: {type(e).__name__}")
+        afficher(f"Message d'erreur: {str(e)} \n")
+
+def finaliser_departement(etat):
+    afficher(f"FIN DE LA RECUPERATION DES ANNONCES >>> {nom_departement(etat.dep)}\nTOTAL DES ANNONCES: {etat.nb_annonces}")
+    etat.ecrivain.fermer()
+    if etat.groupe is not None:
+        # Le fichier JSONL de la zone est gardé jusqu'à la fusion du département
+        if etat.est_complet():
+            etat.journal.marquer_termine(SOURCE, etat.cle)
+        etat.groupe.nb_requetes += etat.nb_requetes
+        etat.groupe.nb_nouvelles += etat.nb_nouvelles
+        etat.groupe.restants -= 1
+        if etat.groupe.restants == 0:
+            finaliser_groupe(etat.groupe, etat.journal)
+        return
+    enregistrer_annonces(etat.dep)
+    # Un département interrompu par une erreur reste à reprendre au prochain lancement,
+    # son fichier JSONL est gardé pour la reprise
+    if etat.est_complet():
+        etat.fraicheur.enregistrer(SOURCE, etat.dep['numero'], etat.nb_annonces, etat.nb_nouvelles, etat.nb_requetes)
+        etat.journal.marquer_termine(SOURCE, etat.dep['numero'])
+        etat.ecrivain.supprimer()
+
+# Fusion des zones d'un département découpé dans le CSV du département
+# Une annonce présente dans deux zones (codes postaux qui se recouvrent) n'est écrite qu'une fois
+# La fusion attend que toutes les zones soient terminées: un département dont une zone est interrompue
+# (erreur, budget dépensé) garde son CSV précédent, les fichiers des zones sont gardés pour la reprise
+def finaliser_groupe(groupe, journal):
+    incompletes = [shard for shard in groupe.shards if not journal.est_termine(SOURCE, cle_departement(shard))]
+    if incompletes:
+        afficher(f"FUSION REPORTEE >>> {groupe.dep['nom']}: {len(incompletes)} codes postaux sur {len(groupe.shards)}"
+                 f" à reprendre au prochain lancement")
+        return
+    chemins = [chemin_departement(shard, 'jsonl') for shard in groupe.shards]
+    chemin_csv = chemin_departement(groupe.dep)
+    nb_annonces = exporter_csv([chemin for chemin in chemins if chemin.exists()], chemin_csv, cle='id')
+    afficher(f"FUSION DES ZONES >>> {groupe.dep['nom']}: {len(groupe.shards)} codes postaux, {nb_annonces} annonces"
+          f" enregistrées dans le fichier: {chemin_csv.name}")
+    # Département complet: les fichiers des zones ne servent plus
+    groupe.fraicheur.enregistrer(SOURCE, groupe.dep['numero'], nb_annonces, groupe.nb_nouvelles, groupe.nb_requetes)
+    journal.marquer_termine(SOURCE, groupe.dep['numero'])
+    for chemin in chemins:
+        chemin.unlink(missing_ok=True)
+
+# Découpage des départements de DEPARTEMENTS_A_DECOUPER, fait au premier lancement et relu du journal à la reprise
+# (la clé des pages journalisées dépend des zones)
+# Les requêtes du découpage sont comptées dans stats (budget de requêtes)
+# return: liste des zones (vide si le département n'est pas découpé)
+async def shards_departement(dep, limiteur, journal, stats):
+    if str(dep['numero']).zfill(2) not in DEPARTEMENTS_A_DECOUPER:
+        return []
+    shards = journal.parametre(SOURCE, f"shards_{dep['numero']}")
+    if shards is not None:
+        return json.loads(shards)
+    try:
+        def compter():
+            stats.requetes_decoupage += 1
+        shards = await limiteur.appeler(AUTOCOMPLETE_URL, planifier_shards, dep, compter)
+    except Exception as e:
+        afficher(f"Erreur lors du découpage du département {dep['nom']}, il sera parcouru d'un seul bloc")
+        afficher(f"Type d'erreur: {type(e).__name__}")
+        afficher(f"Message d'erreur: {str(e)} \n")
+        return []
+    journal.fixer_parametre(SOURCE, f"shards_{dep['numero']}", json.dumps(shards, ensure_ascii=False))
+    return shards
+
+# Mesure de la taille des pages de recherche acceptée par le site, sur un département donné
+# (de préférence un gros département, pour avoir plusieurs pages)
+# - page 1 complète avec TAILLE_PAGE_RECHERCHE_MAX annonces: cette taille est acceptée,
+# - page 1 incomplète mais page 2 non vide: le site plafonne la taille au nombre d'annonces renvoyées,
+# - sinon on ne peut pas conclure et on garde la taille par défaut de annonces_filters.
+# return: nombre d'annonces par page de recherche
+async def mesurer_taille_page(dep, limiteur, stats):
+    taille_defaut = annonces_filters['paging']['size']
+    if TAILLE_PAGE_RECHERCHE_MAX <= taille_defaut:
+        return taille_defaut
+
+    try:
+        page_1 = await limiteur.appeler(SEARCH_URL, get_annonces_resume, dep['id'], 1, TAILLE_PAGE_RECHERCHE_MAX)
+        stats.pages_recherche += 1
+        if len(page_1) >= TAILLE_PAGE_RECHERCHE_MAX:
+            return TAILLE_PAGE_RECHERCHE_MAX
+        if len(page_1) == 0:
+            return taille_defaut
+
+        page_2 = await limiteur.appeler(SEARCH_URL, get_annonces_resume, dep['id'], 2, TAILLE_PAGE_RECHERCHE_MAX)
+        stats.pages_recherche += 1
+    except Exception as e:
+        afficher("Erreur lors de la mesure de la taille des pages, taille par défaut gardée")
+        afficher(f"Type d'erreur: {type(e).__name__}")
+        afficher(f"Message d'erreur: {str(e)} \n")
+        return taille_defaut
+    if page_2 and len(page_1) > taille_defaut:
+        return len(page_1)
+    return taille_defaut
+
+# Étage de recherche: parcourt les pages d'un département à la fois, `fenetre` pages demandées en même temps,
+# et dépose un lot par page dans la file, limité aux annonces nouvelles ou modifiées
+# Les pages d'une fenêtre sont traitées dans l'ordre jusqu'à la première page vide (fin du département)
+# ou en erreur (le département reste à reprendre, les pages précédentes sont gardées)
+# Le budget est vérifié avant chaque fenêtre: une fois dépensé, le département s'arrête à sa dernière page
+# journalisée et reprend à la page suivante au lancement suivant
+async def worker_recherche(file_departements, file_lots, limiteur, stats, journal, index, fraicheur, taille_page,
+                           fenetre, budget):
+    while True:
+        # Budget de requêtes dépensé: les départements restants attendent le lancement suivant
+        if stats.budget_restant(budget) == 0:
+            return
+        try:
+            dep, groupe = file_departements.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        etat = EtatDepartement(dep, journal, index, fraicheur, groupe)
+        page = 1
+        afficher(f"RECUPERATION ANNONCES >>> {nom_departement(dep)}")
+        if etat.pages_faites:
+            afficher(f"REPRISE >>> {nom_departement(dep)}: {len(etat.pages_faites)} pages déjà récupérées")
+        try:
+            while not etat.fin_atteinte:
+                # Fenêtre réduite aux requêtes que le budget permet encore
+                restant = stats.budget_restant(budget)
+                if restant == 0:
+                    etat.budget_atteint = True
+                    afficher(f"BUDGET DEPENSE >>> {nom_departement(dep)}: arrêt avant la page {page},"
+                             f" reprise au prochain lancement")
+                    break
+                taille_fenetre = fenetre if restant is None else min(fenetre, restant)
+                # Prochaines pages à demander (les pages déjà récupérées lors d'un lancement précédent sont sautées)
+                pages = []
+                while len(pages) < taille_fenetre:
+                    if page not in etat.pages_faites:
+                        pages.append(page)
+                    page += 1
+
+                debut = time.monotonic()
+                resultats = await asyncio.gather(
+                    *[limiteur.appeler(SEARCH_URL, get_annonces_resume, dep['id'], p, taille_page) for p in pages],
+                    return_exceptions=True
+                )
+                stats.temps_recherche += time.monotonic() - debut
+                stats.pages_recherche += len(pages)
+                etat.nb_requetes += len(pages)
+
+                for page, resumes in zip(pages, resultats):
+                    if isinstance(resumes, Exception):
+                        raise resumes
+                    if len(resumes) == 0:
+                        etat.fin_atteinte = True
+                        break
+
+                    # Tri des annonces de la page: nouvelles ou modifiées d'un côté, inchangées de l'autre
+                    empreintes = {str(elt['id']): empreinte(elt, SCHEMA_EMPREINTE) for elt in resumes}
+                    placeIds, lignes_connues = index.trier(SOURCE, empreintes)
+                    stats.annonces_inchangees += len(lignes_connues)
+                    etat.nb_nouvelles += len(placeIds)
+
+                    if len(placeIds) == 0:
+                        terminer_page(etat, page, lignes_connues)
+                        continue
+
+                    etat.lots_en_cours += 1
+                    debut = time.monotonic()
+                    await file_lots.put(Lot(etat, page, placeIds, lignes_connues, empreintes))
+                    stats.attente_depot += time.monotonic() - debut
+                    stats.mesurer_file(file_lots)
+                page = pages[-1] + 1
+        except Exception as e:
+            afficher(f"Erreur lors de la récupération des annonces pour le département {nom_departement(dep)} à la page {page}")
+            afficher(f"Type d'erreur: {type(e).__name__}")
+            afficher(f"Message d'erreur: {str(e)} \n")
+
+        if etat.budget_atteint:
+            stats.departements_interrompus += 1
+        etat.recherche_terminee = True
+        if etat.est_termine():
+            finaliser(etat)
+
+# Regroupe le lot reçu avec les lots déjà en attente dans la file (sans attendre),
+# tant que l'url classifiedList des identifiants regroupés reste sous LONGUEUR_URL_MAX
+# return: (lots regroupés, lot retiré de la file qui ne rentrait plus ou None, vrai si le marqueur de fin a été retiré)
+def regrouper_lots(premier_lot, file_lots):
+    lots = [premier_lot]
+    placeIds = list(premier_lot.placeIds)
+    while not file_lots.empty():
+        suivant = file_lots.get_nowait()
+        if suivant is None:
+            return lots, None, True
+        if longueur_url_annonces(placeIds + suivant.placeIds) > LONGUEUR_URL_MAX:
+            return lots, suivant, False
+        lots.append(suivant)
+        placeIds.extend(suivant.placeIds)
+    return lots, None, False
+
+# Étage de détail: vide la file et récupère les annonces de plusieurs lots en une requête
+async def worker_detail(file_lots, limiteur, stats):
+    reste = None
+    fin = False
+    while True:
+        if reste is not None:
+            lot, reste = reste, None
+        elif fin:
+            return
+        else:
+            debut = time.monotonic()
+            lot = await file_lots.get()
+            stats.attente_retrait += time.monotonic() - debut
+            if lot is None:
+                return
+
+        lots, reste, fin_lue = regrouper_lots(lot, file_lots)
+        fin = fin or fin_lue
+        placeIds = [pid for l in lots for pid in l.placeIds]
+        try:
+            debut = time.monotonic()
+            annonces = await limiteur.appeler(CLASSIFIED_LIST_URL, get_annonces, placeIds)
+            stats.temps_detail += time.monotonic() - debut
+            stats.requetes_detail += 1
+            stats.lots_detail += len(lots)
+            annonces_par_id = {str(a['id']): a for a in annonces}
+        except Exception as e:
+            afficher(f"Erreur lors de la récupération des annonces: {len(placeIds)} annonces de {len(lots)} pages")
+            afficher(f"Type d'erreur: {type(e).__name__}")
+            afficher(f"Message d'erreur: {str(e)} \n")
+            annonces_par_id = None
+
+        # Répartition des annonces récupérées entre les pages d'origine
+        for l in lots:
+            etat, page = l.etat, l.page
+            etat.nb_requetes += 1 / len(lots)
+            try:
+                if annonces_par_id is None:
+                    # Requête de détail en échec: la page n'est pas journalisée et le département reste à reprendre
+                    etat.echec = True
+                else:
+                    annonces_lot = [annonces_par_id[pid] for pid in l.placeIds if pid in annonces_par_id]
+                    if not annonces_lot:
+                        # Annonces retirées entre la recherche et le détail: la page est journalisée quand même
+                        afficher(f"Aucune annonce trouvée pour le département {etat.dep['nom']} à la page {page}")
+                    stats.annonces_detail += len(annonces_lot)
+                    etat.index.enregistrer(SOURCE, {str(a['id']): a for a in annonces_lot}, l.empreintes)
+                    terminer_page(etat, page, l.lignes_connues + annonces_lot)
+            except Exception as e:
+                etat.echec = True
+                afficher(f"Erreur lors de l'enregistrement des annonces pour le département {etat.dep['nom']} à la page {page}")
+                afficher(f"Type d'erreur: {type(e).__name__}")
+                afficher(f"Message d'erreur: {str(e)} \n")
+            finally:
+                etat.lots_en_cours -= 1
+
+            if etat.est_termine():
+                finaliser(etat)
+
+async def rapport_periodique(stats, file_lots):
+    while True:
+        await asyncio.sleep(INTERVALLE_RAPPORT)
+        stats.afficher(file_lots)
+
+# Récupération concurrente des annonces de tous les départements
+# departements_list: liste des départements (dictionnaires numero, nom, id)
+# concurrency: nombre maximal de requêtes simultanées par hôte
+# taille_file: nombre maximal de lots d'identifiants en attente de détail (par défaut 2 * concurrency)
+# journal: journal de reprise (par défaut le fichier JOURNAL_CRAWL)
+# index: index des annonces déjà récupérées (par défaut le fichier INDEX_ANNONCES)
+# limiteur: plafond de requêtes par hôte partagé avec d'autres sources (ordonnanceur commun),
+#           par défaut un plafond propre de `concurrency` requêtes
+# fraicheur: historique de fraîcheur des départements (par défaut dans la base de l'index)
+# budget: nombre maximal de requêtes du passage, None pour parcourir tous les départements
+# fenetre: nombre de pages d'un département demandées en même temps (par défaut concurrency)
+# return: les compteurs du pipeline
+async def execution_async(departements_list, concurrency=2, taille_file=None, journal=None, index=None, limiteur=None,
+                          fraicheur=None, budget=None, fenetre=None):
+    DEPARTEMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    if journal is None:
+        journal = JournalCrawl(JOURNAL_CRAWL)
+    if index is None:
+        index = IndexAnnonces(INDEX_ANNONCES)
+    fraicheur_propre = fraicheur is None
+    if fraicheur_propre:
+        fraicheur = HistoriqueFraicheur(index.chemin)
+    debut_run = journal.debut(SOURCE)
+    taille_file = taille_file or 2 * concurrency
+    fenetre = fenetre or concurrency
+    limiteur_partage = limiteur is not None
+    if not limiteur_partage:
+        limiteur = LimiteurHotes(concurrency)
+    stats = StatsPipeline(taille_file)
+    # Le pool de connexions de la session partagée doit couvrir toutes les requêtes simultanées
+    transport.configurer_hote(SELOGER_HOST, headers=headers, cookies=cookies,
+                              pool_maxsize=max(transport.POOL_MAXSIZE, concurrency))
+    file_lots = asyncio.Queue(maxsize=taille_file)
+
+    file_departements = asyncio.Queue()
+    deps_valides = []
+    for dep in departements_list:
+        # Vérification de l'existence de dep['id']
+        if 'id' not in dep or not dep['id']:
+            afficher(f"Erreur: pas d'id pour le département {dep.get('nom', 'inconnu')}")
+            continue
+        deps_valides.append(dep)
+    # Départements du passage: les moins frais d'abord, dans la limite du budget de requêtes
+    par_numero = {str(dep['numero']): dep for dep in deps_valides}
+    selection = selectionner_unites(fraicheur, journal, SOURCE,
+                                    [dict(dep, cle=str(dep['numero'])) for dep in deps_valides], budget)
+    selection = [par_numero[unite['cle']] for unite in selection]
+
+    a_recuperer = []
+    zones = []
+    nb_reportes = 0
+    for dep in selection:
+        # Département terminé (et son CSV écrit) lors d'un lancement précédent
+        if journal.est_termine(SOURCE, dep['numero']):
+            afficher(f"DEJA RECUPERE >>> {dep['nom']}")
+            continue
+        # Budget dépensé par le découpage des départements précédents
+        if stats.budget_restant(budget) == 0:
+            nb_reportes += 1
+            continue
+        shards = await shards_departement(dep, limiteur, journal, stats)
+        if not shards:
+            a_recuperer.append((dep, None))
+            continue
+        groupe = GroupeShards(dep, shards, fraicheur)
+        for shard in shards:
+            if not journal.est_termine(SOURCE, cle_departement(shard)):
+                zones.append((shard, groupe))
+                groupe.restants += 1
+        # Toutes les zones terminées lors d'un lancement précédent, seule la fusion manquait
+        if groupe.restants == 0:
+            finaliser_groupe(groupe, journal)
+    # Les zones des gros départements sont lancées en premier: ce sont les plus longues à parcourir
+    a_recuperer = zones + a_recuperer
+    for element in a_recuperer:
+        file_departements.put_nowait(element)
+
+    # Taille des pages de recherche: mesurée au premier lancement, relue du journal à la reprise
+    # (la numérotation des pages journalisées en dépend)
+    taille_page = journal.parametre(SOURCE, 'taille_page')
+    if taille_page is None:
+        taille_page = await mesurer_taille_page(a_recuperer[0][0], limiteur, stats) if a_recuperer else annonces_filters['paging']['size']
+        journal.fixer_parametre(SOURCE, 'taille_page', taille_page)
+    taille_page = int(taille_page)
+    afficher(f"Taille des pages de recherche: {taille_page} annonces")
+
+    rapport = asyncio.create_task(rapport_periodique(stats, file_lots))
+    details = [asyncio.create_task(worker_detail(file_lots, limiteur, stats)) for _ in range(concurrency)]
+    try:
+        # Autant de départements en cours de recherche que de requêtes simultanées autorisées
+        await asyncio.gather(
+            *[worker_recherche(file_departements, file_lots, limiteur, stats, journal, index, fraicheur, taille_page,
+                               fenetre, budget)
+              for _ in range(concurrency)]
+        )
+        # Un marqueur de fin par worker de détail, déposé après les derniers lots
+        for _ in details:
+            await file_lots.put(None)
+        await asyncio.gather(*details)
+    finally:
+        rapport.cancel()
+        if not limiteur_partage:
+            limiteur.fermer()
+        if fraicheur_propre:
+            fraicheur.fermer()
+
+    nb_reportes += file_departements.qsize()
+    nb_interrompus = stats.departements_interrompus
+    if nb_reportes or nb_interrompus:
+        afficher(f"Budget de {budget} requêtes dépensé ({stats.nb_requetes()} requêtes),"
+                 f" {nb_reportes} départements ou zones reportés et {nb_interrompus} interrompus,"
+                 f" repris au prochain lancement")
+    # Récupération complète: le journal est vidé, le prochain lancement repartira de zéro
+    if all(journal.est_termine(SOURCE, dep['numero']) for dep in selection):
+        journal.terminer(SOURCE)
+        afficher("Récupération complète, journal de reprise vidé")
+        # Les annonces des départements hors du passage ne sont pas revues: compte fait seulement sur tous les départements
+        if len(selection) == len(deps_valides):
+            afficher(f"{index.nb_non_vues_depuis(SOURCE, debut_run)} annonces de l'index n'ont pas été revues (retirées du site)")
+
+    stats.afficher()
+    return stats
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    asyncio.run(execution_async(charger_departements(), concurrency, budget=budget))
@@ -0,0 +1,188 @@
+# Ce fichier contient le découpage des gros départements en zones plus petites (codes postaux)
+# Un gros département (Paris, Nord, Bouches-du-Rhône ...) parcouru d'un seul bloc demande des centaines
+# de pages de recherche, de plus en plus lentes, qu'un seul worker parcourt l'une après l'autre.
+# Découpé en codes postaux, chaque code postal est une recherche indépendante:
+# les workers du pipeline (scrapper_seloger_async.py) les parcourent en parallèle,
+# et les annonces sont fusionnées, sans doublon, dans le fichier seloger_dep_*.csv du département.
+#
+# Les codes postaux sont trouvés avec l'autocomplétion (la même que get_id_dep), limitée au type POCO:
+# on cherche le préfixe du département ("75"), et tant qu'une recherche renvoie autant de lieux
+# que la limite de l'autocomplétion (résultat probablement tronqué) on l'affine d'un chiffre ("750", "751" ...),
+# au plus PROFONDEUR_MAX chiffres de plus que le préfixe du département (au plus 1 + 10 + 100 requêtes).
+# Un code postal que l'autocomplétion ne propose pas ferait perdre ses annonces sans le dire:
+# la somme des annonces des codes postaux est comparée au nombre d'annonces du département
+# (une recherche d'une annonce par lieu), et le département est parcouru d'un seul bloc si elle est trop faible.
+# Chaque requête du découpage est signalée à la fonction `compter` reçue (compteurs du pipeline, budget de requêtes).
+import json
+import re
+import sys
+from config import payload_search_id_dep, annonces_filters
+# scrapper_seloger_departements configure la session partagée de seloger.com
+from scrapper_seloger_departements import AUTOCOMPLETE_URL
+from commun import transport
+from commun.schema import payload_avec
+from commun.affichage import afficher
+
+# Type de lieu des codes postaux dans l'autocomplétion
+TYPE_CODE_POSTAL = 'POCO'
+
+# Chiffres ajoutés au plus au préfixe du département pour affiner l'autocomplétion
+PROFONDEUR_MAX = 2
+
+# Les noms de CLES_CODE_POSTAL et CHAMPS_TOTAL ne sont pas confirmés par une vraie réponse de seloger.com
+# (get_id_dep ne lit que 'id'). Un nom faux ne fait pas perdre d'annonces: sans code postal trouvé
+# ou sans total vérifiable, le découpage est abandonné ou signalé non vérifié.
+# Pour vérifier: python scrapper_seloger_decoupage.py 75 (affiche les champs des réponses)
+
+# Clés de l'autocomplétion où chercher le code postal d'un lieu
+CLES_CODE_POSTAL = ('postalCode', 'zipCode', 'label', 'displayName', 'name')
+
+SEARCH_URL = "https://www.seloger.com/serp-bff/search"
+# Champs de la réponse de recherche où chercher le nombre total d'annonces d'un lieu
+# (à la racine de la réponse ou dans un des blocs de BLOCS_TOTAL)
+CHAMPS_TOTAL = ('totalCount', 'total', 'nbResults', 'resultsCount', 'count')
+BLOCS_TOTAL = ('meta', 'pagination', 'paging')
+# Part minimale des annonces du département couverte par ses codes postaux
+COUVERTURE_MIN = 0.95
+
+# Cette fonction permet de récupérer les lieux proposés par l'autocomplétion pour un texte
+# texte: début du nom ou du code postal
+# types: types de lieux acceptés (par défaut ceux de payload_search_id_dep)
+# return: liste des lieux (dictionnaires contenant au moins la clé 'id')
+def get_lieux(texte, types=None):
+    modifications = {('text',): texte}
+    if types:
+        modifications[('placeTypes',)] = list(types)
+    payload = payload_avec(payload_search_id_dep, modifications)
+    result = transport.post(AUTOCOMPLETE_URL, json=payload)
+    result.raise_for_status()
+    lieux = result.json()
+    if not isinstance(lieux, list):
+        return []
+    return [lieu for lieu in lieux if isinstance(lieu, dict) and lieu.get('id')]
+
+# Code postal (5 chiffres) d'un lieu renvoyé par l'autocomplétion, None s'il n'est pas trouvé
+def code_postal(lieu):
+    for cle in CLES_CODE_POSTAL:
+        valeur = lieu.get(cle)
+        if valeur is None:
+            continue
+        trouve = re.search(r'\b\d{5}\b', str(valeur))
+        if trouve:
+            return trouve.group()
+    return None
+
+# Cette fonction permet de récupérer le nombre total d'annonces d'un lieu (recherche d'une seule annonce)
+# return: nombre d'annonces, None si la réponse ne le donne pas
+def get_total_annonces(placeId):
+    filters = payload_avec(annonces_filters, {('criteria', 'location', 'placeIds'): [placeId],
+                                              ('paging', 'page'): 1, ('paging', 'size'): 1})
+    result = transport.post(SEARCH_URL, json=filters)
+    if result.status_code != 200:
+        return None
+    data = result.json()
+    if not isinstance(data, dict):
+        return None
+    for bloc in (data, *(data.get(nom) for nom in BLOCS_TOTAL)):
+        if not isinstance(bloc, dict):
+            continue
+        for champ in CHAMPS_TOTAL:
+            total = bloc.get(champ)
+            if isinstance(total, (int, float)) and total >= 0:
+                return int(total)
+    return None
+
+# Vérifie que les codes postaux couvrent les annonces du département
+# compter: fonction appelée après chaque requête (None: requêtes non comptées)
+# return: les zones, ou une liste vide si la couverture est trop faible (département parcouru d'un seul bloc)
+def verifier_couverture(dep, zones, compter=None):
+    compter = compter or (lambda: None)
+    total = get_total_annonces(dep['id'])
+    compter()
+    if total is None:
+        afficher(f"DECOUPAGE >>> {dep['nom']}: nombre total d'annonces inconnu, couverture des codes postaux non vérifiée")
+        return zones
+    somme = 0
+    for zone in zones:
+        total_zone = get_total_annonces(zone['id'])
+        compter()
+        if total_zone is None:
+            afficher(f"DECOUPAGE >>> {dep['nom']}: nombre d'annonces du code postal {zone['shard']} inconnu,"
+                     f" couverture des codes postaux non vérifiée")
+            return zones
+        somme += total_zone
+    # Une annonce peut compter dans deux codes postaux: la somme peut dépasser le total
+    if somme < COUVERTURE_MIN * total:
+        afficher(f"⚠ DECOUPAGE >>> {dep['nom']}: les codes postaux couvrent {somme} annonces sur {total},"
+                 f" le département sera parcouru d'un seul bloc")
+        return []
+    afficher(f"DECOUPAGE >>> {dep['nom']}: les codes postaux couvrent {somme} annonces sur {total}")
+    return zones
+
+# Préfixe des codes postaux d'un département ("01", "75", "971" ...; la Corse est en 20xxx)
+def prefixe_departement(dep):
+    numero = str(dep['numero']).zfill(2)
+    if numero.upper() in ('2A', '2B'):
+        return '20'
+    return numero
+
+# Cette fonction permet de découper un département en codes postaux
+# dep: dictionnaire du département (numero, nom, id)
+# compter: fonction appelée après chaque requête d'autocomplétion ou de recherche (None: requêtes non comptées)
+# return: liste des zones (dictionnaires numero, nom, id du code postal, shard = code postal),
+#         vide si aucun code postal n'a été trouvé ou si les codes postaux ne couvrent pas le département
+#         (le département est alors parcouru d'un seul bloc)
+def planifier_shards(dep, compter=None):
+    compter = compter or (lambda: None)
+    limite = payload_search_id_dep['limit']
+    prefixe_dep = prefixe_departement(dep)
+    zones = {}
+    prefixes = [prefixe_dep]
+    tronques = 0
+    while prefixes:
+        prefixe = prefixes.pop()
+        lieux = get_lieux(prefixe, [TYPE_CODE_POSTAL])
+        compter()
+        for lieu in lieux:
+            code = code_postal(lieu)
+            if code is not None and code.startswith(prefixe_dep):
+                zones.setdefault(lieu['id'], code)
+        # Résultat probablement tronqué par la limite: on affine le préfixe d'un chiffre
+        if len(lieux) >= limite:
+            if len(prefixe) < min(5, len(prefixe_dep) + PROFONDEUR_MAX):
+                prefixes.extend(prefixe + chiffre for chiffre in '0123456789')
+            else:
+                tronques += 1
+
+    afficher(f"DECOUPAGE >>> {dep['nom']}: {len(zones)} codes postaux")
+    if tronques:
+        # Codes postaux manquants possibles: la vérification de la couverture le dira
+        afficher(f"DECOUPAGE >>> {dep['nom']}: {tronques} préfixes encore tronqués à la profondeur maximale")
+    zones = [
+        {'numero': dep['numero'], 'nom': dep['nom'], 'id': id_lieu, 'shard': code}
+        for id_lieu, code in sorted(zones.items(), key=lambda zone: zone[1])
+    ]
+    if not zones:
+        return []
+    return verifier_couverture(dep, zones, compter)
+
+# Affiche les champs des réponses d'autocomplétion et de recherche d'un département,
+# pour confirmer CLES_CODE_POSTAL et CHAMPS_TOTAL
+# Utilisation: python scrapper_seloger_decoupage.py [numéro du département]
+if __name__ == '__main__':
+    from scrapper_seloger_departements import get_id_dep
+    from config import departements
+    numero = sys.argv[1] if len(sys.argv) > 1 else '75'
+    dep = next(dep for dep in departements if str(dep['numero']).zfill(2) == numero.zfill(2))
+    lieux = get_lieux(prefixe_departement(dep), [TYPE_CODE_POSTAL])
+    afficher(f"autocomplétion '{prefixe_departement(dep)}': {len(lieux)} lieux")
+    for lieu in lieux[:3]:
+        afficher(json.dumps(lieu, ensure_ascii=False))
+    filters = payload_avec(annonces_filters, {('criteria', 'location', 'placeIds'): [get_id_dep(dep['nom'])],
+                                              ('paging', 'page'): 1, ('paging', 'size'): 1})
+    data = transport.post(SEARCH_URL, json=filters).json()
+    if isinstance(data, dict):
+        afficher(f"recherche: champs {sorted(data)}")
+        for nom in BLOCS_TOTAL:
+            if isinstance(data.get(nom), dict):
+                afficher(f"recherche, bloc {nom}: {json.dumps(data[nom], ensure_ascii=False)}")
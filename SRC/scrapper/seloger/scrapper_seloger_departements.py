@@ -4,31 +4,53 @@
 # Si on importe ce fichier dans un autre fichier, 
 # on peut récupérer les identifiants d'un département en particulier en appelant la fonction get_id_dep(dep_name) avec le nom du département en paramètre
 # on peut aussi récupérer tous les départements avec leurs identifiants en appelant la fonction get_departements() 
-import requests
+# Les identifiants trouvés sont gardés dans un cache (CACHE_LIEUX) pendant CACHE_LIEUX_TTL secondes,
+# seuls les départements absents du cache sont recherchés, en parallèle
+import sys
 import pandas as pd
-from config import headers, cookies, payload_search_id_dep, departements, DEPARTEMENTS_DIR
+from pathlib import Path
+from config import headers, cookies, payload_search_id_dep, departements, DEPARTEMENTS_DIR, SELOGER_HOST, budget_seloger
+from config import CACHE_LIEUX, CACHE_LIEUX_TTL
+
+# Accès aux briques communes des scrapers (dossier scrapper/commun)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from commun import transport
+from commun.cache_lieux import CacheLieux, resoudre_lieux
+from commun.schema import payload_avec
+from commun.affichage import afficher
+
+# Les entêtes et cookies sont appliqués une fois à la session partagée de seloger.com
+transport.configurer_hote(SELOGER_HOST, headers=headers, cookies=cookies)
+# Débit adaptatif: remplace les pauses aléatoires entre les pages
+transport.limiteur.configurer_hote(SELOGER_HOST, **budget_seloger)
+
+AUTOCOMPLETE_URL = "https://www.seloger.com/search-mfe-bff/autocomplete"
 
 def get_id_dep(dep_name = 'paris'):
     try:
-        url = "https://www.seloger.com/search-mfe-bff/autocomplete"
-        payload = payload_search_id_dep
-        payload['text'] = dep_name
+        url = AUTOCOMPLETE_URL
+        # Nouveau payload à chaque appel: get_id_dep peut être appelée depuis plusieurs threads à la fois
+        payload = payload_avec(payload_search_id_dep, {('text',): dep_name})
 
-        result = requests.post(url = url, headers = headers, json = payload_search_id_dep, cookies = cookies)
+        result = transport.post(url = url, json = payload)
         
-        print('\n', dep_name, '| code réponse |', result)
+        afficher('\n', dep_name, '| code réponse |', result)
         return result.json()[0]['id']
 
     except Exception:
-        print('Erreur Récupération id dep:', dep_name)
+        afficher('Erreur Récupération id dep:', dep_name)
         return ''
 
+# return: copie de la liste des départements avec leurs identifiants (id vide si non trouvé)
 def get_departements():
-    for dep in departements:
-    ## Récupération des identifiants de chaque departement
-        dep['id'] = get_id_dep(dep['nom'])
-        print(dep)
-    return departements
+    DEPARTEMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    cache = CacheLieux(CACHE_LIEUX, CACHE_LIEUX_TTL)
+    try:
+        ## Récupération des identifiants de chaque departement
+        identifiants = resoudre_lieux(cache, 'seloger', [dep['nom'] for dep in departements], get_id_dep)
+    finally:
+        cache.fermer()
+    return [dict(dep, id=identifiants.get(dep['nom'], '')) for dep in departements]
 
 def execution():
     departements = get_departements()
@@ -36,9 +58,9 @@ def execution():
     dep_df = pd.DataFrame(departements)
 
     # Enregistrement du fichier CSV
-    output_path = 'seloger_departements_id.csv'
+    output_path = DEPARTEMENTS_DIR / 'seloger_departements_id.csv'
     dep_df.to_csv(output_path, index=False)
-    print(f'Fichier CSV enregistré dans : {output_path}')
+    afficher(f'Fichier CSV enregistré dans : {output_path}')
 
 if __name__ == '__main__':
-    get_departements()
\ No newline at end of file
+    execution()
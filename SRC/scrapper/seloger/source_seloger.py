@@ -0,0 +1,48 @@
+# Ce fichier contient la source SeLoger pour l'ordonnanceur commun (scrapper/commun/ordonnanceur.py)
+# Les méthodes de l'interface (chercher, recuperer_details, vers_ligne) reprennent les fonctions
+# de scrapper_seloger.py, mais la récupération elle-même reste celle du pipeline de scrapper_seloger_async.py
+# (découpage des gros départements, taille des pages mesurée, détails regroupés par requête):
+# elle est lancée sous le plafond de requêtes par hôte partagé avec les autres sources.
+from config import headers, cookies, SELOGER_HOST, annonces_filters
+from scrapper_seloger import get_annonces_resume, get_annonces, charger_departements, chemin_departement
+from scrapper_seloger import SCHEMA_EMPREINTE
+# scrapper_seloger a ajouté le dossier scrapper au sys.path
+from commun import transport
+from commun.source import Source
+
+class SourceSeloger(Source):
+    nom = 'seloger'
+    host = SELOGER_HOST
+    par_page = annonces_filters['paging']['size']
+    schema_empreinte = SCHEMA_EMPREINTE
+
+    def __init__(self, concurrency=2):
+        self.concurrency = concurrency
+
+    def configurer(self):
+        # Le pool de connexions de la session partagée doit couvrir toutes les requêtes simultanées
+        transport.configurer_hote(SELOGER_HOST, headers=headers, cookies=cookies,
+                                  pool_maxsize=max(transport.POOL_MAXSIZE, self.concurrency))
+
+    def unites(self):
+        return [dict(dep, cle=str(dep['numero'])) for dep in charger_departements() if dep.get('id')]
+
+    def chercher(self, unite, page):
+        return get_annonces_resume(unite['id'], page, self.par_page), None
+
+    def recuperer_details(self, unite, resumes):
+        return get_annonces([str(resume['id']) for resume in resumes])
+
+    def vers_ligne(self, unite, annonce):
+        return annonce
+
+    def chemin(self, unite, extension):
+        return chemin_departement(unite, extension)
+
+    async def executer(self, ordonnanceur):
+        from scrapper_seloger_async import execution_async
+        departements_list = await ordonnanceur.appeler(self, charger_departements)
+        stats = await execution_async(departements_list, self.concurrency, journal=ordonnanceur.journal,
+                                      index=ordonnanceur.index, limiteur=ordonnanceur.limiteur,
+                                      fraicheur=ordonnanceur.fraicheur, budget=self.budget_requetes)
+        return stats.nb_annonces()
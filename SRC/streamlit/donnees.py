@@ -0,0 +1,105 @@
+"""Accès à la base fusionnée pour les pages de l'application.
+
+La base est écrite par SRC/Clean/clean_merge_immo.py sous forme de dataset Parquet partitionné
+par source et département (DATA/Fusion_notaires_seloger/base_fusionnee/source=.../departement=...).
+Les pages ne lisent que les colonnes et les partitions dont elles ont besoin : les filtres
+sur la source et le département sont résolus par les dossiers, les autres filtres par les
+statistiques des groupes de lignes Parquet.
+Les anciennes bases (un seul fichier base_fusionnee.parquet ou base_fusionnee.csv) restent lisibles.
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+
+DATA_SUBDIR = Path("DATA") / "Fusion_notaires_seloger"
+
+# Valeurs de partition lues en texte : sinon "01" serait relu comme l'entier 1
+PARTITIONING = ds.partitioning(pa.schema([("source", pa.string()), ("departement", pa.string())]), flavor="hive")
+
+# Représentation pandas compacte de la base (voir load_columns)
+CATEGORY_COLUMNS = ["type_bien", "ville", "cp", "departement", "source"]
+COMPACT_PANDAS_TYPES = {
+    pa.int32(): pd.Int32Dtype(),
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+}
+
+
+def find_data_dir():
+    """Trouve DATA/Fusion_notaires_seloger en remontant depuis ce fichier, sinon depuis le répertoire de travail"""
+    # Remonter: streamlit -> SRC -> racine
+    data_dir = Path(__file__).absolute().parent.parent.parent / DATA_SUBDIR
+    if data_dir.exists():
+        return data_dir
+    cwd = Path(os.getcwd())
+    for parent in [cwd] + list(cwd.parents)[:3]:
+        if (parent / DATA_SUBDIR).exists():
+            return parent / DATA_SUBDIR
+    return data_dir
+
+
+def open_dataset():
+    """Ouvre la base fusionnée, None si elle est introuvable.
+
+    Priorité au dataset partitionné, puis à l'ancien fichier Parquet, puis à l'ancien CSV.
+    """
+    data_dir = find_data_dir()
+    if (data_dir / "base_fusionnee").is_dir():
+        return ds.dataset(data_dir / "base_fusionnee", format="parquet", partitioning=PARTITIONING)
+    if (data_dir / "base_fusionnee.parquet").exists():
+        return ds.dataset(data_dir / "base_fusionnee.parquet", format="parquet")
+    if (data_dir / "base_fusionnee.csv").exists():
+        csv_format = ds.CsvFileFormat(
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(column_types={"departement": pa.string(), "cp": pa.string()}),
+        )
+        return ds.dataset(data_dir / "base_fusionnee.csv", format=csv_format)
+    return None
+
+
+def partition_values(dataset, column):
+    """Valeurs distinctes d'une colonne de partition (source, departement), triées.
+
+    Dataset partitionné : lues dans les noms des dossiers, sans lire de données.
+    """
+    values = set()
+    partitioned = False
+    for fragment in dataset.get_fragments():
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        if column in keys:
+            partitioned = True
+            values.add(keys[column])
+    # Ancienne base sans partitions : la colonne est lue
+    if not partitioned and column in dataset.schema.names:
+        values.update(dataset.to_table(columns=[column]).column(column).unique().to_pylist())
+    return sorted(str(v) for v in values if v is not None)
+
+
+def build_filter(**equal):
+    """Filtre d'égalité sur des colonnes (valeur None : pas de filtre), None si aucun filtre"""
+    expression = None
+    for column, value in equal.items():
+        if value is None:
+            continue
+        condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def load_columns(dataset, columns, filter=None):
+    """Charge les colonnes demandées (celles qui existent dans la base) des lignes qui passent le filtre.
+
+    Même représentation compacte que la fusion (clean_merge_immo.to_compact_pandas) : colonnes
+    à peu de valeurs distinctes en catégories, entiers Int32, texte en chaînes Arrow.
+    """
+    columns = [c for c in columns if c in dataset.schema.names]
+    table = dataset.to_table(columns=columns, filter=filter)
+    for name in CATEGORY_COLUMNS:
+        if name in table.column_names and not pa.types.is_dictionary(table.schema.field(name).type):
+            table = table.set_column(table.column_names.index(name), name, pc.dictionary_encode(table.column(name)))
+    return table.to_pandas(types_mapper=COMPACT_PANDAS_TYPES.get)
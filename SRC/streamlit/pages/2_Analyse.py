@@ -7,6 +7,8 @@ from streamlit.components.v1 import html as st_html
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
+import pyarrow.dataset as pa_ds
+import sys
 import tempfile
 import os
 from geopy.geocoders import Nominatim
@@ -37,48 +39,39 @@ st.markdown("""
 
 st.title("Analyse Interactive des Données Immobilières")
 
-# Fonction pour trouver le chemin des données
-def find_data_path():
-    """Trouve le chemin vers les données en remontant depuis le fichier actuel"""
-    current_file = Path(__file__).absolute()
-    # Remonter: pages -> streamlit -> SRC -> racine
-    base_dir = current_file.parent.parent.parent.parent
-    data_path = base_dir / "DATA" / "Fusion_notaires_seloger" / "base_fusionnee.csv"
-    
-    # Si le fichier n'existe pas, essayer depuis le répertoire de travail
-    if not data_path.exists():
-        import os
-        cwd = Path(os.getcwd())
-        # Chercher DATA dans le répertoire courant ou ses parents
-        for parent in [cwd] + list(cwd.parents)[:3]:
-            alt_path = parent / "DATA" / "Fusion_notaires_seloger" / "base_fusionnee.csv"
-            if alt_path.exists():
-                return alt_path
-    
-    return data_path
+# Accès à la base fusionnée (dataset Parquet partitionné par source et département)
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+from donnees import open_dataset, partition_values, build_filter, load_columns
+
+# Colonnes utilisées par la page : la description, l'url et l'identifiant ne sont pas lus
+COLUMNS = ['prix', 'surface', 'prix_m2', 'nb_pieces', 'nb_chambres', 'type_bien', 'ville', 'cp',
+           'departement', 'latitude', 'longitude', 'source', 'creationDate']
 
-DATA_PATH = find_data_path()
+@st.cache_resource
+def get_dataset():
+    return open_dataset()
 
-# Debug temporaire (à retirer après vérification)
-if not DATA_PATH.exists():
-    st.error(f"❌ Fichier introuvable. Chemin recherché: {DATA_PATH}")
+dataset = get_dataset()
+
+if dataset is None:
+    st.error("❌ Base fusionnée introuvable dans DATA/Fusion_notaires_seloger/")
     st.info("💡 Assurez-vous de lancer Streamlit depuis la racine du projet avec: `streamlit run SRC/streamlit/app.py`")
 
 @st.cache_data
-def load_data():
-    """Charge les données avec cache pour améliorer les performances"""
+def load_partition_values():
+    """Sources et départements disponibles (noms des partitions, sans lire de données)"""
+    return partition_values(dataset, 'source'), partition_values(dataset, 'departement')
+
+@st.cache_data
+def load_data(source=None, departement=None):
+    """Charge les colonnes de la page pour une source et un département (None : tous), avec cache
+
+    Les filtres sont poussés jusqu'aux fichiers Parquet : seules les partitions concernées sont lues.
+    """
     try:
-        # Essayer d'abord le CSV
-        if DATA_PATH.exists():
-            df = pd.read_csv(DATA_PATH)
-        else:
-            # Essayer le parquet
-            parquet_path = DATA_PATH.parent / "base_fusionnee.parquet"
-            if parquet_path.exists():
-                df = pd.read_parquet(parquet_path)
-            else:
-                st.error(f"❌ Fichier de données introuvable : {DATA_PATH}")
-                return None
+        filter = build_filter(source=source, departement=departement)
+        valid = (pa_ds.field('prix') > 0) & (pa_ds.field('surface') > 0) & (pa_ds.field('prix_m2') > 0)
+        df = load_columns(dataset, COLUMNS, valid if filter is None else filter & valid)
         
         # Nettoyage des données
         numeric_cols = ['prix', 'surface', 'prix_m2', 'nb_pieces', 'nb_chambres', 'latitude', 'longitude']
@@ -99,10 +92,8 @@ def load_data():
         st.error(f"❌ Erreur lors du chargement des données : {e}")
         return None
 
-# Chargement des données
-df = load_data()
-
-if df is not None:
+df = None
+if dataset is not None:
     # ============================================
     # FILTRES ET MÉTRIQUES DANS LA PAGE
     # ============================================
@@ -110,12 +101,24 @@ if df is not None:
     st.subheader("Filtres de recherche")
     
     col1, col2, col3, col4 = st.columns(4)
+    sources, departements = load_partition_values()
     
     with col1:
-        # Filtre par source
-        sources = ['Tous'] + list(df['source'].unique()) if 'source' in df.columns else ['Tous']
-        selected_source = st.selectbox("Source", sources)
+        # Filtre par source (partitions)
+        selected_source = st.selectbox("Source", ['Tous'] + sources)
     
+    with col4:
+        # Filtre par département (partitions)
+        selected_dept = st.selectbox("Département", ['Tous'] + departements)
+    
+    # Chargement des seules partitions sélectionnées
+    df = load_data(None if selected_source == 'Tous' else selected_source,
+                   None if selected_dept == 'Tous' else str(selected_dept))
+    if df is not None and len(df) == 0:
+        st.warning("⚠️ Aucune annonce valide pour cette source et ce département.")
+        st.stop()
+
+if df is not None:
     with col2:
         # Filtre par type de bien
         if 'type_bien' in df.columns:
@@ -132,14 +135,6 @@ if df is not None:
         else:
             selected_ville = 'Toutes'
     
-    with col4:
-        # Filtre par département
-        if 'departement' in df.columns:
-            departements = ['Tous'] + sorted([str(d) for d in df['departement'].dropna().unique()])
-            selected_dept = st.selectbox("Département", departements)
-        else:
-            selected_dept = 'Tous'
-    
     # Troisième ligne : Filtres numériques
     col1, col2, col3 = st.columns(3)
     
@@ -182,16 +177,13 @@ if df is not None:
     # APPLICATION DES FILTRES
     # ============================================
     
+    # Source et département : déjà filtrés au chargement (partitions)
     df_filtered = df.copy()
     
-    if selected_source != 'Tous':
-        df_filtered = df_filtered[df_filtered['source'] == selected_source]
     if selected_type != 'Tous':
         df_filtered = df_filtered[df_filtered['type_bien'] == selected_type]
     if selected_ville != 'Toutes':
         df_filtered = df_filtered[df_filtered['ville'] == selected_ville]
-    if selected_dept != 'Tous':
-        df_filtered = df_filtered[df_filtered['departement'] == str(selected_dept)]
     if surface_range:
         df_filtered = df_filtered[(df_filtered['surface'] >= surface_range[0]) & (df_filtered['surface'] <= surface_range[1])]
     if prix_range:
@@ -238,7 +230,7 @@ if df is not None:
         
         if 'ville' in df_filtered.columns and 'prix_m2' in df_filtered.columns:
             # Calculer le prix moyen par ville (top 20)
-            prix_par_ville = df_filtered.groupby('ville')['prix_m2'].mean().sort_values(ascending=False).head(20)
+            prix_par_ville = df_filtered.groupby('ville', observed=True)['prix_m2'].mean().sort_values(ascending=False).head(20)
             
             fig_hist = px.bar(
                 x=prix_par_ville.values,
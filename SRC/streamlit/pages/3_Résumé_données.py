@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from pathlib import Path
+import sys
 
 st.set_page_config(
     page_title="Résumé des données - Analyse Immobilière",
@@ -28,41 +29,27 @@ st.markdown("""
 
 st.title("Résumé des Données")
 
-# Fonction pour trouver le chemin des données
-def find_data_path():
-    """Trouve le chemin vers les données en remontant depuis le fichier actuel"""
-    current_file = Path(__file__).absolute()
-    # Remonter: pages -> streamlit -> SRC -> racine
-    base_dir = current_file.parent.parent.parent.parent
-    data_path = base_dir / "DATA" / "Fusion_notaires_seloger" / "base_fusionnee.csv"
-    
-    # Si le fichier n'existe pas, essayer depuis le répertoire de travail
-    if not data_path.exists():
-        import os
-        cwd = Path(os.getcwd())
-        # Chercher DATA dans le répertoire courant ou ses parents
-        for parent in [cwd] + list(cwd.parents)[:3]:
-            alt_path = parent / "DATA" / "Fusion_notaires_seloger" / "base_fusionnee.csv"
-            if alt_path.exists():
-                return alt_path
-    
-    return data_path
+# Accès à la base fusionnée (dataset Parquet partitionné par source et département)
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+from donnees import open_dataset, load_columns
+
+# Colonnes utilisées par les statistiques : la description et l'url ne sont pas lues
+COLUMNS = ['source', 'prix', 'prix_m2', 'surface', 'nb_pieces', 'nb_chambres', 'departement', 'ville', 'type_bien']
 
-DATA_PATH = find_data_path()
+@st.cache_resource
+def get_dataset():
+    return open_dataset()
+
+dataset = get_dataset()
 
 @st.cache_data
 def load_data():
-    """Charge les données avec cache pour améliorer les performances"""
+    """Charge les colonnes des statistiques avec cache pour améliorer les performances"""
     try:
-        if DATA_PATH.exists():
-            df = pd.read_csv(DATA_PATH)
-        else:
-            parquet_path = DATA_PATH.parent / "base_fusionnee.parquet"
-            if parquet_path.exists():
-                df = pd.read_parquet(parquet_path)
-            else:
-                st.error(f"❌ Fichier de données introuvable : {DATA_PATH}")
-                return None
+        if dataset is None:
+            st.error("❌ Base fusionnée introuvable dans DATA/Fusion_notaires_seloger/")
+            return None
+        df = load_columns(dataset, COLUMNS)
         
         # Nettoyage des données
         numeric_cols = ['prix', 'surface', 'prix_m2', 'nb_pieces', 'nb_chambres', 'latitude', 'longitude']
@@ -75,6 +62,10 @@ def load_data():
         st.error(f"❌ Erreur lors du chargement des données : {e}")
         return None
 
+def load_sample(nb_lignes):
+    """Premières lignes de la base avec toutes les colonnes (seuls les premiers fichiers sont lus)"""
+    return dataset.head(nb_lignes).to_pandas()
+
 # Chargement des données
 df = load_data()
 
@@ -134,7 +125,7 @@ if df is not None:
         
         with col2:
             # Tableau détaillé
-            source_stats = df.groupby('source').agg({
+            source_stats = df.groupby('source', observed=True).agg({
                 'prix': ['count', 'mean', 'median'],
                 'prix_m2': 'mean',
                 'surface': 'mean'
@@ -231,7 +222,7 @@ if df is not None:
         with col2:
             # Statistiques par type de bien
             if 'prix' in df.columns and 'prix_m2' in df.columns:
-                type_stats = df.groupby('type_bien').agg({
+                type_stats = df.groupby('type_bien', observed=True).agg({
                     'prix': ['count', 'mean'],
                     'prix_m2': 'mean',
                     'surface': 'mean'
@@ -248,14 +239,14 @@ if df is not None:
     
     st.markdown("""
     Les données sont stockées dans :
-    - **Format CSV** : `DATA/Fusion_notaires_seloger/base_fusionnee.csv`
-    - **Format Parquet** : `DATA/Fusion_notaires_seloger/base_fusionnee.parquet`
+    - **Dataset Parquet** partitionné par source et département : `DATA/Fusion_notaires_seloger/base_fusionnee/`
+    - **Format CSV** (export optionnel, `clean_merge_immo.py --csv`) : `DATA/Fusion_notaires_seloger/base_fusionnee.csv`
     
     Vous pouvez télécharger un échantillon des données ci-dessous.
     """)
     
     if st.button("📥 Télécharger un échantillon (1000 lignes)"):
-        sample_df = df.head(1000)
+        sample_df = load_sample(1000)
         csv = sample_df.to_csv(index=False)
         st.download_button(
             label="Télécharger CSV",
@@ -0,0 +1,9 @@
+# Accès aux scripts du dépôt, qui s'importent entre eux depuis leur dossier
+# (scrapper/commun, scrapper/seloger, scrapper/Notaires, Clean)
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "SRC"
+for dossier in (SRC / "scrapper", SRC / "scrapper" / "seloger", SRC / "scrapper" / "Notaires", SRC / "Clean"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
@@ -0,0 +1,94 @@
+# Fusion incrémentale de la base (clean_merge_immo.py): schéma compact et manifeste des fichiers sources
+import pyarrow as pa
+import pytest
+
+import clean_merge_immo as fusion
+
+NOTAIRES = (
+    "departement,id,prix,surface_m2,prix_m2,nb_pieces,nb_chambres,type_bien,cp,commune,localite,statut,date_maj,url,photo\n"
+    "6,n1,200000,50.5,3960.4,3,2,Maison,06000,Nice,,A vendre,2025-01-01,http://x,\n"
+)
+SELOGER_ENTETE = "id,creationDate,city,district,zipCode,distributionType,propertyType,price,surface,nbroom,nbbedroom,description\n"
+
+
+def seloger(departement, *ids):
+    return SELOGER_ENTETE + "".join(
+        f"{i},2025-11-30,Ville,Centre,{departement}000,Buy,Apartment,300000,60.0,3,2,\"Bel appartement\"\n" for i in ids
+    )
+
+
+def test_fit_schema_hors_int32(capsys):
+    colonnes = {champ.name: pa.nulls(3) for champ in fusion.BASE_SCHEMA}
+    colonnes["prix"] = pa.array([100, 2**31, None], pa.int64())
+    colonnes["nb_pieces"] = pa.array([3, -2**31 - 1, 2], pa.int64())
+
+    table = fusion.fit_schema(pa.table(colonnes))
+
+    assert table.schema == fusion.BASE_SCHEMA
+    assert table.column("prix").to_pylist() == [100, None, None]
+    assert table.column("nb_pieces").to_pylist() == [3, None, 2]
+    sortie = capsys.readouterr().out
+    assert "prix : 1 valeurs hors de l'intervalle int32" in sortie
+    assert "nb_pieces : 1 valeurs hors de l'intervalle int32" in sortie
+
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    """Sources et sorties de la fusion dans un dossier temporaire."""
+    (tmp_path / "Seloger").mkdir()
+    (tmp_path / "notaires_france.csv").write_text(NOTAIRES, encoding="utf-8")
+    (tmp_path / "Seloger" / "seloger_dep_75_Paris.csv").write_text(seloger("75", "a", "b"), encoding="utf-8")
+    (tmp_path / "Seloger" / "seloger_dep_13_Bouches-du-Rhone.csv").write_text(seloger("13", "c"), encoding="utf-8")
+    sortie = tmp_path / "Fusion"
+    for nom, valeur in {
+        "NOTAIRES_FILE": tmp_path / "notaires_france.csv", "SELOGER_FOLDER": tmp_path / "Seloger",
+        "OUTPUT_DIR": sortie, "OUTPUT_DATASET": sortie / "base_fusionnee", "OUTPUT_CSV": sortie / "base_fusionnee.csv",
+        "MANIFEST_FILE": sortie / "manifest.json", "PARTITIONS_DIR": sortie / "partitions", "NB_PROCESSUS": 1,
+    }.items():
+        monkeypatch.setattr(fusion, nom, valeur)
+    return tmp_path
+
+
+def ids_par_departement():
+    base = fusion.load_base(["id", "source", "departement"])
+    return {(source, departement): sorted(groupe["id"]) for (source, departement), groupe
+            in base.groupby(["source", "departement"], observed=True)}
+
+
+def test_fusion_incrementale(dossier):
+    assert fusion.merge_all() == 3
+    assert ids_par_departement() == {("notaires", "06"): ["n1"], ("seloger", "13"): ["c"], ("seloger", "75"): ["a", "b"]}
+
+    # Rien n'a changé: aucune partition réécrite
+    assert fusion.merge_all() == 0
+
+    # Fichier modifié: seul son département est réécrit
+    (dossier / "Seloger" / "seloger_dep_75_Paris.csv").write_text(seloger("75", "a", "b", "d"), encoding="utf-8")
+    assert fusion.merge_all() == 1
+    assert ids_par_departement()[("seloger", "75")] == ["a", "b", "d"]
+
+    # Fichier supprimé: sa partition et son département disparaissent de la base
+    (dossier / "Seloger" / "seloger_dep_13_Bouches-du-Rhone.csv").unlink()
+    assert fusion.merge_all() == 1
+    assert ("seloger", "13") not in ids_par_departement()
+    assert not fusion.partition_dir("seloger", "13").exists()
+
+
+def test_fusion_reprend_les_departements_en_attente(dossier, monkeypatch):
+    write_base = fusion.write_base
+    fusion.merge_all()
+    (dossier / "Seloger" / "seloger_dep_75_Paris.csv").write_text(seloger("75", "e"), encoding="utf-8")
+
+    # Fusion interrompue pendant l'écriture de la base: le département reste dans le manifeste
+    def interrompre(manifest, keys):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(fusion, "write_base", interrompre)
+    with pytest.raises(KeyboardInterrupt):
+        fusion.merge_all()
+    assert fusion.load_manifest()["pending"] == [["seloger", "75"]]
+
+    # Fichier inchangé depuis: la fusion suivante réécrit quand même le département en attente
+    monkeypatch.setattr(fusion, "write_base", write_base)
+    assert fusion.merge_all() == 1
+    assert ids_par_departement()[("seloger", "75")] == ["e"]
+    assert fusion.load_manifest()["pending"] == []
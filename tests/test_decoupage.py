@@ -0,0 +1,76 @@
+# Découpage des gros départements SeLoger en codes postaux (scrapper_seloger_decoupage.py)
+import pytest
+
+import scrapper_seloger_decoupage as decoupage
+
+PARIS = {'numero': '75', 'nom': 'Paris', 'id': 'AD08FR75'}
+
+
+@pytest.fixture
+def autocompletion(monkeypatch):
+    """Autocomplétion simulée: préfixe -> lieux, les textes demandés sont enregistrés."""
+    reponses = {}
+    demandes = []
+
+    def get_lieux(texte, types=None):
+        demandes.append(texte)
+        return reponses.get(texte, [])
+
+    monkeypatch.setattr(decoupage, "get_lieux", get_lieux)
+    return reponses, demandes
+
+
+def code(numero):
+    return {'id': f"POCO{numero}", 'postalCode': numero}
+
+
+def test_planifier_shards(autocompletion, monkeypatch):
+    reponses, demandes = autocompletion
+    reponses['75'] = [code('75001'), code('75002'), {'id': 'AD09', 'label': 'Paris 75'}, code('92100')]
+    totaux = {'AD08FR75': 100, 'POCO75001': 60, 'POCO75002': 40}
+    monkeypatch.setattr(decoupage, "get_total_annonces", totaux.get)
+    requetes = []
+
+    zones = decoupage.planifier_shards(PARIS, lambda: requetes.append(1))
+
+    # Seuls les codes postaux du département sont gardés
+    assert [zone['shard'] for zone in zones] == ['75001', '75002']
+    assert all(zone['numero'] == '75' for zone in zones)
+    assert demandes == ['75']
+    # 1 autocomplétion + 1 total du département + 1 total par code postal
+    assert len(requetes) == 4
+
+
+def test_planifier_shards_profondeur_maximale(autocompletion, monkeypatch):
+    reponses, demandes = autocompletion
+    limite = decoupage.payload_search_id_dep['limit']
+    # Toutes les recherches sont pleines: le préfixe est affiné jusqu'à PROFONDEUR_MAX chiffres
+    for prefixe in ['75'] + [f"75{i}" for i in range(10)] + [f"75{i}{j}" for i in range(10) for j in range(10)]:
+        reponses[prefixe] = [code(f"{prefixe}{k}".ljust(5, '0')[:5]) for k in range(limite)]
+    monkeypatch.setattr(decoupage, "verifier_couverture", lambda dep, zones, compter=None: zones)
+
+    decoupage.planifier_shards(PARIS)
+
+    assert len(demandes) == 1 + 10 + 100
+    assert max(len(texte) for texte in demandes) == 2 + decoupage.PROFONDEUR_MAX
+
+
+def test_planifier_shards_sans_code_postal(autocompletion):
+    assert decoupage.planifier_shards(PARIS) == []
+
+
+def test_verifier_couverture(monkeypatch):
+    zones = [{'id': 'POCO75001', 'shard': '75001'}, {'id': 'POCO75002', 'shard': '75002'}]
+    totaux = {'AD08FR75': 100, 'POCO75001': 60, 'POCO75002': 30}
+    monkeypatch.setattr(decoupage, "get_total_annonces", totaux.get)
+    # 90 annonces sur 100: couverture insuffisante, le département est parcouru d'un seul bloc
+    assert decoupage.verifier_couverture(PARIS, zones) == []
+
+    totaux['POCO75002'] = 40
+    assert decoupage.verifier_couverture(PARIS, zones) == zones
+
+
+def test_verifier_couverture_total_inconnu(monkeypatch):
+    zones = [{'id': 'POCO75001', 'shard': '75001'}]
+    monkeypatch.setattr(decoupage, "get_total_annonces", lambda placeId: None)
+    assert decoupage.verifier_couverture(PARIS, zones) == zones
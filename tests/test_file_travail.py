@@ -0,0 +1,69 @@
+# File de travail de la récupération répartie: baux, nouvelles tentatives et reprise (commun/file_travail.py)
+import pytest
+
+from commun import file_travail
+from commun.file_travail import FileTravail, ATTENTE, LOUEE, ECHEC, TERMINEE, MAX_TENTATIVES
+
+
+@pytest.fixture
+def file(tmp_path):
+    file = FileTravail(tmp_path / "file.sqlite")
+    file.ajouter_unite("notaires", {'cle': '75'})
+    yield file
+    file.fermer()
+
+
+def test_bail_en_cours(file):
+    tache = file.louer("a", ["notaires"])
+    assert (tache['unite'], tache['page']) == ('75', 1)
+    # Tâche louée par "a": pas disponible pour "b" tant que le bail court
+    assert file.louer("b", ["notaires"]) is None
+    assert file.compter("notaires") == {LOUEE: 1}
+
+
+def test_bail_expire(file):
+    tache = file.louer("a", ["notaires"], duree_bail=-1)
+    # Travailleur arrêté: la tâche est reprise par un autre, le premier ne peut plus la terminer
+    reprise = file.louer("b", ["notaires"])
+    assert reprise['id'] == tache['id']
+    assert not file.terminer(tache, "a", "shard_a", 10)
+    assert file.terminer(reprise, "b", "shard_b", 10, pages_suivantes=[2, 3], total=120)
+    assert file.compter("notaires") == {TERMINEE: 1, ATTENTE: 2}
+
+
+def test_bail_prolonge(file):
+    tache = file.louer("a", ["notaires"], duree_bail=-1)
+    file.prolonger("a", [tache['id']])
+    assert file.louer("b", ["notaires"]) is None
+
+
+def test_echec_attente_croissante(file, monkeypatch):
+    maintenant = [1000.0]
+    monkeypatch.setattr(file_travail.time, "time", lambda: maintenant[0])
+    attente = file_travail.ATTENTE_ECHEC
+
+    file.echouer(file.louer("a", ["notaires"]), "a", "HTTP 500")
+    # Remise en attente, disponible après ATTENTE_ECHEC secondes
+    assert file.compter("notaires") == {ATTENTE: 1}
+    assert file.louer("a", ["notaires"]) is None
+    maintenant[0] += attente + 1
+
+    # Deuxième échec: le délai double
+    file.echouer(file.louer("a", ["notaires"]), "a", "HTTP 500")
+    maintenant[0] += attente + 1
+    assert file.louer("a", ["notaires"]) is None
+    maintenant[0] += attente
+    assert file.louer("a", ["notaires"]) is not None
+
+
+def test_echec_definitif_et_reprise(file, monkeypatch):
+    # Délai négatif: la page est relouable aussitôt
+    monkeypatch.setattr(file_travail, "ATTENTE_ECHEC", -1)
+    for _ in range(MAX_TENTATIVES):
+        tache = file.louer("a", ["notaires"])
+        file.echouer(tache, "a", "HTTP 500")
+    assert file.compter("notaires") == {ECHEC: 1}
+    assert file.louer("a", ["notaires"]) is None
+
+    assert file.reprendre("notaires") == 1
+    assert file.louer("a", ["notaires"]) is not None
@@ -0,0 +1,40 @@
+# Tri des annonces d'une page entre nouvelles ou modifiées et inchangées (commun/index_annonces.py)
+import pytest
+
+from commun.index_annonces import IndexAnnonces
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = IndexAnnonces(tmp_path / "index.sqlite")
+    yield index
+    index.fermer()
+
+
+def test_trier_annonces_nouvelles(index):
+    a_recuperer, lignes = index.trier("seloger", {"1": "e1", "2": "e2"})
+    assert a_recuperer == ["1", "2"]
+    assert lignes == []
+
+
+def test_trier_annonces_connues(index):
+    index.enregistrer("seloger", {"1": {"id": "1", "prix": 100}, "2": {"id": "2", "prix": 200}, "3": None},
+                      {"1": "e1", "2": "e2", "3": "e3"})
+
+    a_recuperer, lignes = index.trier("seloger", {"1": "e1", "2": "modifiee", "3": "e3", "4": "e4"})
+
+    # Empreinte changée, ligne non gardée ou annonce inconnue: à récupérer
+    assert a_recuperer == ["2", "3", "4"]
+    # Annonce inchangée: sa ligne est relue de l'index
+    assert lignes == [{"id": "1", "prix": 100}]
+
+
+def test_trier_par_source(index):
+    index.enregistrer("seloger", {"1": {"id": "1"}}, {"1": "e1"})
+    a_recuperer, lignes = index.trier("notaires", {"1": "e1"})
+    assert a_recuperer == ["1"]
+    assert lignes == []
+
+
+def test_trier_sans_annonce(index):
+    assert index.trier("seloger", {}) == ([], [])
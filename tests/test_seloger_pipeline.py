@@ -0,0 +1,53 @@
+# Regroupement des lots de la file du pipeline SeLoger en requêtes de détail (scrapper_seloger_async.py)
+import asyncio
+
+import scrapper_seloger_async as pipeline
+from scrapper_seloger import longueur_url_annonces
+
+
+def lot(*placeIds):
+    return pipeline.Lot(None, 1, list(placeIds), [], {})
+
+
+def file_de(*elements):
+    file = asyncio.Queue()
+    for element in elements:
+        file.put_nowait(element)
+    return file
+
+
+def test_regrouper_lots_vide_la_file():
+    premier, second, troisieme = lot("a1", "a2"), lot("b1"), lot("c1", "c2")
+    lots, reste, fin = pipeline.regrouper_lots(premier, file_de(second, troisieme))
+    assert lots == [premier, second, troisieme]
+    assert reste is None and not fin
+
+
+def test_regrouper_lots_s_arrete_au_marqueur_de_fin():
+    premier, second = lot("a1"), lot("b1")
+    file = file_de(second, None, lot("c1"))
+    lots, reste, fin = pipeline.regrouper_lots(premier, file)
+    assert lots == [premier, second]
+    assert reste is None and fin
+    # Le lot déposé après le marqueur reste dans la file
+    assert file.qsize() == 1
+
+
+def test_regrouper_lots_respecte_la_longueur_d_url(monkeypatch):
+    premier, second, troisieme = lot("a" * 10), lot("b" * 10), lot("c" * 10)
+    monkeypatch.setattr(pipeline, "LONGUEUR_URL_MAX", longueur_url_annonces(["a" * 10, "b" * 10]))
+    file = file_de(second, troisieme)
+    lots, reste, fin = pipeline.regrouper_lots(premier, file)
+    assert lots == [premier, second]
+    # Le lot qui dépasserait la longueur est rendu pour la requête suivante
+    assert reste is troisieme and not fin
+    assert file.empty()
+
+
+def test_budget_restant():
+    stats = pipeline.StatsPipeline(4)
+    stats.pages_recherche, stats.requetes_detail, stats.requetes_decoupage = 3, 2, 4
+    assert stats.nb_requetes() == 9
+    assert stats.budget_restant(None) is None
+    assert stats.budget_restant(10) == 1
+    assert stats.budget_restant(5) == 0